@@ -0,0 +1,109 @@
+"""
+Concurrent read throughput of the blocking Session path versus the AsyncSession path.
+
+Both modes run the same contacts list query from inside ``async def`` handlers, the way the routes do.
+While the reads are in flight a cheap "ping" coroutine keeps ticking, its latency shows how long the
+event loop was frozen by database work (that is what every other request on the worker would see).
+
+Usage:
+    python -m benchmarks.bench_async_db --contacts 20000 --concurrency 50 --requests 500
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import date
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from src.database.models import Base, Contact, User
+from src.repository.contacts import get_contacts
+
+
+def seed(path: str, contacts: int) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "email": "bench@example.com", "password": "x"}])
+        conn.execute(insert(Contact), [
+            {"first_name": f"First{i}", "last_name": f"Last{i}", "email": f"c{i}@example.com",
+             "phone_number": "380000000000", "birthday": date(1990, 1 + i % 12, 1 + i % 28), "user_id": 1}
+            for i in range(contacts)
+        ])
+    engine.dispose()
+
+
+async def run(handler, args) -> dict:
+    done = asyncio.Event()
+    ping_latencies = []
+
+    async def ping():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            ping_latencies.append(time.perf_counter() - started - 0.001)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def request():
+        async with semaphore:
+            await handler()
+
+    pinger = asyncio.create_task(ping())
+    started = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(args.requests)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await pinger
+
+    ping_latencies.sort()
+    return {
+        "rps": args.requests / elapsed,
+        "ping_p50_ms": statistics.median(ping_latencies) * 1000,
+        "ping_p99_ms": ping_latencies[int(len(ping_latencies) * 0.99) - 1] * 1000,
+        "ping_max_ms": ping_latencies[-1] * 1000,
+    }
+
+
+async def main(args) -> None:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    seed(path, args.contacts)
+    user = User(id=1)
+
+    # before: the old repository code, sync Session queries inside async handlers
+    sync_engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False},
+                                pool_size=args.concurrency)
+    SyncSession = sessionmaker(bind=sync_engine)
+
+    async def blocking_handler():
+        with SyncSession() as db:
+            db.query(Contact).filter(Contact.user_id == user.id).offset(0).limit(args.limit).all()
+
+    # after: the repository on AsyncSession + aiosqlite
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", pool_size=args.concurrency)
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def async_handler():
+        async with AsyncSessionLocal() as db:
+            await get_contacts(0, args.limit, user, db)
+
+    for name, handler in (("before (sync Session)", blocking_handler), ("after (AsyncSession)", async_handler)):
+        stats = await run(handler, args)
+        print(f"{name:24} {stats['rps']:9.1f} req/s   ping p50 {stats['ping_p50_ms']:7.2f} ms"
+              f"   p99 {stats['ping_p99_ms']:7.2f} ms   max {stats['ping_max_ms']:7.2f} ms")
+
+    sync_engine.dispose()
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--contacts", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,103 @@
+"""
+Autocomplete latency as the contact book grows.
+
+For every size the book of a single user is seeded into SQLite, then random prefixes of existing names and
+emails are looked up through the database path (one range scan per lowercase prefix index) and through the
+in-memory PrefixIndex. The database latency should stay flat as the book grows, the index build time is
+what a cache miss costs for books small enough to be kept in memory.
+
+Usage:
+    python -m benchmarks.bench_autocomplete --sizes 10000 100000 1000000 --queries 500
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from src.database.models import Base, Contact, User
+from src.repository.contacts import autocomplete, get_suggestion_rows
+from src.services.autocomplete import PrefixIndex
+
+SYLLABLES = ["an", "bo", "ca", "da", "el", "fi", "ga", "ha", "jo", "ka", "li", "ma", "no", "pe", "ri", "sa", "to", "vi"]
+
+
+def name(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+def seed(path: str, contacts: int) -> list[str]:
+    rng = random.Random(contacts)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    words = []
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "email": "bench@example.com", "password": "x"}])
+        for start in range(0, contacts, 50000):
+            batch = []
+            for i in range(start, min(start + 50000, contacts)):
+                first_name, last_name = name(rng), name(rng)
+                batch.append({"first_name": first_name, "last_name": last_name,
+                              "email": f"{first_name.lower()}.{i}@example.com", "user_id": 1})
+            conn.execute(insert(Contact), batch)
+            words.extend(row["email"] for row in batch[:200])
+        conn.exec_driver_sql("ANALYZE")
+    engine.dispose()
+    return words
+
+
+def percentiles(latencies: list[float]) -> str:
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    return f"p50 {statistics.median(latencies) * 1000:7.3f} ms   p99 {p99 * 1000:7.3f} ms"
+
+
+async def bench(size: int, args) -> None:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    words = seed(path, size)
+    rng = random.Random(0)
+    queries = [rng.choice(words)[:rng.randint(1, 6)] for _ in range(args.queries)]
+    user = User(id=1)
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            await autocomplete(query, args.limit, user, db)
+            latencies.append(time.perf_counter() - started)
+        print(f"{size:>9} contacts   database     {percentiles(latencies)}")
+
+        started = time.perf_counter()
+        rows = await get_suggestion_rows(user, db, size)
+        loaded = time.perf_counter() - started
+        started = time.perf_counter()
+        index = PrefixIndex(rows)
+        built = time.perf_counter() - started
+
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query, args.limit)
+        latencies.append(time.perf_counter() - started)
+    print(f"{size:>9} contacts   memory index {percentiles(latencies)}"
+          f"   load {loaded * 1000:8.1f} ms   build {built * 1000:8.1f} ms")
+    await engine.dispose()
+
+
+async def main(args) -> None:
+    for size in args.sizes:
+        await bench(size, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
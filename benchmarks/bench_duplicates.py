@@ -0,0 +1,105 @@
+"""
+Duplicate detection time as the contact book grows.
+
+Every size is seeded for one user with about one contact in ten being a copy of another one that differs by
+the case or spacing of the email, the formatting of the phone number or a typo in the name.
+The book is then scanned through find_duplicates, and the time should grow linearly with the size.
+The groups are cached per version of the book, so the next pages are read from the cache, which is timed as well.
+
+Usage:
+    python -m benchmarks.bench_duplicates --sizes 10000 100000 1000000 --url postgresql+asyncpg://...
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import date
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from src.database.models import Base, User
+from src.repository.contacts import insert_contacts
+from src.schemas import ContactModel
+from src.services import contact_cache as contact_cache_service
+from src.services.contact_cache import contact_cache
+
+SYLLABLES = ["an", "bo", "ca", "da", "el", "fi", "go", "ha", "in", "jo", "ka", "le", "mi", "no", "or", "pa",
+             "ri", "sa", "tu", "va", "we", "xi", "ya", "zo"]
+
+
+def names(rng: random.Random, count: int) -> list[str]:
+    return ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize() for _ in range(count)]
+
+
+def contacts(size: int, seed: int = 1) -> list[dict]:
+    rng = random.Random(seed)
+    # a population has a few thousand first names and tens of thousands of last names
+    first_names, last_names = names(rng, 5000), names(rng, 50000)
+    rows, originals = [], []
+    for i in range(size):
+        if originals and rng.random() < 0.1:
+            row = dict(rng.choice(originals))
+            change = rng.randrange(3)
+            if change == 0:
+                row["email"] = row["email"].upper()
+            elif change == 1:
+                digits = row["phone_number"]
+                row["phone_number"] = f"0{digits[3:5]}-{digits[5:8]}-{digits[8:10]}-{digits[10:]}"
+            else:
+                row["first_name"] = row["first_name"][:-1] or row["first_name"]
+                row["email"] = f"copy{i}@example.com"
+                row["phone_number"] = None
+        else:
+            row = {"first_name": rng.choice(first_names), "last_name": rng.choice(last_names), "email": f"c{i}@example.com",
+                   "phone_number": f"380{rng.randrange(10 ** 9):09d}",
+                   "birthday": date(1950 + rng.randrange(60), 1 + rng.randrange(12), 1 + rng.randrange(28))}
+            originals.append(row)
+        rows.append(row)
+    return rows
+
+
+async def bench(url: str, size: int) -> None:
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [{"id": 1, "email": "bench@example.com", "password": "x"}])
+    session = async_sessionmaker(engine, expire_on_commit=False)
+    async with session() as db:
+        # seeded through the import path, which uses COPY on PostgreSQL
+        await insert_contacts([ContactModel.construct(**row) for row in contacts(size)], User(id=1), db)
+        await db.commit()
+
+    contact_cache.clear()
+    timings = []
+    for _ in range(2):
+        # the first page scans the book, the second one is read from the cache
+        started = time.perf_counter()
+        async with session() as db:
+            version = await contact_cache_service.get_contacts_version(User(id=1), db)
+            groups = await contact_cache_service.find_duplicates(User(id=1), db, version)
+        timings.append(time.perf_counter() - started)
+    elapsed, cached = timings
+    duplicates = sum(len(group["ids"]) for group in groups)
+    print(f"{size:>9} contacts   {elapsed:7.2f} s   {size / elapsed:9.0f} contacts/s   cached {cached * 1000:7.2f} ms"
+          f"   {len(groups):>7} groups   {duplicates:>8} contacts in groups")
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+async def main(args) -> None:
+    url = args.url or f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    for size in args.sizes:
+        await bench(url, size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--url")
+    asyncio.run(main(parser.parse_args()))
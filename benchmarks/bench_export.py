@@ -0,0 +1,69 @@
+"""
+Export throughput and peak memory as the contact book grows.
+
+Every size is seeded for one user, then the book is exported through export_contacts and the chunks are
+discarded, the way StreamingResponse hands them to the socket. Peak Python memory is measured with
+tracemalloc and should stay the same for every size.
+
+Usage:
+    python -m benchmarks.bench_export --sizes 1000 100000 1000000 --format csv --gzip
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from src.database.models import Base, Contact, User
+from src.schemas import ContactFileFormat
+from src.services.contact_export import export_contacts
+
+
+async def bench(url: str, size: int, args) -> None:
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [{"id": 1, "email": "bench@example.com", "password": "x"}])
+        for start in range(0, size, 50000):
+            await conn.execute(insert(Contact), [
+                {"first_name": f"First{i}", "last_name": f"Last{i}", "email": f"c{i}@example.com",
+                 "phone_number": "380000000000", "birthday": date(1990, 1 + i % 12, 1 + i % 28), "user_id": 1}
+                for i in range(start, min(start + 50000, size))
+            ])
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    sent = 0
+    async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+        async for chunk in export_contacts(ContactFileFormat(args.format), User(id=1), db, compress=args.gzip):
+            sent += len(chunk)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{size:>9} contacts   {size / elapsed:10.0f} rows/s   {sent / 2 ** 20:8.1f} MiB sent"
+          f"   peak {peak / 2 ** 20:6.1f} MiB")
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+async def main(args) -> None:
+    url = args.url or f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    for size in args.sizes:
+        await bench(url, size, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--format", choices=[f.value for f in ContactFileFormat], default="csv")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--url")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,88 @@
+"""
+Concurrent login throughput with bcrypt on the event loop versus bcrypt in the PasswordHasher pool.
+
+Both modes verify the same password against the same hash from inside ``async def`` handlers, the way the
+login route does. While the logins are in flight a cheap "ping" coroutine keeps ticking, its latency shows how
+long the event loop was frozen by hashing (that is what every other request on the worker would see).
+
+Usage:
+    python -m benchmarks.bench_login --rounds 12 --workers 4 --concurrency 50 --requests 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from src.services.passwords import PasswordHasher
+
+
+async def run(handler, args) -> dict:
+    done = asyncio.Event()
+    ping_latencies = []
+    login_latencies = []
+
+    async def ping():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            ping_latencies.append(time.perf_counter() - started - 0.001)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def request():
+        async with semaphore:
+            started = time.perf_counter()
+            await handler()
+            login_latencies.append(time.perf_counter() - started)
+
+    pinger = asyncio.create_task(ping())
+    started = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(args.requests)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await pinger
+
+    ping_latencies.sort()
+    login_latencies.sort()
+    return {
+        "rps": args.requests / elapsed,
+        "login_p50_ms": statistics.median(login_latencies) * 1000,
+        "ping_p50_ms": statistics.median(ping_latencies) * 1000,
+        "ping_p99_ms": ping_latencies[max(int(len(ping_latencies) * 0.99) - 1, 0)] * 1000,
+        "ping_max_ms": ping_latencies[-1] * 1000,
+    }
+
+
+async def main(args) -> None:
+    # max_pending above the concurrency, the benchmark measures throughput and not load shedding
+    hasher = PasswordHasher(args.rounds, args.workers, args.concurrency + 1)
+    hashed = hasher.context.hash("correct horse battery staple")
+
+    # before: the login route called the blocking CryptContext.verify
+    async def blocking_handler():
+        assert hasher.context.verify("correct horse battery staple", hashed)
+
+    # after: the login route awaits the pool
+    async def pooled_handler():
+        verified, _ = await hasher.verify_and_update("correct horse battery staple", hashed)
+        assert verified
+
+    for name, handler in (("before (on the loop)", blocking_handler), ("after (hasher pool)", pooled_handler)):
+        stats = await run(handler, args)
+        print(f"{name:22} {stats['rps']:7.1f} logins/s   login p50 {stats['login_p50_ms']:8.1f} ms"
+              f"   ping p50 {stats['ping_p50_ms']:7.2f} ms   p99 {stats['ping_p99_ms']:7.2f} ms"
+              f"   max {stats['ping_max_ms']:7.2f} ms")
+
+    status = hasher.status()
+    print(f"pool: {args.workers} workers, queue wait avg {status['avg_queue_ms']:.1f} ms"
+          f"   max {status['max_queue_ms']:.1f} ms")
+    hasher.executor.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,85 @@
+"""
+Latency added to a request by rate limiting, a Redis round trip per request against the local token buckets.
+
+fastapi_limiter ran a Lua script in Redis on every request, a counter incremented and given an expiry. The
+"before" mode makes the same round trip, INCR and PEXPIRE in one pipeline. The "after" mode calls the
+RateLimiter dependency, which decides in process, and the synchronizations of the buckets with Redis are timed
+apart and spread over the requests they covered. Requests come from many users, each on the same route.
+
+Without --redis-url an in-process fake Redis is used, which has no network and so flatters the round trip.
+
+Usage:
+    python -m benchmarks.bench_rate_limit --users 1000 --requests 100000 --redis-url redis://localhost:6379/0
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+
+from src.database.models import User
+from src.services.rate_limit import RateLimiter, rate_limits
+
+
+def percentiles(latencies: list[float]) -> str:
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1e6
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1e6
+    return f"p50 {p50:8.2f} us   p99 {p99:8.2f} us   max {latencies[-1] * 1e6:9.2f} us"
+
+
+async def main(args) -> None:
+    if args.redis_url:
+        from redis import asyncio as aioredis
+        redis = aioredis.from_url(args.redis_url)
+    else:
+        from fakeredis.aioredis import FakeRedis
+        redis = FakeRedis()
+
+    route = APIRoute("/contacts/", endpoint=lambda: None)
+    request = Request({"type": "http", "method": "GET", "path": "/contacts/", "headers": [], "route": route})
+    users = [User(id=i) for i in range(args.users)]
+    # high enough that no request is refused, the benchmark measures the decision and not the 429
+    limiter = RateLimiter(times=args.requests, seconds=60)
+
+    before = []
+    for i in range(args.requests):
+        started = time.perf_counter()
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.incr(f"bench:{users[i % args.users].id}:/contacts/")
+            pipe.pexpire(f"bench:{users[i % args.users].id}:/contacts/", 60000)
+            await pipe.execute()
+        before.append(time.perf_counter() - started)
+
+    rate_limits.clear()
+    rate_limits.connect(redis)
+    after = []
+    sync_time = 0.0
+    syncs = 0
+    for i in range(args.requests):
+        started = time.perf_counter()
+        await limiter(request, current_user=users[i % args.users])
+        after.append(time.perf_counter() - started)
+        if (i + 1) % args.sync_every == 0:
+            started = time.perf_counter()
+            await rate_limits.sync()
+            sync_time += time.perf_counter() - started
+            syncs += 1
+
+    print(f"{args.users} users, {args.requests} requests")
+    print(f"before (Redis per request)   {percentiles(before)}")
+    print(f"after (local buckets)        {percentiles(after)}")
+    print(f"after, synchronization       {syncs} syncs of up to {args.users} buckets,"
+          f" {sync_time / syncs * 1e3:.2f} ms each, {sync_time / args.requests * 1e6:.2f} us per request")
+    await redis.flushdb()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=100000)
+    # requests per synchronization, at 0.5 s between synchronizations that is 2000 requests per second
+    parser.add_argument("--sync-every", type=int, default=1000)
+    parser.add_argument("--redis-url")
+    asyncio.run(main(parser.parse_args()))
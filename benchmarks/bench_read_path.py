@@ -0,0 +1,103 @@
+"""
+Per-row cost of a contact list page, the ORM and pydantic path against the row and orjson path.
+
+One user is seeded with a page worth of contacts. The page is then read and serialized repeatedly, once the way
+the list endpoints used to do it, select(Contact) validated through List[ContactResponse] by FastAPI, and once the
+way they do it now, repository rows serialized by contacts_json. Fetch and serialization are timed separately and
+both paths are checked to produce the same bytes.
+
+Usage:
+    python -m benchmarks.bench_read_path --limits 100 1000 --rounds 50 --url postgresql+asyncpg://...
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import date
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from src.database.models import Base, Contact, User
+from src.repository.contacts import get_contacts
+from src.schemas import ContactResponse
+from src.services.contact_json import contacts_json
+
+RESPONSE_FIELD = create_response_field(name="Response_read_contacts", type_=List[ContactResponse])
+
+
+async def orm_page(db, limit: int) -> list[Contact]:
+    # the query get_contacts ran before it selected plain rows
+    result = await db.execute(select(Contact).filter(Contact.user_id == 1).order_by(Contact.id).limit(limit))
+    return result.scalars().all()
+
+
+async def orm_json(contacts: list[Contact]) -> bytes:
+    # what FastAPI does with the return value of an endpoint with response_model=List[ContactResponse]
+    content = await serialize_response(field=RESPONSE_FIELD, response_content=contacts)
+    return JSONResponse(content).body
+
+
+async def timed(rounds: int, func, *args) -> tuple[float, object]:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        value = await func(*args)
+    return (time.perf_counter() - started) / rounds, value
+
+
+async def bench(url: str, limit: int, rounds: int) -> None:
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [{"id": 1, "email": "bench@example.com", "password": "x"}])
+        await conn.execute(insert(Contact), [
+            {"first_name": f"First{i}", "last_name": f"Last{i}", "email": f"c{i}@example.com",
+             "phone_number": "+380501234567" if i % 2 else None,
+             "birthday": date(1990, 1 + i % 12, 1 + i % 28) if i % 3 else None, "user_id": 1}
+            for i in range(limit)
+        ])
+
+    async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+        # a fresh session per round would also pay for the identity map, a shared one is the kinder comparison
+        async def orm_fetch():
+            contacts = await orm_page(db, limit)
+            db.expunge_all()
+            return contacts
+
+        async def rows_json(rows):
+            return contacts_json(rows)
+
+        orm_fetch_time, contacts = await timed(rounds, orm_fetch)
+        orm_json_time, orm_body = await timed(rounds, orm_json, contacts)
+        rows_fetch_time, rows = await timed(rounds, get_contacts, 0, limit, User(id=1), db)
+        rows_json_time, rows_body = await timed(rounds, rows_json, rows)
+    assert orm_body == rows_body, "the two paths must write the same bytes"
+
+    for name, fetch, serialize in (("orm + pydantic", orm_fetch_time, orm_json_time),
+                                   ("rows + orjson", rows_fetch_time, rows_json_time)):
+        print(f"{limit:>6} rows   {name:<15} fetch {fetch / limit * 1e6:7.2f} us/row"
+              f"   serialize {serialize / limit * 1e6:7.2f} us/row   total {(fetch + serialize) * 1e3:8.2f} ms/page")
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+async def main(args) -> None:
+    url = args.url or f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    for limit in args.limits:
+        await bench(url, limit, args.rounds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limits", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--url")
+    asyncio.run(main(parser.parse_args()))
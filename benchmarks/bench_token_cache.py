@@ -0,0 +1,48 @@
+"""
+Per-request cost of resolving a bearer token, jwt.decode on every request against the verified token cache.
+
+A number of users each present their access token repeatedly, the way a client does within the lifetime of
+the token. Both modes resolve every presentation to its payload, once with the signature and claims verified
+every time and once through Auth.decode_token, which verifies a token the first time it is presented.
+
+Usage:
+    python -m benchmarks.bench_token_cache --users 1000 --repeats 100
+"""
+import argparse
+import asyncio
+import time
+
+from jose import jwt
+
+from src.services.auth import auth_service
+
+
+def timed(tokens: list[str], decode) -> float:
+    started = time.perf_counter()
+    for token in tokens:
+        decode(token)
+    return (time.perf_counter() - started) / len(tokens)
+
+
+async def main(args) -> None:
+    users = [await auth_service.create_access_token(data={"sub": f"user{i}@example.com"}) for i in range(args.users)]
+    # the order in which the requests of all users arrive
+    tokens = users * args.repeats
+    auth_service.token_cache.clear()
+
+    def verify(token):
+        return jwt.decode(token, auth_service.SECRET_KEY, algorithms=[auth_service.ALGORITHM])
+
+    verified = timed(tokens, verify)
+    cached = timed(tokens, auth_service.decode_token)
+    status = auth_service.token_cache.status()
+    print(f"{args.users} users x {args.repeats} requests, cache hit ratio {status['hit_ratio']:.3f}")
+    print(f"jwt.decode every request   {verified * 1e6:8.2f} us/request")
+    print(f"verified token cache       {cached * 1e6:8.2f} us/request   saves {(verified - cached) * 1e6:8.2f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=100)
+    asyncio.run(main(parser.parse_args()))
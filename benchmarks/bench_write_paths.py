@@ -0,0 +1,110 @@
+"""
+Writes per second of the contact write paths, before and after RETURNING.
+
+"before" replays the old repository code: INSERT + COMMIT + refresh SELECT, SELECT + dirty-tracking UPDATE,
+SELECT + DELETE. "after" calls the current repository functions, one statement and one commit each.
+Every mode creates, updates and deletes the same number of contacts from concurrent tasks.
+
+Usage:
+    python -m benchmarks.bench_write_paths --writes 2000 --concurrency 20 --url postgresql+asyncpg://...
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from src.database.models import Base, Contact, User
+from src.repository import contacts as repository_contacts
+from src.schemas import ContactModel
+
+
+async def old_create(body: ContactModel, user: User, db) -> Contact:
+    contact = Contact(**body.dict(), user_id=user.id)
+    db.add(contact)
+    await db.commit()
+    await db.refresh(contact)
+    return contact
+
+
+async def old_get(contact_id: int, user: User, db) -> Contact | None:
+    result = await db.execute(select(Contact).filter(Contact.id == contact_id, Contact.user_id == user.id))
+    return result.scalars().first()
+
+
+async def old_update(contact_id: int, body: ContactModel, user: User, db) -> Contact | None:
+    contact = await old_get(contact_id, user, db)
+    if contact:
+        for field, value in body.dict().items():
+            setattr(contact, field, value)
+        await db.commit()
+    return contact
+
+
+async def old_remove(contact_id: int, user: User, db) -> Contact | None:
+    contact = await old_get(contact_id, user, db)
+    if contact:
+        await db.delete(contact)
+        await db.commit()
+    return contact
+
+
+MODES = {
+    "before": (old_create, old_update, old_remove),
+    "after": (repository_contacts.create_contact, repository_contacts.update_contact, repository_contacts.remove_contact),
+}
+
+
+async def run(Session, mode: str, args) -> None:
+    create, update, remove = MODES[mode]
+    user = User(id=1)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int) -> list[float]:
+        body = ContactModel(first_name=f"First{i}", last_name=f"Last{i}", email=f"c{i}@example.com")
+        async with semaphore, Session() as db:
+            timings = []
+            started = time.perf_counter()
+            contact = await create(body, user, db)
+            timings.append(time.perf_counter() - started)
+            body.first_name = f"Renamed{i}"
+            started = time.perf_counter()
+            await update(contact.id, body, user, db)
+            timings.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            await remove(contact.id, user, db)
+            timings.append(time.perf_counter() - started)
+            return timings
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(args.writes)))
+    elapsed = time.perf_counter() - started
+    per_op = [sum(timings[op] for timings in results) / len(results) * 1000 for op in range(3)]
+    print(f"{mode:7} {3 * args.writes / elapsed:9.0f} writes/s   create {per_op[0]:6.2f} ms   "
+          f"update {per_op[1]:6.2f} ms   delete {per_op[2]:6.2f} ms")
+
+
+async def main(args) -> None:
+    url = args.url or f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    engine = create_async_engine(url, pool_size=args.concurrency)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [{"id": 1, "email": "bench@example.com", "password": "x"}])
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    for mode in ("before", "after"):
+        await run(Session, mode, args)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--url")
+    asyncio.run(main(parser.parse_args()))
@@ -2,10 +2,16 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
 
 from main import app
-from src.database.models import Base
+from src.database.models import Base, User
 from src.database.db import get_db
+from src.services.auth import auth_service
+from src.services.contact_cache import contact_cache
+from src.services.identity_cache import identity_cache
+from src.services.rate_limit import RateLimiter
 
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -15,6 +21,11 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The app itself talks to the same file through the non-blocking driver.
+# NullPool keeps aiosqlite connections from outliving the TestClient event loop.
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+AsyncTestingSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 @pytest.fixture(scope="module")
 def session():
@@ -34,17 +45,35 @@ def session():
 def client(session):
     # Dependency override
 
-    def override_get_db():
-        try:
-            yield session
-        finally:
-            session.close()
+    async def override_get_db():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
 
     app.dependency_overrides[get_db] = override_get_db
+    # every module starts with a new database, reads cached for the previous one must not leak into it
+    contact_cache.clear()
+    identity_cache.clear()
+
+    # Rate limits are not under test here, the requests of a module would exhaust them
+    for route in app.routes:
+        for dependency in getattr(route, 'dependencies', []):
+            if isinstance(dependency.dependency, RateLimiter):
+                app.dependency_overrides[dependency.dependency] = lambda: None
 
     yield TestClient(app)
 
 
 @pytest.fixture(scope="module")
 def user():
-    return {"username": "deadpool", "email": "deadpool@example.com", "password": "123456789"}
\ No newline at end of file
+    return {"username": "deadpool", "email": "deadpool@example.com", "password": "123456789"}
+
+
+@pytest.fixture(scope="module")
+def token(client, session, user):
+    # A confirmed account that is logged in through the API
+
+    session.add(User(username=user["username"], email=user["email"],
+                     password=auth_service.get_password_hash(user["password"]), confirmed=True))
+    session.commit()
+    response = client.post("/api/auth/login", data={"username": user["email"], "password": user["password"]})
+    return response.json()["access_token"]
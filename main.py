@@ -1,16 +1,26 @@
+import asyncio
+
 import redis.asyncio as redis
-from fastapi import FastAPI
-from fastapi_limiter import FastAPILimiter
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
-from src.routes import contacts, auth, users
+from src.routes import contacts, auth, users, monitoring
 from src.conf.config import settings
+from src.database.db import engine
+from src.database.replicas import replica_router
+from src.services.auth import auth_service
+from src.services.autocomplete import autocomplete_cache
+from src.services.contact_cache import contact_cache
+from src.services.identity_cache import identity_cache
+from src.services.rate_limit import rate_limits
+from src.services.sessions import refresh_sessions
 
 app = FastAPI()
 
 app.include_router(contacts.router, prefix='/api')
 app.include_router(auth.router, prefix='/api')
 app.include_router(users.router, prefix='/api')
+app.include_router(monitoring.router, prefix='/api')
 
 # CORS domains
 origins = [
@@ -23,20 +33,79 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "Content-Disposition", "ETag"],
 )
 
 
+@app.middleware("http")
+async def flush_replica_pins(request: Request, call_next):
+    """
+The flush_replica_pins function holds back a response until the replica pins of its writes are in Redis,
+    so the next request of the user reads what it wrote on whichever worker it lands.
+
+:param request: Request: The request
+:param call_next: Calls the app
+:return: The response
+    """
+    response = await call_next(request)
+    await replica_router.flush()
+    return response
+
+
 @app.on_event("startup")
 async def startup():
     """
 The startup function is called when the application starts up.
     It's a good place to initialize things that are used by the app, such as databases or caches.
 
-:return: FastAPILimiter(RedisConnection)
+:return: None
+    """
+    # the caches, the sessions, the rate limits and the replica pins share one client, the caches store bytes so it does not decode
+    cache_redis = redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0)
+    app.state.cache_listeners = []
+    for cache in (contact_cache, identity_cache):
+        cache.connect(cache_redis)
+        app.state.cache_listeners.append(asyncio.create_task(cache.listen()))
+    # the autocomplete indexes follow the writes the contact cache publishes
+    autocomplete_cache.connect(cache_redis)
+    app.state.cache_listeners.append(
+        asyncio.create_task(autocomplete_cache.listen(contact_cache.channel, contact_cache.origin)))
+    # and the verified tokens are revoked with the writes to the accounts the identity cache publishes
+    auth_service.token_cache.connect(cache_redis)
+    app.state.cache_listeners.append(
+        asyncio.create_task(auth_service.token_cache.listen(identity_cache.channel, identity_cache.origin)))
+    refresh_sessions.connect(cache_redis)
+    rate_limits.connect(cache_redis)
+    replica_router.connect(cache_redis)
+    app.state.rate_limit_sync = asyncio.create_task(rate_limits.run())
+    if replica_router.engines:
+        app.state.replica_monitor = asyncio.create_task(replica_router.monitor())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """
+The shutdown function is called when the application stops.
+    It stops the replica health checks, the cache invalidations and the rate limit synchronization,
+    and closes the connection pools of the primary and the replicas.
+
+:return: None
     """
-    r = await redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0, encoding="utf-8",
-                          decode_responses=True)
-    await FastAPILimiter.init(r)
+    for task in [*getattr(app.state, 'cache_listeners', []), getattr(app.state, 'rate_limit_sync', None)]:
+        if task is not None:
+            task.cancel()
+    if contact_cache.redis is not None:
+        await contact_cache.redis.close()
+    for cache in (contact_cache, identity_cache, autocomplete_cache, auth_service.token_cache):
+        cache.connect(None)
+    refresh_sessions.connect(None)
+    rate_limits.connect(None)
+    replica_router.connect(None)
+    monitor = getattr(app.state, 'replica_monitor', None)
+    if monitor is not None:
+        monitor.cancel()
+    await replica_router.dispose()
+    await engine.dispose()
 
 
 @app.get('/')
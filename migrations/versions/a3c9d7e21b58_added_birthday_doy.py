@@ -0,0 +1,35 @@
+"""added birthday_doy
+
+Revision ID: a3c9d7e21b58
+Revises: 5b7e2c1a9f04
+Create Date: 2026-10-17 11:40:05.613927
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c9d7e21b58'
+down_revision = '5b7e2c1a9f04'
+branch_labels = None
+depends_on = None
+
+BIRTHDAY_DOY = (
+    "CASE CAST(EXTRACT(month FROM birthday) AS INTEGER) "
+    "WHEN 1 THEN 0 WHEN 2 THEN 31 WHEN 3 THEN 60 WHEN 4 THEN 91 WHEN 5 THEN 121 WHEN 6 THEN 152 "
+    "WHEN 7 THEN 182 WHEN 8 THEN 213 WHEN 9 THEN 244 WHEN 10 THEN 274 WHEN 11 THEN 305 WHEN 12 THEN 335 END "
+    "+ CAST(EXTRACT(day FROM birthday) AS INTEGER)"
+)
+
+
+def upgrade() -> None:
+    # A stored generated column is computed for the existing rows when it is added, which backfills it
+    op.add_column('contacts', sa.Column('birthday_doy', sa.SmallInteger(),
+                                        sa.Computed(BIRTHDAY_DOY, persisted=True), nullable=True))
+    op.create_index('ix_contacts_user_id_birthday_doy', 'contacts', ['user_id', 'birthday_doy'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_birthday_doy', table_name='contacts')
+    op.drop_column('contacts', 'birthday_doy')
@@ -0,0 +1,33 @@
+"""Added phone_e164
+
+Revision ID: a9d3e6b24c17
+Revises: f2a7c5d19b3e
+Create Date: 2026-10-17 20:14:52.318406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from src.repository.phone_utils import normalize_phone_expr
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d3e6b24c17'
+down_revision = 'f2a7c5d19b3e'
+branch_labels = None
+depends_on = None
+
+# The expression of the model, so the trunk prefix gets the phone_country_code setting here as well
+PHONE_E164 = normalize_phone_expr(sa.column('phone_number'))
+
+
+def upgrade() -> None:
+    # A stored generated column is computed for the existing rows when it is added, which backfills it
+    op.add_column('contacts', sa.Column('phone_e164', sa.String(length=16),
+                                        sa.Computed(PHONE_E164, persisted=True), nullable=True))
+    op.create_index('ix_contacts_user_id_phone_e164', 'contacts', ['user_id', 'phone_e164'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_phone_e164', table_name='contacts')
+    op.drop_column('contacts', 'phone_e164')
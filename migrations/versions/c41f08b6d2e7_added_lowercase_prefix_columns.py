@@ -0,0 +1,38 @@
+"""added lowercase prefix columns
+
+Revision ID: c41f08b6d2e7
+Revises: a3c9d7e21b58
+Create Date: 2026-10-17 13:02:47.208816
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41f08b6d2e7'
+down_revision = 'a3c9d7e21b58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Stored generated columns are computed for the existing rows when they are added
+    op.add_column('contacts', sa.Column('first_name_lower', sa.String(length=25, collation='C'),
+                                        sa.Computed('lower(first_name)', persisted=True), nullable=True))
+    op.add_column('contacts', sa.Column('last_name_lower', sa.String(length=25, collation='C'),
+                                        sa.Computed('lower(last_name)', persisted=True), nullable=True))
+    op.add_column('contacts', sa.Column('email_lower', sa.String(collation='C'),
+                                        sa.Computed('lower(email)', persisted=True), nullable=True))
+    op.create_index('ix_contacts_user_id_first_name_lower', 'contacts', ['user_id', 'first_name_lower'], unique=False)
+    op.create_index('ix_contacts_user_id_last_name_lower', 'contacts', ['user_id', 'last_name_lower'], unique=False)
+    op.create_index('ix_contacts_user_id_email_lower', 'contacts', ['user_id', 'email_lower'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_email_lower', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_last_name_lower', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_first_name_lower', table_name='contacts')
+    op.drop_column('contacts', 'email_lower')
+    op.drop_column('contacts', 'last_name_lower')
+    op.drop_column('contacts', 'first_name_lower')
@@ -0,0 +1,64 @@
+"""Added contact versions
+
+Revision ID: c4f1a8d6e2b7
+Revises: a9d3e6b24c17
+Create Date: 2026-10-17 21:06:11.527093
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4f1a8d6e2b7'
+down_revision = 'a9d3e6b24c17'
+branch_labels = None
+depends_on = None
+
+KEYS = """
+    CROSS JOIN LATERAL (VALUES
+        ('total', ''),
+        ('domain', split_part(changes.email_lower, '@', 2)),
+        ('month', coalesce(extract(month FROM changes.birthday)::integer::text, '')),
+        ('phone', CASE WHEN coalesce(changes.phone_number, '') = '' THEN 'missing' ELSE 'present' END)
+    ) AS keys (dimension, key)
+    WHERE changes.user_id IS NOT NULL
+    GROUP BY changes.user_id, keys.dimension, keys.key
+    HAVING sum(changes.delta) <> 0
+"""
+UPSERT = 'ON CONFLICT (user_id, dimension, key) DO UPDATE SET count = contact_stats.count + excluded.count'
+NEW_ROWS = 'SELECT user_id, email_lower, birthday, phone_number, 1 AS delta FROM new_rows'
+OLD_ROWS = 'SELECT user_id, email_lower, birthday, phone_number, -1 AS delta FROM old_rows'
+
+
+def apply(changes: str, versions: bool) -> str:
+    statement = (f'INSERT INTO contact_stats (user_id, dimension, key, count) '
+                 f'SELECT changes.user_id, keys.dimension, keys.key, sum(changes.delta) FROM ({changes}) AS changes'
+                 f'{KEYS}')
+    if versions:
+        # one more version for every book the statement wrote
+        statement += (f"UNION ALL SELECT changes.user_id, 'version', '', 1 FROM ({changes}) AS changes "
+                      f"WHERE changes.user_id IS NOT NULL GROUP BY changes.user_id ")
+    return f'{statement}ORDER BY 1, 2, 3 {UPSERT}'
+
+
+def refresh_function(versions: bool) -> str:
+    return f"""
+        CREATE OR REPLACE FUNCTION contact_stats_refresh() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN {apply(NEW_ROWS, versions)};
+            ELSIF TG_OP = 'DELETE' THEN {apply(OLD_ROWS, versions)};
+            ELSE {apply(NEW_ROWS + ' UNION ALL ' + OLD_ROWS, versions)};
+            END IF;
+            RETURN NULL;
+        END;
+        $$"""
+
+
+def upgrade() -> None:
+    # the triggers call the function by name, replacing it is enough
+    op.execute(refresh_function(versions=True))
+
+
+def downgrade() -> None:
+    op.execute(refresh_function(versions=False))
+    op.execute("DELETE FROM contact_stats WHERE dimension = 'version'")
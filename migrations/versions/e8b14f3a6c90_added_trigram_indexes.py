@@ -0,0 +1,31 @@
+"""Added trigram indexes
+
+Revision ID: e8b14f3a6c90
+Revises: c41f08b6d2e7
+Create Date: 2026-10-17 15:20:11.482093
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8b14f3a6c90'
+down_revision = 'c41f08b6d2e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_contacts_first_name_lower_trgm', 'contacts', ['first_name_lower'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'first_name_lower': 'gin_trgm_ops'})
+    op.create_index('ix_contacts_last_name_lower_trgm', 'contacts', ['last_name_lower'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'last_name_lower': 'gin_trgm_ops'})
+    op.create_index('ix_contacts_email_lower_trgm', 'contacts', ['email_lower'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'email_lower': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_email_lower_trgm', table_name='contacts')
+    op.drop_index('ix_contacts_last_name_lower_trgm', table_name='contacts')
+    op.drop_index('ix_contacts_first_name_lower_trgm', table_name='contacts')
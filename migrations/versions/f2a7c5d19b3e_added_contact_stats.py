@@ -0,0 +1,73 @@
+"""Added contact stats
+
+Revision ID: f2a7c5d19b3e
+Revises: e8b14f3a6c90
+Create Date: 2026-10-17 18:02:37.904215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a7c5d19b3e'
+down_revision = 'e8b14f3a6c90'
+branch_labels = None
+depends_on = None
+
+KEYS = """
+    CROSS JOIN LATERAL (VALUES
+        ('total', ''),
+        ('domain', split_part(changes.email_lower, '@', 2)),
+        ('month', coalesce(extract(month FROM changes.birthday)::integer::text, '')),
+        ('phone', CASE WHEN coalesce(changes.phone_number, '') = '' THEN 'missing' ELSE 'present' END)
+    ) AS keys (dimension, key)
+    WHERE changes.user_id IS NOT NULL
+    GROUP BY changes.user_id, keys.dimension, keys.key
+    HAVING sum(changes.delta) <> 0
+    ORDER BY 1, 2, 3
+"""
+UPSERT = 'ON CONFLICT (user_id, dimension, key) DO UPDATE SET count = contact_stats.count + excluded.count'
+NEW_ROWS = 'SELECT user_id, email_lower, birthday, phone_number, 1 AS delta FROM new_rows'
+OLD_ROWS = 'SELECT user_id, email_lower, birthday, phone_number, -1 AS delta FROM old_rows'
+
+
+def apply(changes: str) -> str:
+    return (f'INSERT INTO contact_stats (user_id, dimension, key, count) '
+            f'SELECT changes.user_id, keys.dimension, keys.key, sum(changes.delta) FROM ({changes}) AS changes'
+            f'{KEYS}{UPSERT}')
+
+
+def upgrade() -> None:
+    op.create_table('contact_stats',
+                    sa.Column('user_id', sa.Integer(), nullable=False),
+                    sa.Column('dimension', sa.String(length=16), nullable=False),
+                    sa.Column('key', sa.String(), nullable=False),
+                    sa.Column('count', sa.Integer(), nullable=False),
+                    sa.PrimaryKeyConstraint('user_id', 'dimension', 'key')
+                    )
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION contact_stats_refresh() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN {apply(NEW_ROWS)};
+            ELSIF TG_OP = 'DELETE' THEN {apply(OLD_ROWS)};
+            ELSE {apply(NEW_ROWS + ' UNION ALL ' + OLD_ROWS)};
+            END IF;
+            RETURN NULL;
+        END;
+        $$""")
+    # no write may slip in between the backfill and the triggers
+    op.execute('LOCK TABLE contacts IN SHARE ROW EXCLUSIVE MODE')
+    op.execute('CREATE TRIGGER contact_stats_insert AFTER INSERT ON contacts REFERENCING NEW TABLE AS new_rows '
+               'FOR EACH STATEMENT EXECUTE FUNCTION contact_stats_refresh()')
+    op.execute('CREATE TRIGGER contact_stats_update AFTER UPDATE ON contacts '
+               'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+               'FOR EACH STATEMENT EXECUTE FUNCTION contact_stats_refresh()')
+    op.execute('CREATE TRIGGER contact_stats_delete AFTER DELETE ON contacts REFERENCING OLD TABLE AS old_rows '
+               'FOR EACH STATEMENT EXECUTE FUNCTION contact_stats_refresh()')
+    op.execute(apply('SELECT user_id, email_lower, birthday, phone_number, 1 AS delta FROM contacts'))
+
+
+def downgrade() -> None:
+    op.execute('DROP FUNCTION IF EXISTS contact_stats_refresh() CASCADE')
+    op.drop_table('contact_stats')
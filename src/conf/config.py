@@ -3,6 +3,37 @@ from pydantic import BaseSettings
 
 class Settings(BaseSettings):
     sqlalchemy_database_url: str
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    sqlalchemy_replica_urls: list[str] = []
+    replica_pin_seconds: float = 5
+    replica_check_interval: float = 10
+    monitoring_emails: list[str] = []
+    autocomplete_cache_users: int = 1000
+    autocomplete_cache_contacts: int = 20000
+    autocomplete_cache_ttl: float = 60
+    contact_cache_entries: int = 10000
+    contact_cache_ttl: float = 60
+    contact_cache_redis_ttl: float = 600
+    identity_cache_entries: int = 10000
+    identity_cache_ttl: float = 60
+    identity_cache_redis_ttl: float = 600
+    rate_limit_keys: int = 100000
+    rate_limit_sync_interval: float = 0.5
+    import_batch_size: int = 1000
+    # the country calling code of numbers written in the national format, with the 0 trunk prefix. contacts.phone_e164
+    # is generated with it, so changing it takes a migration that adds that column again
+    phone_country_code: str = '380'
+    import_max_errors: int = 100
+    refresh_token_ttl: int = 7 * 24 * 60 * 60
+    token_cache_entries: int = 10000
+    token_cache_ttl: float = 60
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 4
+    password_hash_max_pending: int = 64
     secret_key: str
     algorithm: str
     mail_username: str
@@ -1,16 +1,56 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from src.conf.config import settings
+from src.database.pool import InstrumentedQueuePool
 
-SQLALCHEMY_DATABASE_URL = settings.sqlalchemy_database_url
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def get_async_url(url: str) -> str:
+    """
+The get_async_url function rewrites a database url so that it uses a non-blocking driver.
+    Postgres urls are switched to asyncpg and SQLite urls to aiosqlite, other urls are returned unchanged.
 
-def get_db():
-    db = SessionLocal()
-    try:
+:param url: str: The database url from the settings
+:return: The same url with an async driver
+:rtype: str
+    """
+    url = make_url(url)
+    drivername = ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)
+    return url.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+def get_engine_options(url: str) -> dict:
+    """
+The get_engine_options function builds the pool arguments for create_async_engine from the settings.
+    In-memory SQLite databases live in a single connection, so they keep the default StaticPool.
+
+:param url: str: The database url
+:return: Keyword arguments for create_async_engine
+:rtype: dict
+    """
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return {}
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': settings.db_pool_size,
+        'max_overflow': settings.db_max_overflow,
+        'pool_timeout': settings.db_pool_timeout,
+        'pool_recycle': settings.db_pool_recycle,
+        'pool_pre_ping': settings.db_pool_pre_ping,
+    }
+
+
+SQLALCHEMY_DATABASE_URL = get_async_url(settings.sqlalchemy_database_url)
+engine = create_async_engine(SQLALCHEMY_DATABASE_URL, **get_engine_options(SQLALCHEMY_DATABASE_URL))
+
+SessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,82 @@
+from typing import Callable, Iterable
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+CHANGED_USERS_KEY = 'contacts_changed'
+CHANGED_ACCOUNTS_KEY = 'users_changed'
+
+_listeners: list[Callable[[set[int]], None]] = []
+_account_listeners: list[Callable[[set[str]], None]] = []
+
+
+def on_contacts_changed(listener: Callable[[set[int]], None]) -> Callable[[set[int]], None]:
+    """
+The on_contacts_changed function registers a listener that is called with the ids of the users whose contacts
+    were written, right after the transaction that wrote them has been committed. Listeners must not block.
+
+:param listener: Callable[[set[int]], None]: The function to call
+:return: The listener, so the function can be used as a decorator
+    """
+    _listeners.append(listener)
+    return listener
+
+
+def mark_contacts_changed(db: AsyncSession, user_ids: int | Iterable[int]) -> None:
+    """
+The mark_contacts_changed function records in the session that the contacts of a user are being written.
+    The listeners are notified once the session commits, and never when it rolls back.
+
+:param db: AsyncSession: The session that writes the contacts
+:param user_ids: int | Iterable[int]: The owner or owners of the contacts
+:return: None
+    """
+    changed = db.info.setdefault(CHANGED_USERS_KEY, set())
+    if isinstance(user_ids, int):
+        changed.add(user_ids)
+    else:
+        changed.update(user_ids)
+
+
+def on_users_changed(listener: Callable[[set[str]], None]) -> Callable[[set[str]], None]:
+    """
+The on_users_changed function registers a listener that is called with the emails of the users whose accounts
+    were written, right after the transaction that wrote them has been committed. Listeners must not block.
+
+:param listener: Callable[[set[str]], None]: The function to call
+:return: The listener, so the function can be used as a decorator
+    """
+    _account_listeners.append(listener)
+    return listener
+
+
+def mark_users_changed(db: AsyncSession, emails: str | Iterable[str]) -> None:
+    """
+The mark_users_changed function records in the session that the accounts of users are being written.
+    The listeners are notified once the session commits, and never when it rolls back.
+
+:param db: AsyncSession: The session that writes the accounts
+:param emails: str | Iterable[str]: The email or emails of the users
+:return: None
+    """
+    changed = db.info.setdefault(CHANGED_ACCOUNTS_KEY, set())
+    if isinstance(emails, str):
+        changed.add(emails)
+    else:
+        changed.update(emails)
+
+
+@event.listens_for(Session, 'after_commit')
+def _notify_listeners(session: Session) -> None:
+    for key, listeners in ((CHANGED_USERS_KEY, _listeners), (CHANGED_ACCOUNTS_KEY, _account_listeners)):
+        changed = session.info.pop(key, None)
+        if changed:
+            for listener in listeners:
+                listener(changed)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changes(session: Session) -> None:
+    session.info.pop(CHANGED_USERS_KEY, None)
+    session.info.pop(CHANGED_ACCOUNTS_KEY, None)
@@ -1,11 +1,34 @@
-from sqlalchemy import Column, Integer, String, Date, Boolean
+from sqlalchemy import Column, Integer, SmallInteger, String, Date, Boolean, Index, Computed, func, DDL, event, table, column
+from sqlalchemy.engine import Engine
 # from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql.schema import ForeignKey
 from sqlalchemy.orm import relationship, declarative_base
 
+from src.repository.birthday_utils import birthday_doy_expr
+from src.repository.phone_utils import normalize_phone_expr
+from src.repository.search_utils import similarity
+from src.database.stats import SQLITE_TRIGGERS, POSTGRESQL_TRIGGERS, POSTGRESQL_DROP
+
 Base = declarative_base()
 
 
+def prefix_string(length: int | None = None) -> String:
+    # Byte-wise collation on Postgres so that prefix range scans match what Python considers a prefix
+    return String(length).with_variant(String(length, collation='C'), 'postgresql')
+
+
+def has_pg_trgm(ddl, target, bind, **kw) -> bool:
+    # Trigram indexes need the pg_trgm extension, the migrations install it
+    if bind is None:
+        return True
+    return bind.exec_driver_sql("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'").first() is not None
+
+
+def trigram_index(name: str, column: str) -> Index:
+    return Index(name, column, postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'}) \
+        .ddl_if(dialect='postgresql', callable_=has_pg_trgm)
+
+
 class Contact(Base):
     __tablename__ = "contacts"
     id = Column(Integer, primary_key=True)
@@ -14,9 +37,88 @@ class Contact(Base):
     email = Column(String, nullable=False)
     phone_number = Column(String(13))
     birthday = Column(Date)
+    # Lowercase copies for case-insensitive prefix search, maintained by the database on every write
+    first_name_lower = Column(prefix_string(25), Computed(func.lower(first_name), persisted=True))
+    last_name_lower = Column(prefix_string(25), Computed(func.lower(last_name), persisted=True))
+    email_lower = Column(prefix_string(), Computed(func.lower(email), persisted=True))
+    # Day of year of the birthday in a leap year calendar, maintained by the database on every write
+    birthday_doy = Column(SmallInteger, Computed(birthday_doy_expr(birthday), persisted=True))
+    # The phone number in E.164 form for lookups by number, maintained by the database on every write
+    phone_e164 = Column(String(16), Computed(normalize_phone_expr(phone_number), persisted=True))
     user_id = Column('user_id', ForeignKey('users.id', ondelete='CASCADE'), default=None)
     user = relationship('User', backref='contacts')
 
+    __table_args__ = (
+        Index('ix_contacts_user_id_id', 'user_id', 'id'),
+        Index('ix_contacts_user_id_last_name_first_name', 'user_id', 'last_name', 'first_name'),
+        Index('ix_contacts_user_id_first_name', 'user_id', 'first_name'),
+        Index('ix_contacts_user_id_email', 'user_id', 'email'),
+        Index('ix_contacts_user_id_birthday_doy', 'user_id', 'birthday_doy'),
+        Index('ix_contacts_user_id_first_name_lower', 'user_id', 'first_name_lower'),
+        Index('ix_contacts_user_id_last_name_lower', 'user_id', 'last_name_lower'),
+        Index('ix_contacts_user_id_email_lower', 'user_id', 'email_lower'),
+        Index('ix_contacts_user_id_phone_e164', 'user_id', 'phone_e164'),
+        trigram_index('ix_contacts_first_name_lower_trgm', 'first_name_lower'),
+        trigram_index('ix_contacts_last_name_lower_trgm', 'last_name_lower'),
+        trigram_index('ix_contacts_email_lower_trgm', 'email_lower'),
+    )
+
+
+class ContactStat(Base):
+    # One counter of a user's book, maintained by the triggers of src.database.stats.
+    # No foreign key: the triggers still run while a deleted user's contacts are cascaded away.
+    __tablename__ = 'contact_stats'
+    user_id = Column(Integer, primary_key=True)
+    dimension = Column(String(16), primary_key=True)
+    key = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False)
+
+
+# SQLite has no pg_trgm: fuzzy search finds candidates with an FTS5 trigram index kept in sync by triggers
+# and scores them with the Python similarity function registered on every SQLite connection.
+contacts_fts = table('contacts_fts', column('rowid'), column('terms'))
+
+
+def fts_terms(row: str) -> str:
+    email_words = f"replace(replace({row}.email, '@', ' '), '.', ' ')"
+    return f"' ' || {row}.first_name || ' ' || {row}.last_name || ' ' || {email_words} || ' '"
+
+
+for statement in (
+    "CREATE VIRTUAL TABLE contacts_fts USING fts5(terms, tokenize = 'trigram')",
+    "CREATE TRIGGER contacts_fts_insert AFTER INSERT ON contacts BEGIN "
+    "INSERT INTO contacts_fts (rowid, terms) VALUES (new.id, " + fts_terms('new') + "); END",
+    "CREATE TRIGGER contacts_fts_delete AFTER DELETE ON contacts BEGIN "
+    "DELETE FROM contacts_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER contacts_fts_update AFTER UPDATE OF id, first_name, last_name, email ON contacts BEGIN "
+    "UPDATE contacts_fts SET rowid = new.id, terms = " + fts_terms('new') + " WHERE rowid = old.id; END",
+):
+    event.listen(Contact.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(Contact.__table__, 'before_drop', DDL('DROP TABLE IF EXISTS contacts_fts').execute_if(dialect='sqlite'))
+
+# The contact_stats counters follow every write to contacts, the metadata events run once all tables exist
+for statement in SQLITE_TRIGGERS:
+    event.listen(Base.metadata, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+for statement in POSTGRESQL_TRIGGERS:
+    event.listen(Base.metadata, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+event.listen(Base.metadata, 'after_drop', DDL(POSTGRESQL_DROP).execute_if(dialect='postgresql'))
+
+
+def unicode_lower(value):
+    # the lower of SQLite folds ASCII letters only, str.lower folds every script as PostgreSQL does
+    return value.lower() if isinstance(value, str) else value
+
+
+@event.listens_for(Engine, 'connect')
+def register_sqlite_functions(dbapi_connection, connection_record) -> None:
+    # sqlite3 connections and the aiosqlite adapter of SQLAlchemy, other drivers have no create_function
+    if type(dbapi_connection).__module__.rpartition('.')[2] not in ('sqlite3', 'aiosqlite'):
+        return
+    dbapi_connection.create_function('similarity', 2, similarity, deterministic=True)
+    dbapi_connection.create_function('greatest', -1, max, deterministic=True)
+    # replaces the built-in, so the *_lower columns match the queries lowercased in Python
+    dbapi_connection.create_function('lower', 1, unicode_lower, deterministic=True)
+
 
 class User(Base):
     __tablename__ = 'users'
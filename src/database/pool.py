@@ -0,0 +1,86 @@
+import time
+from bisect import bisect_left
+
+from sqlalchemy import exc
+from sqlalchemy.pool import Pool, AsyncAdaptedQueuePool
+
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolStats:
+    """
+The PoolStats class collects checkout wait times and checkout timeouts of a connection pool.
+    Wait times are kept as a non-cumulative histogram with the bucket bounds from WAIT_BUCKETS_MS.
+    """
+
+    def __init__(self, buckets: tuple = WAIT_BUCKETS_MS):
+        self.buckets = buckets
+        self.reset()
+
+    def reset(self) -> None:
+        self.wait_counts = [0] * (len(self.buckets) + 1)
+        self.wait_total = 0.0
+        self.checkouts = 0
+        self.timeouts = 0
+
+    def observe_wait(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.wait_total += seconds
+        self.wait_counts[bisect_left(self.buckets, seconds * 1000)] += 1
+
+    def histogram(self) -> dict:
+        labels = [f'<={bound}ms' for bound in self.buckets] + [f'>{self.buckets[-1]}ms']
+        return dict(zip(labels, self.wait_counts))
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+The InstrumentedQueuePool class is the regular async queue pool that records into a PoolStats object
+    how long every checkout waited for a connection and how many checkouts timed out.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.observe_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+def get_pool_status(pool: Pool) -> dict:
+    """
+The get_pool_status function returns a snapshot of the pool pressure.
+
+:param pool: Pool: The pool of the engine
+:return: Pool size, connections in use, overflow in use and, for instrumented pools, wait times and timeouts
+:rtype: dict
+    """
+    status = {'pool_class': type(pool).__name__}
+    if hasattr(pool, 'checkedout'):
+        status.update({
+            'pool_size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': max(pool.overflow(), 0),
+        })
+    stats = getattr(pool, 'stats', None)
+    if stats is not None:
+        status.update({
+            'checkouts': stats.checkouts,
+            'checkout_timeouts': stats.timeouts,
+            'wait_ms_total': round(stats.wait_total * 1000, 3),
+            'wait_ms_histogram': stats.histogram(),
+        })
+    return status
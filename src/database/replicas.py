@@ -0,0 +1,150 @@
+import asyncio
+import itertools
+import time
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from src.conf.config import settings
+from src.database.db import get_async_url, get_engine_options
+from src.database.events import on_contacts_changed
+
+
+class ReplicaRouter:
+    """
+The ReplicaRouter class spreads read-only sessions over the configured read replicas.
+    Replicas are picked round-robin among the ones that passed the last health check. A user is pinned to the
+    primary for pin_seconds after their own write, so they always read what they wrote. Pins are kept in this
+    worker and, once connected, in Redis for the other workers, which may serve the user's next request.
+    """
+
+    def __init__(self, urls: list[str], pin_seconds: float = 5, check_interval: float = 10,
+                 check_timeout: float = 2, prefix: str = 'replicas'):
+        urls = [get_async_url(url) for url in urls]
+        self.engines = [create_async_engine(url, **get_engine_options(url)) for url in urls]
+        self.sessionmakers = [async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+                              for engine in self.engines]
+        self.healthy = [True] * len(self.engines)
+        self.pin_seconds = pin_seconds
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self.prefix = prefix
+        self.redis: aioredis.Redis | None = None
+        self._pins: dict[int, float] = {}
+        self._pending: set[asyncio.Task] = set()
+        self._counter = itertools.count()
+
+    def connect(self, redis: aioredis.Redis | None) -> None:
+        self.redis = redis
+
+    def _pin_key(self, user_id: int) -> str:
+        return f'{self.prefix}:pin:{user_id}'
+
+    def pin(self, user_id: int) -> None:
+        """
+The pin function sends the reads of a user to the primary for the next pin_seconds.
+    It is called once the write has been committed: this worker is pinned right away, Redis in the background,
+    which flush waits for.
+
+:param user_id: int: The user who has just written
+:return: None
+        """
+        now = time.monotonic()
+        if len(self._pins) > 10000:
+            self._pins = {key: until for key, until in self._pins.items() if until > now}
+        self._pins[user_id] = now + self.pin_seconds
+        if self.redis is None or self.pin_seconds <= 0:
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(self._pin_redis(user_id))
+        except RuntimeError:
+            # committed outside of the event loop, only this worker is pinned
+            return
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _pin_redis(self, user_id: int) -> None:
+        try:
+            await self.redis.set(self._pin_key(user_id), 1, px=max(int(self.pin_seconds * 1000), 1))
+        except (RedisError, OSError):
+            pass
+
+    async def flush(self) -> None:
+        """
+The flush function waits until the pins of the writes made so far are in Redis.
+
+:return: None
+        """
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    async def is_pinned(self, user_id: int) -> bool:
+        """
+The is_pinned function tells whether a user has written in the last pin_seconds, through any worker.
+    When Redis cannot be asked the user is taken as pinned, as the primary is always up to date.
+
+:param user_id: int: The user who is reading
+:return: True when the reads of the user must go to the primary
+:rtype: bool
+        """
+        until = self._pins.get(user_id)
+        if until is not None and until > time.monotonic():
+            return True
+        if self.redis is None:
+            return False
+        try:
+            return bool(await self.redis.exists(self._pin_key(user_id)))
+        except (RedisError, OSError):
+            return True
+
+    async def choose(self, user_id: int | None = None) -> async_sessionmaker | None:
+        """
+The choose function picks the session factory of a healthy replica for the next read.
+
+:param user_id: int | None: The user who is reading
+:return: A session factory of a replica, or None when the read must go to the primary
+:rtype: async_sessionmaker | None
+        """
+        healthy = [index for index, ok in enumerate(self.healthy) if ok]
+        if not healthy:
+            return None
+        if user_id is not None and await self.is_pinned(user_id):
+            return None
+        return self.sessionmakers[healthy[next(self._counter) % len(healthy)]]
+
+    async def _ping(self, index: int) -> None:
+        async with self.engines[index].connect() as conn:
+            await conn.execute(text('SELECT 1'))
+
+    async def check_health(self) -> None:
+        for index in range(len(self.engines)):
+            try:
+                await asyncio.wait_for(self._ping(index), self.check_timeout)
+                self.healthy[index] = True
+            except Exception:
+                self.healthy[index] = False
+
+    async def monitor(self) -> None:
+        while True:
+            await self.check_health()
+            await asyncio.sleep(self.check_interval)
+
+    def status(self) -> list[dict]:
+        return [{'url': engine.url.render_as_string(hide_password=True), 'healthy': healthy}
+                for engine, healthy in zip(self.engines, self.healthy)]
+
+    async def dispose(self) -> None:
+        for engine in self.engines:
+            await engine.dispose()
+
+
+replica_router = ReplicaRouter(settings.sqlalchemy_replica_urls, pin_seconds=settings.replica_pin_seconds,
+                               check_interval=settings.replica_check_interval)
+
+
+@on_contacts_changed
+def pin_writers(user_ids: set[int]) -> None:
+    for user_id in user_ids:
+        replica_router.pin(user_id)
@@ -0,0 +1,95 @@
+"""
+Triggers that keep contact_stats in step with contacts.
+
+Every contact adds 1 to four rows of its owner: ('total', ''), ('domain', <email domain>),
+('month', <birth month or ''>) and ('phone', 'present' or 'missing'). The triggers apply the
+difference of every INSERT, UPDATE and DELETE, whichever code path runs it (ORM, bulk DML, COPY),
+so reading the statistics never scans the contacts. Keys that drop to 0 are kept and skipped when read.
+
+('version', '') is not a count: it grows on every write to the book, whether a count changed or not,
+and tells readers whether anything they read before may have changed.
+"""
+
+# The statements go through DDL(), which applies %-formatting, so a literal % is written %%
+STATS_UPSERT = ' ON CONFLICT (user_id, dimension, key) DO UPDATE SET count = contact_stats.count + excluded.count'
+
+
+def _sqlite_keys(row: str) -> str:
+    return (f"(VALUES ('total', ''), "
+            f"('domain', substr({row}.email_lower, instr({row}.email_lower, '@') + 1)), "
+            f"('month', coalesce(CAST(strftime('%%m', {row}.birthday) AS INTEGER), '')), "
+            f"('phone', CASE WHEN coalesce({row}.phone_number, '') = '' THEN 'missing' ELSE 'present' END))")
+
+
+def _sqlite_apply(row: str, delta: int) -> str:
+    # the WHERE clause tells the SQLite parser that ON CONFLICT belongs to the INSERT
+    return (f"INSERT INTO contact_stats (user_id, dimension, key, count) "
+            f"SELECT {row}.user_id, column1, column2, {delta} FROM {_sqlite_keys(row)} "
+            f"WHERE {row}.user_id IS NOT NULL" + STATS_UPSERT + "; ")
+
+
+def _sqlite_bump(row: str) -> str:
+    return (f"INSERT INTO contact_stats (user_id, dimension, key, count) "
+            f"SELECT {row}.user_id, 'version', '', 1 WHERE {row}.user_id IS NOT NULL" + STATS_UPSERT + "; ")
+
+
+SQLITE_TRIGGERS = [
+    "CREATE TRIGGER contact_stats_insert AFTER INSERT ON contacts BEGIN "
+    + _sqlite_apply('new', 1) + _sqlite_bump('new') + "END",
+    "CREATE TRIGGER contact_stats_delete AFTER DELETE ON contacts BEGIN "
+    + _sqlite_apply('old', -1) + _sqlite_bump('old') + "END",
+    "CREATE TRIGGER contact_stats_update AFTER UPDATE OF user_id, email, birthday, phone_number ON contacts BEGIN "
+    + _sqlite_apply('old', -1) + _sqlite_apply('new', 1) + "END",
+    # any column, a new name changes what the book reads like as much as a new email
+    "CREATE TRIGGER contact_versions_update AFTER UPDATE ON contacts BEGIN "
+    + _sqlite_bump('old') + _sqlite_bump('new') + "END",
+]
+
+
+def _postgresql_apply(changes: str) -> str:
+    return f"""
+        INSERT INTO contact_stats (user_id, dimension, key, count)
+        SELECT changes.user_id, keys.dimension, keys.key, sum(changes.delta)
+        FROM ({changes}) AS changes
+        CROSS JOIN LATERAL (VALUES
+            ('total', ''),
+            ('domain', split_part(changes.email_lower, '@', 2)),
+            ('month', coalesce(extract(month FROM changes.birthday)::integer::text, '')),
+            ('phone', CASE WHEN coalesce(changes.phone_number, '') = '' THEN 'missing' ELSE 'present' END)
+        ) AS keys (dimension, key)
+        WHERE changes.user_id IS NOT NULL
+        GROUP BY changes.user_id, keys.dimension, keys.key
+        HAVING sum(changes.delta) <> 0
+        UNION ALL
+        SELECT changes.user_id, 'version', '', 1
+        FROM ({changes}) AS changes
+        WHERE changes.user_id IS NOT NULL
+        GROUP BY changes.user_id
+        -- the same lock order in every transaction, so concurrent writers of one book cannot deadlock
+        ORDER BY 1, 2, 3
+       {STATS_UPSERT};"""
+
+
+_NEW_ROWS = 'SELECT user_id, email_lower, birthday, phone_number, 1 AS delta FROM new_rows'
+_OLD_ROWS = 'SELECT user_id, email_lower, birthday, phone_number, -1 AS delta FROM old_rows'
+
+# Statement level triggers with transition tables: a bulk statement or COPY does one upsert per touched key
+POSTGRESQL_TRIGGERS = [
+    f"""
+    CREATE OR REPLACE FUNCTION contact_stats_refresh() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN{_postgresql_apply(_NEW_ROWS)}
+        ELSIF TG_OP = 'DELETE' THEN{_postgresql_apply(_OLD_ROWS)}
+        ELSE{_postgresql_apply(_NEW_ROWS + ' UNION ALL ' + _OLD_ROWS)}
+        END IF;
+        RETURN NULL;
+    END;
+    $$""",
+    "CREATE TRIGGER contact_stats_insert AFTER INSERT ON contacts REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION contact_stats_refresh()",
+    "CREATE TRIGGER contact_stats_update AFTER UPDATE ON contacts REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION contact_stats_refresh()",
+    "CREATE TRIGGER contact_stats_delete AFTER DELETE ON contacts REFERENCING OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION contact_stats_refresh()",
+]
+POSTGRESQL_DROP = 'DROP FUNCTION IF EXISTS contact_stats_refresh() CASCADE'
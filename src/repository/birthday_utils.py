@@ -1,19 +1,102 @@
-from datetime import date
+from calendar import isleap
+from datetime import date, timedelta
 
-CURRENT_DAY = date.today()
+from sqlalchemy import Integer, case, cast, extract
 
+DAYS_BEFORE_MONTH = {1: 0, 2: 31, 3: 59, 4: 90, 5: 120, 6: 151, 7: 181, 8: 212, 9: 243, 10: 273, 11: 304, 12: 334}
+DAYS_IN_LEAP_YEAR = 366
 
-def is_upcoming_birthday(users):
+
+def day_of_year(month: int, day: int, leap: bool) -> int:
+    """
+The day_of_year function returns the ordinal of a month and day within a year.
+    In a non-leap year February 29 gets the ordinal of March 1, so such birthdays are celebrated on March 1.
+
+:param month: int: The month
+:param day: int: The day of the month
+:param leap: bool: Whether the year is a leap year
+:return: The 1-based day of the year
+:rtype: int
+    """
+    return DAYS_BEFORE_MONTH[month] + day + (1 if leap and month > 2 else 0)
+
+
+def birthday_doy(birthday: date) -> int:
+    """
+The birthday_doy function returns the value stored in contacts.birthday_doy for a date of birth.
+    It is the day of year in a leap year calendar, so every month and day has its own fixed ordinal from 1 to 366.
+
+:param birthday: date: The date of birth
+:return: The ordinal of the birthday
+:rtype: int
+    """
+    return day_of_year(birthday.month, birthday.day, leap=True)
+
+
+def birthday_doy_expr(column):
+    """
+The birthday_doy_expr function is the SQL twin of birthday_doy, used as the generated column expression.
+
+:param column: The date of birth column
+:return: An integer SQL expression, NULL for a NULL birthday
+    """
+    month = cast(extract('month', column), Integer)
+    day = cast(extract('day', column), Integer)
+    days_before = {month_: day_of_year(month_, 1, leap=True) - 1 for month_ in DAYS_BEFORE_MONTH}
+    return case(days_before, value=month) + day
+
+
+def doy_to_month_day(doy: int) -> tuple[int, int]:
+    day = date(2000, 1, 1) + timedelta(days=doy - 1)
+    return day.month, day.day
+
+
+def birthday_doy_range(start: date, end: date) -> tuple[int, int] | None:
+    """
+The birthday_doy_range function translates a range of calendar days into a range of birthday_doy values.
+    The range wraps around the year end when the first value is greater than the last one.
+    A range starting on March 1 of a non-leap year also covers February 29 birthdays.
+
+:param start: date: The first day of the range
+:param end: date: The last day of the range
+:return: The first and the last birthday_doy of the range, or None when the range covers a whole year
+:rtype: tuple[int, int] | None
+    """
+    if (end - start).days >= DAYS_IN_LEAP_YEAR - 1:
+        return None
+    first = birthday_doy(start)
+    if (start.month, start.day) == (3, 1) and not isleap(start.year):
+        first -= 1
+    return first, birthday_doy(end)
+
+
+def days_until_birthday(birthday: date, today: date | None = None) -> int:
+    """
+The days_until_birthday function counts the days from today to the next occurrence of a birthday.
+
+:param birthday: date: The date of birth
+:param today: date | None: The reference day, the current date by default
+:return: 0 when the birthday is today, up to 365 otherwise
+:rtype: int
+    """
+    today = today or date.today()
+    today_ordinal = day_of_year(today.month, today.day, isleap(today.year))
+    birthday_ordinal = day_of_year(birthday.month, birthday.day, isleap(today.year))
+    if birthday_ordinal >= today_ordinal:
+        return birthday_ordinal - today_ordinal
+    days_left = (366 if isleap(today.year) else 365) - today_ordinal
+    return days_left + day_of_year(birthday.month, birthday.day, isleap(today.year + 1))
+
+
+def is_upcoming_birthday(users, days: int = 7, today: date | None = None):
     """
-The is_upcoming_birthday function takes a list of users and returns a list of users whose birthday is within the next 7 days.
+The is_upcoming_birthday function takes a list of users and returns a list of users whose birthday is within the next days.
 
 :param users: Iterate through the list of users
-:return: A list of users who have a birthday in the next 7 days
+:param days: int: The size of the window in days
+:param today: date | None: The reference day, the current date by default
+:return: A list of users who have a birthday in the next days
 :rtype: List[Contact]
     """
-    birthday_boys = []
-    for user in users:
-        days_until_birthday = (user.birthday - CURRENT_DAY).days
-        if 0 <= days_until_birthday <= 7:
-            birthday_boys.append(user)
-    return birthday_boys
+    today = today or date.today()
+    return [user for user in users if user.birthday and days_until_birthday(user.birthday, today) <= days]
@@ -1,65 +1,327 @@
-from typing import Type
+import base64
+import json
+from datetime import date, timedelta
+from typing import AsyncIterator, Type
 
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, or_, case, delete, func, insert, literal, select, tuple_, union_all, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.models import Contact, Date, User
-from src.schemas import ContactModel
-from src.repository.birthday_utils import is_upcoming_birthday
+from src.database.events import mark_contacts_changed
+from src.database.models import Contact, ContactStat, User, contacts_fts
+from src.schemas import ContactModel, ContactSort, ContactFilter
+from src.repository.birthday_utils import (
+    DAYS_IN_LEAP_YEAR,
+    birthday_doy,
+    birthday_doy_range,
+    doy_to_month_day,
+)
+from src.repository.phone_utils import normalize_phone
+from src.repository.search_utils import SIMILARITY_THRESHOLD, fts_query
 
+SORT_KEYS = {
+    'id': ('id',),
+    'first_name': ('first_name', 'id'),
+    'last_name': ('last_name', 'first_name', 'id'),
+    'email': ('email', 'id'),
+}
 
-async def get_contacts(skip: int, limit: int, user: User, db: Session) -> list[Type[Contact]]:
+# The type of each sort key value in a cursor, bool is excluded as it passes for an int
+SORT_KEY_TYPES = {'id': int, 'first_name': str, 'last_name': str, 'email': str}
+
+
+def _sort_key(sort: ContactSort | str) -> tuple[tuple[str, ...], bool]:
+    sort = ContactSort(sort).value
+    return SORT_KEYS[sort.lstrip('-')], sort.startswith('-')
+
+
+def encode_cursor(sort: ContactSort | str, contact: Contact) -> str:
+    """
+The encode_cursor function builds the opaque cursor that points right after the given contact.
+
+:param sort: ContactSort | str: The sort order of the page
+:param contact: Contact: The last contact of the page
+:return: A url-safe cursor string
+:rtype: str
+    """
+    sort = ContactSort(sort)
+    keys, _ = _sort_key(sort)
+    payload = json.dumps([sort.value, [getattr(contact, key) for key in keys]], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, sort: ContactSort | str) -> tuple:
+    """
+The decode_cursor function turns a cursor from encode_cursor back into the sort key values it points after.
+
+:param cursor: str: The cursor sent by the client
+:param sort: ContactSort | str: The sort order of the requested page
+:return: The sort key values of the last contact of the previous page
+:rtype: tuple
+:raises ValueError: If the cursor is malformed or was issued for another sort order
+    """
+    sort = ContactSort(sort)
+    keys, _ = _sort_key(sort)
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, values = json.loads(payload)
+    except (ValueError, TypeError):
+        raise ValueError('Malformed cursor')
+    if cursor_sort != sort.value or not isinstance(values, list) or len(values) != len(keys):
+        raise ValueError('Cursor does not match the sort order')
+    for key, value in zip(keys, values):
+        if not isinstance(value, SORT_KEY_TYPES[key]) or isinstance(value, bool):
+            raise ValueError('Malformed cursor')
+    return tuple(values)
+
+
+# The columns the read endpoints return, in the order of the ContactResponse fields
+CONTACT_FIELDS = ('first_name', 'last_name', 'email', 'phone_number', 'birthday', 'id')
+
+
+def parse_fields(fields: str) -> tuple[str, ...]:
+    """
+The parse_fields function turns the fields query parameter, a comma separated list of CONTACT_FIELDS,
+    into the names of the columns to read, in the order of CONTACT_FIELDS.
+
+:param fields: str: The field names, such as id,first_name,last_name
+:return: The known field names without repeats
+:rtype: tuple[str, ...]
+:raises ValueError: If a field is unknown or none is given
+    """
+    names = {name.strip() for name in fields.split(',')} - {''}
+    unknown = names.difference(CONTACT_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}, allowed are {', '.join(CONTACT_FIELDS)}")
+    if not names:
+        raise ValueError('At least one field is required')
+    return tuple(name for name in CONTACT_FIELDS if name in names)
+
+
+def _select_fields(fields: tuple[str, ...] | None, *extra: str):
+    # plain rows with the requested columns first and then the ones the query needs itself, no ORM objects
+    return select(*(getattr(Contact, name) for name in dict.fromkeys((fields or CONTACT_FIELDS) + extra)))
+
+
+async def get_contacts(skip: int, limit: int, user: User, db: AsyncSession, sort: ContactSort | str = ContactSort.id,
+                       after: tuple | None = None, fields: tuple[str, ...] | None = None) -> list[Row]:
     """
 The get_contacts function returns a list of contacts for the user.
+    Contacts are ordered by the sort key with the id as tie breaker. When after is given the page starts right
+    after that key (keyset pagination), so reading deep pages costs the same as reading the first one.
 
 :param skip: int: Skip the first n contacts
 :param limit: int: Limit the number of contacts returned
 :param user: User: Get the contacts for a specific user
-:param db: Session: Access the database
-:return: A list of contact objects
-:rtype: List[Contact]
+:param db: AsyncSession: Access the database
+:param sort: ContactSort | str: The sort order, a leading '-' means descending
+:param after: tuple | None: The sort key values of the last contact of the previous page, see decode_cursor
+:param fields: tuple[str, ...] | None: Read only these CONTACT_FIELDS, see parse_fields, all of them by default
+:return: Rows with the fields followed by the sort key
+:rtype: List[Row]
+    """
+    keys, descending = _sort_key(sort)
+    columns = [getattr(Contact, key) for key in keys]
+    stmt = _select_fields(fields, *keys).filter(Contact.user_id == user.id)
+    if after is not None:
+        seek = tuple_(*columns) < tuple_(*after) if descending else tuple_(*columns) > tuple_(*after)
+        stmt = stmt.filter(seek)
+    stmt = stmt.order_by(*(column.desc() if descending else column for column in columns))
+    stmt = stmt.offset(skip).limit(limit)
+    result = await db.execute(stmt)
+    return result.all()
+
+
+EXPORT_COLUMNS = ('id', 'first_name', 'last_name', 'email', 'phone_number', 'birthday')
+
+
+async def stream_contacts(user: User, db: AsyncSession, batch_size: int = 1000) -> AsyncIterator[Row]:
+    """
+The stream_contacts function reads all contacts of the user without holding them in memory.
+    Rows are fetched batch_size at a time through a server-side cursor, where the driver has one,
+    and are plain rows rather than ORM objects.
+
+:param user: User: The owner of the contacts
+:param db: AsyncSession: Access the database
+:param batch_size: int: The number of rows fetched at once
+:return: Rows with the EXPORT_COLUMNS of the contacts, ordered by id
+:rtype: AsyncIterator[Row]
+    """
+    stmt = select(*(getattr(Contact, column) for column in EXPORT_COLUMNS)) \
+        .filter(Contact.user_id == user.id).order_by(Contact.id).execution_options(yield_per=batch_size)
+    result = await db.stream(stmt)
+    try:
+        async for row in result:
+            yield row
+    finally:
+        await result.close()
+
+
+async def get_contacts_by_phone(number: str, user: User, db: AsyncSession) -> list[Contact]:
+    """
+The get_contacts_by_phone function finds the contacts of the user with the given phone number, in any format.
+    The number is normalized like contacts.phone_e164, so the lookup is one probe of its index.
+
+:param number: str: The phone number as it was written
+:param user: User: The owner of the contacts
+:param db: AsyncSession: Access the database
+:return: The contacts with that number, ordered by id
+:rtype: list[Contact]
+    """
+    phone = normalize_phone(number)
+    if phone is None:
+        return []
+    stmt = select(Contact).filter(Contact.user_id == user.id, Contact.phone_e164 == phone).order_by(Contact.id)
+    result = await db.execute(stmt)
+    return list(result.scalars())
+
+
+DUPLICATE_KEY_COLUMNS = ('id', 'first_name_lower', 'last_name_lower', 'email_lower', 'phone_number', 'birthday')
+
+
+async def stream_duplicate_keys(user: User, db: AsyncSession, batch_size: int = 10000) -> AsyncIterator[list[Row]]:
+    """
+The stream_duplicate_keys function reads the columns duplicate detection compares, for all contacts of the user.
+    Rows come in batches of batch_size through a server-side cursor, where the driver has one.
+
+:param user: User: The owner of the contacts
+:param db: AsyncSession: Access the database
+:param batch_size: int: The number of rows fetched at once
+:return: Batches of rows with the DUPLICATE_KEY_COLUMNS of the contacts
+:rtype: AsyncIterator[list[Row]]
+    """
+    stmt = select(*(getattr(Contact, column) for column in DUPLICATE_KEY_COLUMNS)) \
+        .filter(Contact.user_id == user.id).order_by(Contact.id).execution_options(yield_per=batch_size)
+    result = await db.stream(stmt)
+    try:
+        async for partition in result.partitions():
+            yield partition
+    finally:
+        await result.close()
+
+
+async def get_contacts_by_ids(ids: list[int], user: User, db: AsyncSession) -> list[Contact]:
+    """
+The get_contacts_by_ids function returns the contacts of the user with the given ids, ordered by id.
+    Ids of other users' contacts and unknown ids are left out.
+
+:param ids: list[int]: The ids of the contacts
+:param user: User: The owner of the contacts
+:param db: AsyncSession: Access the database
+:return: The contacts found
+:rtype: list[Contact]
+    """
+    stmt = select(Contact).filter(Contact.user_id == user.id, Contact.id.in_(ids)).order_by(Contact.id)
+    result = await db.execute(stmt)
+    return list(result.scalars())
+
+
+MERGED_FIELDS = ('phone_number', 'birthday')
+
+
+async def merge_contacts(ids: list[int], primary_id: int, user: User, db: AsyncSession) -> Contact | None:
+    """
+The merge_contacts function collapses a group of duplicate contacts into the primary one, in one transaction.
+    The primary contact keeps its names and email, an empty phone number or birthday is taken from the first
+    contact of ids that has one, and the other contacts are deleted. The contacts are locked while they are merged.
+
+:param ids: list[int]: The contacts to merge, primary_id among them
+:param primary_id: int: The contact that is kept
+:param user: User: The owner of the contacts
+:param db: AsyncSession: Access the database
+:return: The merged contact, None when one of the contacts does not belong to the user
+:rtype: Contact | None
     """
-    return db.query(Contact).filter(Contact.user_id == user.id).offset(skip).limit(limit).all()
+    try:
+        stmt = select(*(getattr(Contact, column) for column in ('id',) + MERGED_FIELDS)) \
+            .filter(Contact.user_id == user.id, Contact.id.in_(ids)).order_by(Contact.id).with_for_update()
+        rows = {row.id: row for row in await db.execute(stmt)}
+        if len(rows) != len(set(ids)):
+            await db.rollback()
+            return None
+        values = {field: next((getattr(rows[i], field) for i in [primary_id, *ids] if getattr(rows[i], field)),
+                              getattr(rows[primary_id], field)) for field in MERGED_FIELDS}
+        others = [i for i in rows if i != primary_id]
+        await db.execute(delete(Contact).where(Contact.user_id == user.id, Contact.id.in_(others))
+                         .execution_options(synchronize_session=False))
+        stmt = update(Contact).where(Contact.id == primary_id).values(**values) \
+            .returning(Contact).execution_options(synchronize_session=False, populate_existing=True)
+        contact = (await db.execute(stmt)).scalars().first()
+        mark_contacts_changed(db, user.id)
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
+    return contact
 
 
-async def get_contact(contact_id: int, user: User, db: Session) -> Type[Contact] | None:
+async def get_contact(contact_id: int, user: User, db: AsyncSession) -> Type[Contact] | None:
     """
 The get_contact function takes in a contact_id and user, and returns the Contact object with that id.
     If no such contact exists, it returns None.
 
 :param contact_id: int: Specify the id of the contact to be retrieved
 :param user: User: Get the user from the database
-:param db: Session: Pass the database session to the function
+:param db: AsyncSession: Pass the database session to the function
 :return: A contact object from the database
 :rtype: List[Note]
     """
-    return db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
+    stmt = select(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id))
+    result = await db.execute(stmt)
+    return result.scalars().first()
 
 
-async def create_contact(body: ContactModel, user: User, db: Session) -> Contact:
+async def create_contact(body: ContactModel, user: User, db: AsyncSession) -> Contact:
 
     """
 The create_contact function creates a new contact in the database.
+    A single INSERT ... RETURNING writes the row and reads back the generated columns.
 
 :param body: ContactModel: Get the data from the request body
 :param user: User: Get the user_id from the user object
-:param db: Session: Access the database
+:param db: AsyncSession: Access the database
 :return: A contact object
 :rtype: Contact
     """
-    contact = Contact(first_name=body.first_name,
-                      last_name=body.last_name,
-                      email=body.email,
-                      phone_number=body.phone_number,
-                      birthday=body.birthday,
-                      user_id=user.id)
-    db.add(contact)
-    db.commit()
-    db.refresh(contact)
+    stmt = insert(Contact).values(**body.dict(), user_id=user.id).returning(Contact)
+    result = await db.execute(stmt)
+    contact = result.scalars().first()
+    mark_contacts_changed(db, user.id)
+    await db.commit()
     return contact
 
 
-async def update_contact(contact_id: int, body: ContactModel, user: User, db: Session) -> Contact | None:
+IMPORT_COLUMNS = ('first_name', 'last_name', 'email', 'phone_number', 'birthday', 'user_id')
+
+
+async def insert_contacts(bodies: list[ContactModel], user: User, db: AsyncSession) -> int:
+    """
+The insert_contacts function adds many contacts with one statement, without loading them back.
+    On asyncpg the rows are sent with COPY, elsewhere with a multi-row INSERT.
+    The caller commits, so several batches can be imported in one transaction.
+
+:param bodies: list[ContactModel]: The validated contacts
+:param user: User: The owner of the contacts
+:param db: AsyncSession: Access the database
+:return: The number of inserted contacts
+:rtype: int
+    """
+    rows = [(body.first_name, body.last_name, body.email, body.phone_number, body.birthday, user.id) for body in bodies]
+    if not rows:
+        return 0
+    mark_contacts_changed(db, user.id)
+    if db.get_bind().dialect.driver == 'asyncpg':
+        # the driver opens the transaction lazily on the first statement, open it so COPY is a part of it
+        await db.execute(select(literal(1)))
+        connection = await (await db.connection()).get_raw_connection()
+        await connection.driver_connection.copy_records_to_table(Contact.__tablename__, records=rows,
+                                                                 columns=IMPORT_COLUMNS)
+    else:
+        await db.execute(insert(Contact), [dict(zip(IMPORT_COLUMNS, row)) for row in rows])
+    return len(rows)
+
+
+async def update_contact(contact_id: int, body: ContactModel, user: User, db: AsyncSession) -> Contact | None:
     """
 The update_contact function updates a contact in the database.
     Args:
@@ -70,43 +332,128 @@ The update_contact function updates a contact in the database.
 :param contact_id: int: Identify the contact to be updated
 :param body: ContactModel: Pass in the contact information to be updated
 :param user: User: Get the user id of the logged in user
-:param db: Session: Access the database
+:param db: AsyncSession: Access the database
 :return: The updated contact object
 :rtype: Contact | None
     """
-    contact = db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
+    return await patch_contact(contact_id, body.dict(), user, db)
+
+
+async def patch_contact(contact_id: int, values: dict, user: User, db: AsyncSession) -> Contact | None:
+    """
+The patch_contact function writes only the given columns of a contact.
+    A single UPDATE ... RETURNING finds the contact of the user, changes it and reads it back.
+
+:param contact_id: int: Identify the contact to be updated
+:param values: dict: The columns to change, the other columns keep their values
+:param user: User: Get the user id of the logged in user
+:param db: AsyncSession: Access the database
+:return: The updated contact object, None when the user has no such contact
+:rtype: Contact | None
+    """
+    if not values:
+        return await get_contact(contact_id, user, db)
+    stmt = update(Contact).where(Contact.id == contact_id, Contact.user_id == user.id).values(**values) \
+        .returning(Contact).execution_options(synchronize_session=False, populate_existing=True)
+    result = await db.execute(stmt)
+    contact = result.scalars().first()
     if contact:
-        contact.first_name = body.first_name,
-        contact.last_name = body.last_name,
-        contact.email = body.email,
-        contact.phone_number = body.phone_number,
-        contact.birthday = body.birthday
-        db.commit()
+        mark_contacts_changed(db, user.id)
+    await db.commit()
     return contact
 
 
-async def remove_contact(contact_id: int, user: User, db: Session) -> Contact | None:
+async def remove_contact(contact_id: int, user: User, db: AsyncSession) -> Contact | None:
     """
 The remove_contact function removes a contact from the database.
     Args:
         contact_id (int): The id of the contact to be removed.
         user (User): The user who owns the contacts list.
-        db (Session): A connection to our database, used for querying and deleting data.
+        db (AsyncSession): A connection to our database, used for querying and deleting data.
 
 :param contact_id: int: Identify the contact to be removed
 :param user: User: Identify the user who is making the request
-:param db: Session: Access the database
+:param db: AsyncSession: Access the database
 :return: A contact object if the contact was successfully removed from the database
 :rtype: Contact | None
     """
-    contact = db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
+    stmt = delete(Contact).where(Contact.id == contact_id, Contact.user_id == user.id) \
+        .returning(Contact).execution_options(synchronize_session=False)
+    result = await db.execute(stmt)
+    contact = result.scalars().first()
     if contact:
-        db.delete(contact)
-        db.commit()
+        mark_contacts_changed(db, user.id)
+    await db.commit()
     return contact
 
 
-async def search_contact(search_params, user: User, db) -> list[Type[Date]]:
+def contact_filter_conditions(contact_filter: ContactFilter, user: User) -> list:
+    """
+The contact_filter_conditions function translates a ContactFilter into WHERE conditions on the user's contacts.
+    Names and the email are compared exactly, email_domain matches the part after the @ ignoring case.
+
+:param contact_filter: ContactFilter: The criteria, all given criteria must match
+:param user: User: The owner of the contacts
+:return: The conditions, the first one restricts the contacts to the user
+:rtype: list
+    """
+    conditions = [Contact.user_id == user.id]
+    if contact_filter.ids is not None:
+        conditions.append(Contact.id.in_(contact_filter.ids))
+    if contact_filter.first_name is not None:
+        conditions.append(Contact.first_name == contact_filter.first_name)
+    if contact_filter.last_name is not None:
+        conditions.append(Contact.last_name == contact_filter.last_name)
+    if contact_filter.email is not None:
+        conditions.append(Contact.email == contact_filter.email)
+    if contact_filter.email_domain is not None:
+        domain = contact_filter.email_domain.lstrip('@').lower()
+        conditions.append(Contact.email_lower.endswith(f'@{domain}', autoescape=True))
+    return conditions
+
+
+async def bulk_update_contacts(contact_filter: ContactFilter, values: dict, user: User, db: AsyncSession) -> list[int]:
+    """
+The bulk_update_contacts function sets the same values on every contact matching the filter with one UPDATE.
+    The contacts are not loaded, the statement returns the ids of the updated rows.
+
+:param contact_filter: ContactFilter: Select the contacts to update
+:param values: dict: The columns to set
+:param user: User: The owner of the contacts
+:param db: AsyncSession: Access the database
+:return: The ids of the updated contacts
+:rtype: list[int]
+    """
+    stmt = update(Contact).where(*contact_filter_conditions(contact_filter, user)).values(**values) \
+        .returning(Contact.id).execution_options(synchronize_session=False)
+    ids = list((await db.execute(stmt)).scalars())
+    if ids:
+        mark_contacts_changed(db, user.id)
+    await db.commit()
+    return ids
+
+
+async def bulk_remove_contacts(contact_filter: ContactFilter, user: User, db: AsyncSession) -> list[int]:
+    """
+The bulk_remove_contacts function deletes every contact matching the filter with one DELETE.
+    The contacts are not loaded, the statement returns the ids of the deleted rows.
+
+:param contact_filter: ContactFilter: Select the contacts to delete
+:param user: User: The owner of the contacts
+:param db: AsyncSession: Access the database
+:return: The ids of the deleted contacts
+:rtype: list[int]
+    """
+    stmt = delete(Contact).where(*contact_filter_conditions(contact_filter, user)) \
+        .returning(Contact.id).execution_options(synchronize_session=False)
+    ids = list((await db.execute(stmt)).scalars())
+    if ids:
+        mark_contacts_changed(db, user.id)
+    await db.commit()
+    return ids
+
+
+async def search_contact(search_params, user: User, db, fields: tuple[str, ...] | None = None) -> list[Row]:
     """
 The search_contact function searches for contacts in the database.
     Args:
@@ -116,36 +463,262 @@ The search_contact function searches for contacts in the database.
 :param search_params: Filter the contacts based on the parameters passed in
 :param user: User: Get the user id from the database
 :param db: Pass the database connection to the function
-:return: A list of contact objects
-:rtype: List[Contact]
+:param fields: tuple[str, ...] | None: Read only these CONTACT_FIELDS, see parse_fields, all of them by default
+:return: Rows with the fields of the contacts
+:rtype: List[Row]
     """
-    query = db.query(Contact).filter(Contact.user_id == user.id)
+    stmt = _select_fields(fields).filter(Contact.user_id == user.id)
 
     if search_params.get('first_name'):
-        query = query.filter(Contact.first_name == search_params['first_name'])
+        stmt = stmt.filter(Contact.first_name == search_params['first_name'])
     if search_params.get('last_name'):
-        query = query.filter(Contact.last_name == search_params['last_name'])
+        stmt = stmt.filter(Contact.last_name == search_params['last_name'])
     if search_params.get('email'):
-        query = query.filter(Contact.email == search_params['email'])
+        stmt = stmt.filter(Contact.email == search_params['email'])
+
+    result = await db.execute(stmt)
+    return result.all()
+
+
+async def fuzzy_search(query: str, user: User, db: AsyncSession, skip: int = 0, limit: int = 20) -> list[tuple[Contact, float]]:
+    """
+The fuzzy_search function finds the contacts whose first name, last name or email is similar to the query,
+    so misspelled names still match. The score is the trigram similarity of the best matching field or of the full name.
+    On Postgres the candidates come from the pg_trgm GIN indexes, on SQLite from the contacts_fts trigram index.
+
+:param query: str: The search text
+:param user: User: The owner of the contacts
+:param db: AsyncSession: Access the database
+:param skip: int: Skip the first n results
+:param limit: int: The number of results
+:return: Pairs of contact and score, best first
+:rtype: list[tuple[Contact, float]]
+    """
+    fields = (Contact.first_name_lower, Contact.last_name_lower, Contact.email_lower)
+    full_name = Contact.first_name_lower + ' ' + Contact.last_name_lower
+    score = func.greatest(*(func.similarity(field, query) for field in (*fields, full_name))).label('score')
+    stmt = select(Contact, score).filter(Contact.user_id == user.id)
+
+    if db.get_bind().dialect.name == 'postgresql':
+        stmt = stmt.filter(or_(*(field.op('%')(query) for field in fields)))
+    else:
+        match = fts_query(query)
+        if match is None:
+            return []
+        candidates = select(contacts_fts.c.rowid).filter(contacts_fts.c.terms.match(match))
+        stmt = stmt.filter(Contact.id.in_(candidates),
+                           or_(*(func.similarity(field, query) >= SIMILARITY_THRESHOLD for field in fields)))
+
+    result = await db.execute(stmt.order_by(score.desc(), Contact.id).offset(skip).limit(limit))
+    return [(contact, score) for contact, score in result]
+
+
+def _prefix_range(column, prefix: str):
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(column >= prefix, column < upper)
+
+
+def rank_suggestion(first_name: str, last_name: str, email: str, query: str) -> tuple:
+    """
+The rank_suggestion function orders autocomplete matches: exact matches first, then matches on the first name,
+    the last name, the full name and the email, alphabetically within each group.
+
+:param first_name: str: The first name of the contact
+:param last_name: str: The last name of the contact
+:param email: str: The email of the contact
+:param query: str: The lowercase query
+:return: A sort key, or None when the contact does not match the query
+:rtype: tuple | None
+    """
+    keys = (first_name.lower(), last_name.lower(), f'{first_name} {last_name}'.lower(), email.lower())
+    for field, key in enumerate(keys):
+        if key.startswith(query):
+            return query not in keys, field, key
+    return None
 
-    contacts = query.all()
-    return contacts
 
+async def autocomplete(query: str, limit: int, user: User, db: AsyncSession) -> list[dict]:
+    """
+The autocomplete function returns the best contacts whose first name, last name, full name or email starts with the query.
+    Every field is read with its own range scan on a lowercase column index, limited to the requested size,
+    so the cost does not depend on the size of the contact book.
+
+:param query: str: The lowercase query
+:param limit: int: The number of suggestions
+:param user: User: The owner of the contacts
+:param db: AsyncSession: Access the database
+:return: Suggestions with id, first_name, last_name and email, best first
+:rtype: list[dict]
+    """
+    columns = (Contact.id, Contact.first_name, Contact.last_name, Contact.email)
+    conditions = [_prefix_range(Contact.first_name_lower, query),
+                  _prefix_range(Contact.last_name_lower, query),
+                  _prefix_range(Contact.email_lower, query)]
+    order_by = [Contact.first_name_lower, Contact.last_name_lower, Contact.email_lower]
+    first, _, last = query.partition(' ')
+    if last:
+        conditions.append(and_(Contact.first_name_lower == first, _prefix_range(Contact.last_name_lower, last)))
+        order_by.append(Contact.last_name_lower)
+    branches = [select(*columns).filter(Contact.user_id == user.id, condition).order_by(column, Contact.id)
+                .limit(limit).subquery() for condition, column in zip(conditions, order_by)]
+    result = await db.execute(union_all(*(select(branch) for branch in branches)))
+
+    suggestions = {}
+    for row in result:
+        rank = rank_suggestion(row.first_name, row.last_name, row.email, query)
+        if rank is not None:
+            suggestions[row.id] = (rank, row.id, row._asdict())
+    return [suggestion for _, _, suggestion in sorted(suggestions.values(), key=lambda item: item[:2])][:limit]
+
+
+async def get_suggestion_rows(user: User, db: AsyncSession, limit: int) -> list[tuple]:
+    """
+The get_suggestion_rows function loads the fields used by autocomplete for the user's contacts.
 
-async def get_upcoming_birthdays(db: Session, user: User) -> list[Type[Contact]]:
+:param user: User: The owner of the contacts
+:param db: AsyncSession: Access the database
+:param limit: int: The maximal number of rows to load
+:return: Tuples of id, first_name, last_name and email
+:rtype: list[tuple]
+    """
+    stmt = select(Contact.id, Contact.first_name, Contact.last_name, Contact.email) \
+        .filter(Contact.user_id == user.id).limit(limit)
+    result = await db.execute(stmt)
+    return [tuple(row) for row in result]
+
+
+async def get_upcoming_birthdays(db: AsyncSession, user: User, days: int = 7, today: date | None = None) -> list[Row]:
     """
 The get_upcoming_birthdays function returns a list of contacts whose birthday is upcoming.
     Args:
-        db (Session): The database session to use for querying the data.
+        db (AsyncSession): The database session to use for querying the data.
         user (User): The user who's contacts are being searched through.
 
-:param db: Session: Pass the database session to the function
+:param db: AsyncSession: Pass the database session to the function
 :param user: User: Get the user's id from the database
-:return: A list of contact objects
-:rtype: List[Contact]
-    """
-    contacts = db.query(Contact).filter(Contact.user_id == user.id)
-    birthdays_boys = is_upcoming_birthday([contact for contact in contacts if contact.birthday])
-    birthday_boys_ids = [boy.id for boy in birthdays_boys]
-    birthday_boys = db.query(Contact).filter(Contact.id.in_(birthday_boys_ids)).all()
-    return birthday_boys
+:param days: int: The size of the window in days, today included
+:param today: date | None: The reference day, the current date by default
+:return: Rows with the CONTACT_FIELDS of the contacts, nearest birthday first
+:rtype: List[Row]
+    """
+    today = today or date.today()
+    return await get_birthdays_between(today, today + timedelta(days=days), user, db)
+
+
+async def get_birthdays_between(start: date, end: date, user: User, db: AsyncSession, skip: int = 0,
+                                limit: int | None = None) -> list[Row]:
+    """
+The get_birthdays_between function returns the contacts whose birthday falls between two days, both included.
+    It is answered by a range scan on the (user_id, birthday_doy) index, the range may wrap around the year end.
+
+:param start: date: The first day of the range
+:param end: date: The last day of the range
+:param user: User: The owner of the contacts
+:param db: AsyncSession: Access the database
+:param skip: int: Skip the first n contacts
+:param limit: int | None: Limit the number of contacts returned
+:return: Rows with the CONTACT_FIELDS of the contacts in the order their birthdays occur within the range
+:rtype: List[Row]
+    """
+    doy = Contact.birthday_doy
+    doy_range = birthday_doy_range(start, end)
+    stmt = _select_fields(None).filter(Contact.user_id == user.id)
+    if doy_range is None:
+        first = birthday_doy(start)
+        stmt = stmt.filter(doy.isnot(None))
+    else:
+        first, last = doy_range
+        stmt = stmt.filter(doy.between(first, last) if first <= last else or_(doy >= first, doy <= last))
+    position = case((doy >= first, doy - first), else_=doy + DAYS_IN_LEAP_YEAR - first)
+    stmt = stmt.order_by(position, Contact.id).offset(skip).limit(limit)
+    result = await db.execute(stmt)
+    return result.all()
+
+
+async def count_contacts(user: User, db: AsyncSession) -> int:
+    """
+The count_contacts function returns the number of contacts of the user from the maintained counter.
+
+:param user: User: The owner of the contacts
+:param db: AsyncSession: Access the database
+:return: The number of contacts
+:rtype: int
+    """
+    stmt = select(ContactStat.count).filter(ContactStat.user_id == user.id, ContactStat.dimension == 'total',
+                                            ContactStat.key == '')
+    result = await db.execute(stmt)
+    return result.scalars().first() or 0
+
+
+async def get_contacts_version(user: User, db: AsyncSession) -> int:
+    """
+The get_contacts_version function returns the version of the user's contact book, a number that grows
+    with every write to it, so two reads that see the same version saw the same contacts.
+
+:param user: User: The owner of the contacts
+:param db: AsyncSession: Access the database
+:return: The version, 0 for a book that was never written
+:rtype: int
+    """
+    stmt = select(ContactStat.count).filter(ContactStat.user_id == user.id, ContactStat.dimension == 'version',
+                                            ContactStat.key == '')
+    result = await db.execute(stmt)
+    return result.scalars().first() or 0
+
+
+async def get_contact_stats(user: User, db: AsyncSession) -> dict:
+    """
+The get_contact_stats function reads the statistics of the user's book from the contact_stats counters,
+    the contacts themselves are not read.
+
+:param user: User: The owner of the contacts
+:param db: AsyncSession: Access the database
+:return: The total, the counts per email domain, largest first, and per birth month, and the missing fields
+:rtype: dict
+    """
+    stmt = select(ContactStat.dimension, ContactStat.key, ContactStat.count) \
+        .filter(ContactStat.user_id == user.id, ContactStat.count > 0)
+    result = await db.execute(stmt)
+    counters = {}
+    for dimension, key, count in result:
+        counters.setdefault(dimension, {})[key] = count
+    domains = sorted(counters.get('domain', {}).items(), key=lambda item: (-item[1], item[0]))
+    months = counters.get('month', {})
+    return {
+        'total': counters.get('total', {}).get('', 0),
+        'domains': [{'domain': domain, 'count': count} for domain, count in domains],
+        'months': [{'month': month, 'count': months.get(str(month), 0)} for month in range(1, 13)],
+        'missing_phone': counters.get('phone', {}).get('missing', 0),
+        'missing_birthday': months.get('', 0),
+    }
+
+
+async def count_birthdays_by_day(user: User, db: AsyncSession) -> dict[tuple[int, int], int]:
+    """
+The count_birthdays_by_day function counts the user's contacts per birthday, for a whole-year calendar.
+    It reads the (user_id, birthday_doy) index only and returns at most 366 groups.
+
+:param user: User: The owner of the contacts
+:param db: AsyncSession: Access the database
+:return: The number of contacts per (month, day) of birth, days without birthdays are left out
+:rtype: dict[tuple[int, int], int]
+    """
+    doy = Contact.birthday_doy
+    stmt = select(doy, func.count()).filter(Contact.user_id == user.id, doy.isnot(None)).group_by(doy).order_by(doy)
+    result = await db.execute(stmt)
+    return {doy_to_month_day(day): count for day, count in result}
+
+
+async def count_birthdays_by_month(user: User, db: AsyncSession) -> dict[int, int]:
+    """
+The count_birthdays_by_month function counts the user's contacts per month of birth.
+
+:param user: User: The owner of the contacts
+:param db: AsyncSession: Access the database
+:return: The number of contacts for every month from 1 to 12
+:rtype: dict[int, int]
+    """
+    months = dict.fromkeys(range(1, 13), 0)
+    for (month, _), count in (await count_birthdays_by_day(user, db)).items():
+        months[month] += count
+    return months
@@ -0,0 +1,51 @@
+from sqlalchemy import case, func, literal
+
+from src.conf.config import settings
+
+# Characters people put between the digits, dropped before the number is compared
+SEPARATORS = ' -().'
+
+
+def normalize_phone(number: str | None) -> str | None:
+    """
+The normalize_phone function returns the value stored in contacts.phone_e164 for a phone number as written.
+    Separators are dropped, an international 00 prefix becomes +, a national number with the 0 trunk prefix
+    gets the phone_country_code setting, and a number without a prefix is taken to start with its country code.
+
+:param number: str | None: The phone number as it was written
+:return: The number in E.164 form, such as +380501234567, None when there is no number
+:rtype: str | None
+    """
+    if number is None:
+        return None
+    for separator in SEPARATORS:
+        number = number.replace(separator, '')
+    if not number:
+        return None
+    if number.startswith('+'):
+        return number
+    if number.startswith('00'):
+        return '+' + number[2:]
+    if number.startswith('0'):
+        return '+' + settings.phone_country_code + number[1:]
+    return '+' + number
+
+
+def normalize_phone_expr(column):
+    """
+The normalize_phone_expr function is the SQL twin of normalize_phone, used as the generated column expression
+    by the model and by the migration that added the column.
+
+:param column: The phone number column
+:return: A string SQL expression, NULL for a NULL or empty number
+    """
+    number = column
+    for separator in SEPARATORS:
+        number = func.replace(number, separator, '')
+    return case(
+        (number == '', None),
+        (number.like('+%'), number),
+        (number.like('00%'), literal('+') + func.substr(number, 3)),
+        (number.like('0%'), literal('+' + settings.phone_country_code) + func.substr(number, 2)),
+        else_=literal('+') + number,
+    )
@@ -0,0 +1,60 @@
+import re
+
+# pg_trgm.similarity_threshold, the default cut-off of the % operator
+SIMILARITY_THRESHOLD = 0.3
+_WORD = re.compile(r'[^\W_]+')
+
+
+def trigrams(text: str) -> set[str]:
+    """
+The trigrams function splits a text into trigrams the way pg_trgm does.
+    The text is lowercased, every alphanumeric word is padded with two spaces in front and one behind,
+    and every three consecutive characters of the padded words form a trigram.
+
+:param text: str: The text to split
+:return: The set of trigrams
+:rtype: set[str]
+    """
+    result = set()
+    for word in _WORD.findall(text.lower()):
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def similarity(first: str | None, second: str | None) -> float | None:
+    """
+The similarity function is the Python twin of pg_trgm's similarity: the number of shared trigrams
+    divided by the number of distinct trigrams of both texts. It is registered as an SQL function on SQLite.
+
+:param first: str | None: The first text
+:param second: str | None: The second text
+:return: A score from 0, nothing in common, to 1, the same trigrams, None when a text is NULL
+:rtype: float | None
+    """
+    if first is None or second is None:
+        return None
+    first, second = trigrams(first), trigrams(second)
+    if not first or not second:
+        return 0.0
+    shared = len(first & second)
+    return shared / (len(first) + len(second) - shared)
+
+
+def fts_query(query: str) -> str | None:
+    """
+The fts_query function turns a search text into an FTS5 query for the trigram tokenizer.
+    The query matches every contact that shares a trigram with the search text. A contact pg_trgm finds
+    similar enough shares at least one trigram that is not the first of a word, so it is found as well.
+
+:param query: str: The search text
+:return: The FTS5 query, or None when the text has no word
+:rtype: str | None
+    """
+    terms = set()
+    for word in _WORD.findall(query.lower()):
+        padded = f' {word} '
+        terms.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    if not terms:
+        return None
+    return ' OR '.join(f'"{term}"' for term in sorted(terms))
@@ -1,29 +1,32 @@
 from typing import Type
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from libgravatar import Gravatar
+from src.database.events import mark_users_changed
 from src.database.models import User
 from src.schemas import UserModel
 
 
-async def get_user_by_email(email: str, db: Session) -> Type[User] | None:
+async def get_user_by_email(email: str, db: AsyncSession) -> Type[User] | None:
     """
 The get_user_by_email function takes in an email and a database session,
     and returns the user associated with that email. If no such user exists, it returns None.
 
 :param email: str: Pass in the email of the user that we want to get from our database
-:param db: Session: Pass the database session into the function
+:param db: AsyncSession: Pass the database session into the function
 :return: The user object if the user exists, or none if it doesn't
 :rtype: User | None
     """
-    return db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).filter(User.email == email))
+    return result.scalars().first()
 
 
-async def create_user(body: UserModel, db: Session) -> User:
+async def create_user(body: UserModel, db: AsyncSession) -> User:
     """
 The create_user function creates a new user in the database.
 
 :param body: UserModel: Get the user data from the request body
-:param db: Session: Access the database
+:param db: AsyncSession: Access the database
 :return: A user object
 :rtype: User
     """
@@ -35,56 +38,76 @@ The create_user function creates a new user in the database.
         print(e)
     new_user = User(**body.dict(), avatar=avatar)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    # a lookup of the email may have cached that there is no such user
+    mark_users_changed(db, new_user.email)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
 
-async def update_token(user: Type[User], token: str | None, db: Session) -> None:
+async def update_token(user: Type[User], token: str | None, db: AsyncSession) -> None:
     """
 The update_token function updates the refresh token for a user.
     Args:
         user (User): The User object to update.
         token (str | None): The new refresh token to set for the user. If None, then no change is made and an error is logged instead.
-        db (Session): A database session that can be used to commit changes.
+        db (AsyncSession): A database session that can be used to commit changes.
 
 :param user: Type[User]: Specify the type of object that is passed to the function
 :param token: str | None: Update the refresh token in the database
-:param db: Session: Pass the database session to the function
+:param db: AsyncSession: Pass the database session to the function
 :return: None
 :rtype: None type
     """
     user.refresh_token = token
-    db.commit()
+    mark_users_changed(db, user.email)
+    await db.commit()
 
 
-async def confirmed_email(email: str, db: Session) -> None:
+async def update_password(user: Type[User], password_hash: str, db: AsyncSession) -> None:
+    """
+The update_password function replaces the password hash of a user, such as with a hash of a higher cost.
+
+:param user: Type[User]: The user to update
+:param password_hash: str: The new hash of the password
+:param db: AsyncSession: Pass the database session to the function
+:return: None
+:rtype: None type
+    """
+    user.password = password_hash
+    mark_users_changed(db, user.email)
+    await db.commit()
+
+
+async def confirmed_email(email: str, db: AsyncSession) -> None:
     """
 The confirmed_email function takes in an email and a database session,
     and sets the confirmed field of the user with that email to True.
 
 
 :param email: str: Get the email of the user
-:param db: Session: Pass the database session to the function
+:param db: AsyncSession: Pass the database session to the function
 :return: None
 :rtype: None type
     """
     user = await get_user_by_email(email, db)
     user.confirmed = True
-    db.commit()
+    mark_users_changed(db, email)
+    await db.commit()
 
 
-async def update_avatar(email, url: str, db: Session) -> User:
+async def update_avatar(email, url: str, db: AsyncSession) -> User:
     """
 The update_avatar function updates the avatar of a user.
 
 :param email: Get the user from the database
 :param url: str: Specify the type of data that is being passed to the function
-:param db: Session: Pass the database session to the function
+:param db: AsyncSession: Pass the database session to the function
 :return: The updated user
 :rtype: User
     """
     user = await get_user_by_email(email, db)
     user.avatar = url
-    db.commit()
+    mark_users_changed(db, email)
+    await db.commit()
     return user
@@ -2,12 +2,14 @@ from typing import List
 
 from fastapi import APIRouter, HTTPException, Depends, status, Security, BackgroundTasks, Request
 from fastapi.security import OAuth2PasswordRequestForm, HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.db import get_db
 from src.schemas import UserModel, UserResponse, TokenModel, RequestEmail
 from src.repository import users as repository_users
+from src.conf.config import settings
 from src.services.auth import auth_service
+from src.services.sessions import ROTATED, refresh_sessions
 from src.services.email import send_email
 
 router = APIRouter(prefix='/auth', tags=["auth"])
@@ -15,7 +17,7 @@ security = HTTPBearer()
 
 
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def signup(body: UserModel,  background_tasks: BackgroundTasks, request: Request, db: Session = Depends(get_db)):
+async def signup(body: UserModel,  background_tasks: BackgroundTasks, request: Request, db: AsyncSession = Depends(get_db)):
     """
 The signup function creates a new user in the database.
     It takes a UserModel object as input, which is validated by pydantic.
@@ -26,27 +28,27 @@ The signup function creates a new user in the database.
 :param body: UserModel: Get the data from the request body
 :param background_tasks: BackgroundTasks: Add a task to the background tasks queue
 :param request: Request: Get the base url of the server
-:param db: Session: Get the database session
+:param db: AsyncSession: Get the database session
 :return: A dictionary with two keys: user and detail
     """
     exist_user = await repository_users.get_user_by_email(body.email, db)
     if exist_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Account already exists")
-    body.password = auth_service.get_password_hash(body.password)
+    body.password = await auth_service.hash_password(body.password)
     new_user = await repository_users.create_user(body, db)
     background_tasks.add_task(send_email, new_user.email, new_user.username, request.base_url)
     return {"user": new_user, "detail": 'User successfully created. Check your email for confirmation.'}
 
 
 @router.post("/login", response_model=TokenModel)
-async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(body: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     """
 The login function is used to authenticate a user.
     It takes the username and password from the request body,
     verifies that they are correct, and returns an access token.
 
 :param body: OAuth2PasswordRequestForm: Get the username and password from the request body
-:param db: Session: Get a database session
+:param db: AsyncSession: Get a database session
 :return: A dictionary with the access token and refresh token
     """
     user = await repository_users.get_user_by_email(body.username, db)
@@ -54,41 +56,55 @@ The login function is used to authenticate a user.
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email")
     if not user.confirmed:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Email not confirmed")
-    if not auth_service.verify_password(body.password, user.password):
+    verified, new_hash = await auth_service.verify_and_update_password(body.password, user.password)
+    if not verified:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
-    # Generate JWT
+    if new_hash is not None:
+        # the hash is of an older, lower cost, the password is at hand to upgrade it
+        await repository_users.update_password(user, new_hash, db)
+    # Generate JWT, the refresh token opens a session of its own for this device
     access_token = await auth_service.create_access_token(data={"sub": user.email})
-    refresh_token = await auth_service.create_refresh_token(data={"sub": user.email})
-    await repository_users.update_token(user, refresh_token, db)
+    refresh_token = await auth_service.create_refresh_token(data=await refresh_sessions.start(user.email),
+                                                            expires_delta=settings.refresh_token_ttl)
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 
 @router.get('/refresh_token', response_model=TokenModel)
-async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security), db: Session = Depends(get_db)):
+async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security)):
     """
 The refresh_token function is used to refresh the access token.
     The function takes in a refresh token and returns an access_token, a new refresh_token, and the type of token.
-    If the user's current refresh_token does not match what was passed into this function then it will return an error.
+    The session of the refresh token moves on to the new one. If the refresh token was already exchanged before,
+    it has been stolen or replayed and the session is ended, the user has to log in again on that device.
 
 :param credentials: HTTPAuthorizationCredentials: Get the token from the request header
-:param db: Session: Get the database session
 :return: A dictionary with the access_token, refresh_token and token type
     """
-    token = credentials.credentials
-    email = await auth_service.decode_refresh_token(token)
-    user = await repository_users.get_user_by_email(email, db)
-    if user.refresh_token != token:
-        await repository_users.update_token(user, None, db)
+    payload = await auth_service.decode_refresh_token(credentials.credentials)
+    outcome, claims = await refresh_sessions.rotate(payload)
+    if outcome != ROTATED:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
 
-    access_token = await auth_service.create_access_token(data={"sub": email})
-    refresh_token = await auth_service.create_refresh_token(data={"sub": email})
-    await repository_users.update_token(user, refresh_token, db)
+    access_token = await auth_service.create_access_token(data={"sub": payload["sub"]})
+    refresh_token = await auth_service.create_refresh_token(data=claims, expires_delta=settings.refresh_token_ttl)
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 
+@router.post('/logout', status_code=status.HTTP_204_NO_CONTENT)
+async def logout(credentials: HTTPAuthorizationCredentials = Security(security)):
+    """
+The logout function ends the session of a refresh token, on this device only.
+    The access tokens already issued stay valid until they expire.
+
+:param credentials: HTTPAuthorizationCredentials: Get the refresh token from the request header
+:return: None
+    """
+    payload = await auth_service.decode_refresh_token(credentials.credentials)
+    await refresh_sessions.revoke(payload)
+
+
 @router.get('/confirmed_email/{token}')
-async def confirmed_email(token: str, db: Session = Depends(get_db)):
+async def confirmed_email(token: str, db: AsyncSession = Depends(get_db)):
     """
 The confirmed_email function is used to confirm a user's email address.
     It takes the token from the URL and uses it to get the user's email address.
@@ -98,7 +114,7 @@ The confirmed_email function is used to confirm a user's email address.
         confirmed_email function which sets the 'confirmed' field of that particular User object
 
 :param token: str: Get the token from the request
-:param db: Session: Get the database session
+:param db: AsyncSession: Get the database session
 :return: A message that the email is already confirmed or a message that the email has been confirmed
 
     """
@@ -114,7 +130,7 @@ The confirmed_email function is used to confirm a user's email address.
 
 @router.post('/request_email')
 async def request_email(body: RequestEmail, background_tasks: BackgroundTasks, request: Request,
-                        db: Session = Depends(get_db)):
+                        db: AsyncSession = Depends(get_db)):
     """
 The request_email function is used to send an email to the user with a link that they can click on
     to confirm their email address. The function takes in a RequestEmail object, which contains the
@@ -125,7 +141,7 @@ The request_email function is used to send an email to the user with a link that
 :param body: RequestEmail: Get the email from the request body
 :param background_tasks: BackgroundTasks: Add a task to the background tasks queue
 :param request: Request: Get the base_url of the application
-:param db: Session: Get the database session
+:param db: AsyncSession: Get the database session
 :return: A message to the user, informing them that they should check their email for a
 
     """
@@ -1,48 +1,371 @@
+import hashlib
+from datetime import timedelta
 from typing import List, Dict
 
-from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
-from fastapi_limiter.depends import RateLimiter
+from fastapi import APIRouter, HTTPException, Depends, status, Request, Response, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models import User
 from src.database.db import get_db
-from src.schemas import ContactModel, ContactResponse, date
+from src.database.replicas import replica_router
+from src.schemas import ContactModel, ContactResponse, ContactSort, ContactSuggestion, ContactSearchResult, ContactFileFormat, ContactImportReport, ContactFilter, ContactPatch, ContactBulkUpdate, ContactBulkResult, DuplicateGroup, ContactMerge, BirthdayDayCount, BirthdayMonthCount, ContactStats, date
 from src.repository import contacts as repository_contacts
 from src.routes.auth import auth_service
+from src.services import autocomplete as autocomplete_service
+from src.services import contact_cache as contact_cache_service
+from src.services import contact_export
+from src.services.contact_json import RESPONSE_FIELDS, contacts_response
+from src.services.contact_import import ImportFormatError, import_contacts
+from src.services.rate_limit import RateLimiter
+
+IMPORT_CONTENT_TYPES = {
+    'text/csv': ContactFileFormat.csv,
+    'application/x-ndjson': ContactFileFormat.jsonl,
+    'application/jsonl': ContactFileFormat.jsonl,
+    'text/vcard': ContactFileFormat.vcard,
+    'text/x-vcard': ContactFileFormat.vcard,
+}
 
 
 router = APIRouter(prefix="/contacts", tags=["contacts"])
 
 
-@router.get('/upcoming-birthdays', response_model=List[ContactResponse], description='No more than 3 requests per minute', dependencies=[Depends(RateLimiter(times=10, seconds=60))])
-async def get_upcoming_birthdays(db: Session = Depends(get_db),  current_user: User = Depends(auth_service.get_current_user)):
+async def get_read_db(db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+    """
+The get_read_db function is a dependency that yields a read-only session from a healthy replica.
+    It falls back to the primary session when no replica is available or the user has written recently.
+    A replica session names the primary session in info['primary'], for the reads that must not be older than it.
+
+:param db: AsyncSession: The primary session, used as the fallback
+:param current_user: User: The user who is reading
+:return: A database session for reads
+    """
+    sessionmaker = await replica_router.choose(current_user.id)
+    if sessionmaker is None:
+        yield db
+        return
+    async with sessionmaker() as replica_db:
+        replica_db.info['primary'] = db
+        yield replica_db
+
+
+def get_fields(fields: str = Query(None, description='Comma separated fields to return, such as id,first_name,last_name')):
+    """
+The get_fields function is a dependency that parses the fields query parameter of the contact list endpoints.
+
+:param fields: str: The comma separated field names, all fields when left out
+:return: The field names to read, None for all of them
+:rtype: tuple[str, ...] | None
+    """
+    if fields is None:
+        return None
+    try:
+        return repository_contacts.parse_fields(fields)
+    except ValueError as err:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(err))
+
+
+def contacts_etag(user_id: int, version: int, request: Request) -> str:
+    """
+The contacts_etag function builds the weak ETag of a read of the user's contacts.
+    The version tells whether the book changed, the digest whether it is the same read of it.
+    The day is part of the digest because birthday windows move at midnight without any write.
+
+:param user_id: int: The owner of the contacts
+:param version: int: The version of the book, see get_contacts_version
+:param request: Request: The read
+:return: The ETag header value
+:rtype: str
+    """
+    digest = hashlib.blake2b(f'{user_id} {request.url.path}?{request.url.query} {date.today()}'.encode(), digest_size=8)
+    return f'W/"{version}-{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+The etag_matches function tells whether an If-None-Match header names the ETag, compared the weak way.
+
+:param if_none_match: str | None: The If-None-Match header of the request
+:param etag: str: The current ETag
+:return: True when the client already has this version
+:rtype: bool
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(tag.strip().removeprefix('W/') == opaque for tag in if_none_match.split(','))
+
+
+async def check_etag(request: Request, response: Response, db: AsyncSession = Depends(get_read_db),
+                     current_user: User = Depends(auth_service.get_current_user)) -> int:
+    """
+The check_etag function is a dependency of the contact reads that answers 304 Not Modified when the
+    If-None-Match header holds the current ETag, before the endpoint runs a contact query. Otherwise it sets
+    the ETag header of the response. It costs one lookup of the book version.
+
+:param request: Request: The read
+:param response: Response: Set the ETag header
+:param db: AsyncSession: The session the endpoint reads with
+:param current_user: User: The owner of the contacts
+:return: The version of the book the ETag stands for
+:rtype: int
+    """
+    # read before the contacts, so a write in between gives an older ETag and never a stale 304
+    version = await contact_cache_service.get_contacts_version(current_user, db)
+    etag = contacts_etag(current_user.id, version, request)
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    response.headers['ETag'] = etag
+    return version
+
+
+async def get_etag_read_db(version: int = Depends(check_etag), db: AsyncSession = Depends(get_read_db),
+                           current_user: User = Depends(auth_service.get_current_user)) -> AsyncSession:
+    """
+The get_etag_read_db function is a dependency that gives the session for an uncached read that carries the ETag
+    of check_etag. A replica that has not reached the version of the ETag would put an older body under it,
+    which the client would then keep through 304s, so the read goes to the primary instead.
+
+:param version: int: The version of the book the ETag stands for
+:param db: AsyncSession: The session of get_read_db
+:param current_user: User: The owner of the contacts
+:return: The session to read with
+:rtype: AsyncSession
+    """
+    return await contact_cache_service.caught_up(current_user, db, version)
+
+
+@router.get('/upcoming-birthdays', response_model=List[ContactResponse], description='No more than 3 requests per minute', dependencies=[Depends(RateLimiter(times=10, seconds=60)), Depends(check_etag)])
+async def get_upcoming_birthdays(response: Response, days: int = Query(7, ge=0, le=366), db: AsyncSession = Depends(get_read_db),
+                                 current_user: User = Depends(auth_service.get_current_user)):
     """
 The get_upcoming_birthdays function returns a list of contacts with upcoming birthdays.
 
-:param db: Session: Get the database session, which is used to query the database
+:param response: Response: Carry the ETag header
+:param days: int: The size of the window in days, today included
+:param db: AsyncSession: Get the database session, which is used to query the database
 :param current_user: User: Get the user id of the currently logged in user
-:return: A list of contacts with upcoming birthdays
+:return: A list of contacts with upcoming birthdays, nearest first
 :rtype: List[Contact]
     """
-    contacts = await repository_contacts.get_upcoming_birthdays(db, current_user)
-    return contacts
+    contacts = await contact_cache_service.get_upcoming_birthdays(db, current_user, days)
+    return contacts_response(contacts, headers=response.headers)
 
 
-@router.get("/search", response_model=List[ContactResponse], description='No more than 3 requests per minute', dependencies=[Depends(RateLimiter(times=10, seconds=60))])
+@router.get('/birthdays', response_model=List[ContactResponse], description='No more than 10 requests per minute', dependencies=[Depends(RateLimiter(times=10, seconds=60)), Depends(check_etag)])
+async def get_birthdays(response: Response, start: date = Query(None, alias='from'), end: date = Query(None, alias='to'),
+                        skip: int = Query(0, ge=0), limit: int = Query(1000, ge=1, le=10000),
+                        db: AsyncSession = Depends(get_etag_read_db), current_user: User = Depends(auth_service.get_current_user)):
+    """
+The get_birthdays function returns the contacts whose birthday falls between from and to, both included.
+    By default the range starts today and lasts 30 days. A range of a year or more returns every contact with a birthday.
+
+:param response: Response: Carry the ETag header
+:param start: date: The first day of the range, today by default
+:param end: date: The last day of the range, 30 days after from by default
+:param skip: int: Skip the first n contacts
+:param limit: int: Limit the number of contacts returned
+:param db: AsyncSession: Get the database session
+:param current_user: User: Get the user who is logged in
+:return: A list of contacts in the order their birthdays occur
+:rtype: List[Contact]
+    """
+    start = start or date.today()
+    end = end or start + timedelta(days=30)
+    if end < start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'to' must not be before 'from'")
+    contacts = await repository_contacts.get_birthdays_between(start, end, current_user, db, skip, limit)
+    return contacts_response(contacts, headers=response.headers)
+
+
+@router.get('/birthdays/calendar', response_model=List[BirthdayDayCount], description='No more than 10 requests per minute', dependencies=[Depends(RateLimiter(times=10, seconds=60))])
+async def get_birthday_calendar(db: AsyncSession = Depends(get_read_db), current_user: User = Depends(auth_service.get_current_user)):
+    """
+The get_birthday_calendar function returns how many contacts celebrate on every day of the year.
+
+:param db: AsyncSession: Get the database session
+:param current_user: User: Get the user who is logged in
+:return: The days with at least one birthday and their number of contacts
+:rtype: List[BirthdayDayCount]
+    """
+    counts = await repository_contacts.count_birthdays_by_day(current_user, db)
+    return [{'month': month, 'day': day, 'count': count} for (month, day), count in counts.items()]
+
+
+@router.get('/birthdays/months', response_model=List[BirthdayMonthCount], description='No more than 10 requests per minute', dependencies=[Depends(RateLimiter(times=10, seconds=60))])
+async def get_birthday_months(db: AsyncSession = Depends(get_read_db), current_user: User = Depends(auth_service.get_current_user)):
+    """
+The get_birthday_months function returns how many contacts celebrate in every month.
+
+:param db: AsyncSession: Get the database session
+:param current_user: User: Get the user who is logged in
+:return: Twelve months with their number of contacts
+:rtype: List[BirthdayMonthCount]
+    """
+    counts = await repository_contacts.count_birthdays_by_month(current_user, db)
+    return [{'month': month, 'count': count} for month, count in counts.items()]
+
+
+@router.get('/stats', response_model=ContactStats, description='No more than 30 requests per minute', dependencies=[Depends(RateLimiter(times=30, seconds=60))])
+async def get_contact_stats(db: AsyncSession = Depends(get_read_db), current_user: User = Depends(auth_service.get_current_user)):
+    """
+The get_contact_stats function returns the statistics of the user's contact book:
+    the total, the contacts per email domain and per birth month, and how many lack a phone number or a birthday.
+    They come from counters kept up to date on every write, so the cost does not grow with the book.
+
+:param db: AsyncSession: Get the database session
+:param current_user: User: Get the user who is logged in
+:return: The statistics of the contact book
+:rtype: ContactStats
+    """
+    return await repository_contacts.get_contact_stats(current_user, db)
+
+
+@router.get('/duplicates', response_model=List[DuplicateGroup], description='No more than 5 requests per minute', dependencies=[Depends(RateLimiter(times=5, seconds=60))])
+async def get_duplicates(response: Response, skip: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=500),
+                         db: AsyncSession = Depends(get_read_db), current_user: User = Depends(auth_service.get_current_user)):
+    """
+The get_duplicates function returns the groups of contacts that are likely the same person:
+    they share an email or a phone number regardless of case, spacing and formatting, or have similar names
+    and no conflicting birthdays. The X-Total-Count header holds the number of groups.
+    The groups are cached until the next write to the book, so paging through them scans the book once.
+
+:param response: Response: Set the X-Total-Count header
+:param skip: int: Skip the first n groups
+:param limit: int: Limit the number of groups returned
+:param db: AsyncSession: Get the database session
+:param current_user: User: Get the user who is logged in
+:return: The groups with the reasons their contacts matched, ordered by their oldest contact
+:rtype: List[DuplicateGroup]
+    """
+    version = await contact_cache_service.get_contacts_version(current_user, db)
+    groups = await contact_cache_service.find_duplicates(current_user, db, version)
+    response.headers['X-Total-Count'] = str(len(groups))
+    groups = groups[skip:skip + limit]
+    found = await repository_contacts.get_contacts_by_ids([i for group in groups for i in group['ids']], current_user, db)
+    contacts = {contact.id: contact for contact in found}
+    return [{'reasons': group['reasons'], 'contacts': [contacts[i] for i in group['ids'] if i in contacts]}
+            for group in groups]
+
+
+@router.post('/duplicates/merge', response_model=ContactResponse, description='No more than 30 requests per minute', dependencies=[Depends(RateLimiter(times=30, seconds=60))])
+async def merge_duplicates(body: ContactMerge, db: AsyncSession = Depends(get_db),
+                           current_user: User = Depends(auth_service.get_current_user)):
+    """
+The merge_duplicates function collapses a group of duplicates into one contact in a single transaction.
+    The primary contact, the oldest one unless primary_id is given, keeps its names and email and takes
+    a missing phone number or birthday from the others, which are deleted.
+
+:param body: ContactMerge: The ids of the group and the contact to keep
+:param db: AsyncSession: Pass the database session to the repository
+:param current_user: User: Get the user that is currently logged in
+:return: The merged contact
+:rtype: ContactResponse
+    """
+    primary_id = min(body.ids) if body.primary_id is None else body.primary_id
+    if primary_id not in body.ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='primary_id must be one of ids')
+    contact = await repository_contacts.merge_contacts(body.ids, primary_id, current_user, db)
+    if contact is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
+    return contact
+
+
+@router.get('/by-phone/{number}', response_model=List[ContactResponse], description='No more than 120 requests per minute', dependencies=[Depends(RateLimiter(times=120, seconds=60))])
+async def read_contacts_by_phone(number: str, db: AsyncSession = Depends(get_read_db),
+                                 current_user: User = Depends(auth_service.get_current_user)):
+    """
+The read_contacts_by_phone function resolves a phone number to the contacts that have it, for caller ID.
+    The number may be written in any format, +380501234567, 0501234567 and 050 123-45-67 find the same contacts.
+
+:param number: str: The phone number
+:param db: AsyncSession: Get the database session
+:param current_user: User: Get the user who is logged in
+:return: The contacts with that number, empty when there are none
+:rtype: List[ContactResponse]
+    """
+    return await repository_contacts.get_contacts_by_phone(number, current_user, db)
+
+
+@router.get('/export', response_class=StreamingResponse, description='No more than 5 requests per minute', dependencies=[Depends(RateLimiter(times=5, seconds=60))])
+async def export_contacts(export_format: ContactFileFormat = Query(ContactFileFormat.csv, alias='format'), gzip: bool = False,
+                          db: AsyncSession = Depends(get_read_db), current_user: User = Depends(auth_service.get_current_user)):
+    """
+The export_contacts function downloads the whole contact book as a CSV, JSON Lines or vCard file.
+    The file is streamed while the contacts are read, so it can be as large as the book.
+
+:param export_format: ContactFileFormat: The format of the file
+:param gzip: bool: Send the file gzipped, as a .gz file
+:param db: AsyncSession: Get the database session, it stays open until the response is sent
+:param current_user: User: Get the user who is logged in
+:return: The file
+:rtype: StreamingResponse
+    """
+    filename = f'contacts.{contact_export.EXTENSIONS[export_format]}'
+    media_type = contact_export.MEDIA_TYPES[export_format]
+    if gzip:
+        filename, media_type = f'{filename}.gz', 'application/gzip'
+    return StreamingResponse(contact_export.export_contacts(export_format, current_user, db, compress=gzip),
+                             media_type=media_type, headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+
+@router.get('/autocomplete', response_model=List[ContactSuggestion], description='No more than 120 requests per minute', dependencies=[Depends(RateLimiter(times=120, seconds=60))])
+async def autocomplete(q: str = Query(min_length=1, max_length=50), limit: int = Query(10, ge=1, le=50),
+                       db: AsyncSession = Depends(get_read_db), current_user: User = Depends(auth_service.get_current_user)):
+    """
+The autocomplete function suggests contacts whose first name, last name, full name or email starts with q, ignoring case.
+
+:param q: str: What the user typed so far
+:param limit: int: The number of suggestions
+:param db: AsyncSession: Get the database session
+:param current_user: User: Get the user who is logged in
+:return: The best matching contacts, exact matches first
+:rtype: List[ContactSuggestion]
+    """
+    return await autocomplete_service.suggest(q, limit, current_user, db)
+
+
+@router.get('/search/fuzzy', response_model=List[ContactSearchResult], description='No more than 30 requests per minute', dependencies=[Depends(RateLimiter(times=30, seconds=60))])
+async def fuzzy_search(q: str = Query(min_length=1, max_length=100), skip: int = Query(0, ge=0), limit: int = Query(20, ge=1, le=100),
+                       db: AsyncSession = Depends(get_read_db), current_user: User = Depends(auth_service.get_current_user)):
+    """
+The fuzzy_search function searches contacts by first name, last name or email and tolerates typos.
+
+:param q: str: The search text
+:param skip: int: Skip the first n results
+:param limit: int: The number of results
+:param db: AsyncSession: Get the database session
+:param current_user: User: Get the user who is logged in
+:return: The matching contacts with their relevance score, best first
+:rtype: List[ContactSearchResult]
+    """
+    results = await repository_contacts.fuzzy_search(q, current_user, db, skip, limit)
+    return [ContactSearchResult(**ContactResponse.from_orm(contact).dict(), score=round(score, 4))
+            for contact, score in results]
+
+
+@router.get("/search", response_model=List[ContactResponse], description='No more than 3 requests per minute', dependencies=[Depends(RateLimiter(times=10, seconds=60)), Depends(check_etag)])
 async def search_contact(
+    response: Response,
     first_name: str = None,
     last_name: str = None,
     email: str = None,
-    db: Session = Depends(get_db),
+    fields: tuple[str, ...] | None = Depends(get_fields),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(auth_service.get_current_user)
 ):
     """
 The search_contact function searches for a contact in the database.
 
+:param response: Response: Carry the ETag header
 :param first_name: str: Specify the first name of the contact to be searched for
 :param last_name: str: Filter the results by last name
 :param email: str: Search for a contact by email
-:param db: Session: Get the database session
+:param fields: tuple[str, ...] | None: Return only these fields of the contacts
+:param db: AsyncSession: Get the database session
 :param current_user: User: Get the user who is logged in
 :return: A list of contacts
 :rtype: Contact
@@ -58,39 +381,59 @@ The search_contact function searches for a contact in the database.
             status_code=status.HTTP_400_BAD_REQUEST, detail='At least one parameter is required'
         )
 
-    contact = await repository_contacts.search_contact(search_params, current_user, db)
-    return contact
+    contact = await contact_cache_service.search_contact(search_params, current_user, db, fields=fields)
+    return contacts_response(contact, fields or RESPONSE_FIELDS, response.headers)
 
 
-@router.get("/", response_model=List[ContactResponse], description='No more than 10 requests per minute', dependencies=[Depends(RateLimiter(times=10, seconds=60))])
-async def read_contacts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+@router.get("/", response_model=List[ContactResponse], description='No more than 10 requests per minute', dependencies=[Depends(RateLimiter(times=10, seconds=60)), Depends(check_etag)])
+async def read_contacts(response: Response, skip: int = 0, limit: int = 100, cursor: str = None, sort: ContactSort = ContactSort.id,
+                        fields: tuple[str, ...] | None = Depends(get_fields), db: AsyncSession = Depends(get_read_db), current_user: User = Depends(auth_service.get_current_user)):
     """
 The read_contacts function returns a list of contacts.
+    When the page is full, the X-Next-Cursor header holds an opaque cursor for the next page.
+    Passing it back as cursor continues right after the last contact, skip is then ignored.
+    The X-Total-Count header holds the number of contacts of the user.
+    With fields only those columns are read and returned, such as fields=id,first_name,last_name for list views.
+    The ETag header changes with every write to the book, sent back as If-None-Match it gets 304 Not Modified.
 
+:param response: Response: Set the X-Next-Cursor and X-Total-Count headers, carry the ETag header
 :param skip: int: Skip the first n contacts
 :param limit: int: Limit the number of contacts returned
-:param db: Session: Access the database
+:param cursor: str: The X-Next-Cursor value of the previous page
+:param sort: ContactSort: The sort order, a leading '-' means descending
+:param fields: tuple[str, ...] | None: Return only these fields of the contacts
+:param db: AsyncSession: Access the database
 :param current_user: User: Get the current user
 :return: A list of contacts
 :rtype: List[Contact]
     """
-    contacts = await repository_contacts.get_contacts(skip, limit, current_user, db)
-    return contacts
+    after = None
+    if cursor:
+        try:
+            after = repository_contacts.decode_cursor(cursor, sort)
+        except ValueError as err:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(err))
+        skip = 0
+    contacts = await contact_cache_service.get_contacts(skip, limit, current_user, db, sort=sort, after=after, fields=fields)
+    if contacts and len(contacts) == limit:
+        response.headers['X-Next-Cursor'] = repository_contacts.encode_cursor(sort, contacts[-1])
+    response.headers['X-Total-Count'] = str(await contact_cache_service.count_contacts(current_user, db))
+    return contacts_response(contacts, fields or RESPONSE_FIELDS, response.headers)
 
 
-@router.get("/{contact_id}", response_model=ContactResponse, description='No more than 10 requests per minute', dependencies=[Depends(RateLimiter(times=10, seconds=60))])
-async def read_contact(contact_id: int, db: Session = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+@router.get("/{contact_id}", response_model=ContactResponse, description='No more than 10 requests per minute', dependencies=[Depends(RateLimiter(times=10, seconds=60)), Depends(check_etag)])
+async def read_contact(contact_id: int, db: AsyncSession = Depends(get_read_db), current_user: User = Depends(auth_service.get_current_user)):
     """
 The read_contact function is a GET request that returns the contact with the given ID.
 It requires an authorization token and will return a 404 error if no contact exists with that ID.
 
 :param contact_id: int: Specify the contact id
-:param db: Session: Pass the database session to the repository layer
+:param db: AsyncSession: Pass the database session to the repository layer
 :param current_user: User: Get the current user from the auth_service
 :return: The contact object
 :rtype: List[Contact]
     """
-    contact = await repository_contacts.get_contact(contact_id, current_user, db)
+    contact = await contact_cache_service.get_contact(contact_id, current_user, db)
     if contact is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found"
@@ -99,7 +442,7 @@ It requires an authorization token and will return a 404 error if no contact exi
 
 
 @router.post("/", response_model=ContactResponse, description='No more than 3 requests per minute', dependencies=[Depends(RateLimiter(times=3, seconds=60))])
-async def create_contact(body: ContactModel, db: Session = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+async def create_contact(body: ContactModel, db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
     """
 The create_contact function creates a new contact in the database.
     The function takes a ContactModel object as input, which is validated by pydantic.
@@ -107,7 +450,7 @@ The create_contact function creates a new contact in the database.
         both of which are provided by dependency injection via FastAPI's Depends() decorator.
 
 :param body: ContactModel: Get the data from the request body
-:param db: Session: Pass the database session to the repository function
+:param db: AsyncSession: Pass the database session to the repository function
 :param current_user: User: Get the user that is currently logged in
 :return: Contact
 :rtype: Contact
@@ -115,9 +458,77 @@ The create_contact function creates a new contact in the database.
     return await repository_contacts.create_contact(body, current_user, db)
 
 
+@router.post("/import", response_model=ContactImportReport, description='No more than 5 requests per minute', dependencies=[Depends(RateLimiter(times=5, seconds=60))])
+async def import_contacts_file(request: Request, import_format: ContactFileFormat = Query(None, alias='format'),
+                               db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+    """
+The import_contacts_file function adds the contacts of a CSV, JSON Lines or vCard file sent as the request body.
+    The body is parsed while it is being received, so the size of the file does not matter.
+    The format comes from the format parameter or, when it is missing, from the Content-Type header.
+    Invalid rows are skipped and reported, a malformed file is rejected as a whole.
+
+:param request: Request: Stream the request body
+:param import_format: ContactFileFormat: The format of the file
+:param db: AsyncSession: Pass the database session to the repository
+:param current_user: User: Get the user that is currently logged in
+:return: The number of imported and failed rows and the first errors
+:rtype: ContactImportReport
+    """
+    if import_format is None:
+        content_type = request.headers.get('content-type', '').partition(';')[0].strip().lower()
+        import_format = IMPORT_CONTENT_TYPES.get(content_type)
+        if import_format is None:
+            raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                                detail='Pass format=csv, jsonl or vcard or a matching Content-Type')
+    try:
+        return await import_contacts(request.stream(), import_format, current_user, db)
+    except ImportFormatError as err:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(err))
+
+
+@router.post("/bulk-update", response_model=ContactBulkResult, description='No more than 10 requests per minute', dependencies=[Depends(RateLimiter(times=10, seconds=60))])
+async def bulk_update_contacts(body: ContactBulkUpdate, db: AsyncSession = Depends(get_db),
+                               current_user: User = Depends(auth_service.get_current_user)):
+    """
+The bulk_update_contacts function sets the given values on every contact matching the filter.
+    Only the fields present in values are written. The filter needs at least one criterion.
+
+:param body: ContactBulkUpdate: The filter and the values to set
+:param db: AsyncSession: Pass the database session to the repository
+:param current_user: User: Get the user that is currently logged in
+:return: The number and the ids of the updated contacts
+:rtype: ContactBulkResult
+    """
+    values = body.values.dict(exclude_unset=True)
+    if not body.filter.dict(exclude_none=True) or not values:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail='The filter and the values need at least one field each')
+    ids = await repository_contacts.bulk_update_contacts(body.filter, values, current_user, db)
+    return {'affected': len(ids), 'ids': ids}
+
+
+@router.post("/bulk-delete", response_model=ContactBulkResult, description='No more than 10 requests per minute', dependencies=[Depends(RateLimiter(times=10, seconds=60))])
+async def bulk_remove_contacts(body: ContactFilter, db: AsyncSession = Depends(get_db),
+                               current_user: User = Depends(auth_service.get_current_user)):
+    """
+The bulk_remove_contacts function deletes every contact matching the filter.
+    The filter needs at least one criterion, so an empty body never clears the whole book.
+
+:param body: ContactFilter: Select the contacts to delete
+:param db: AsyncSession: Pass the database session to the repository
+:param current_user: User: Get the user that is currently logged in
+:return: The number and the ids of the deleted contacts
+:rtype: ContactBulkResult
+    """
+    if not body.dict(exclude_none=True):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='The filter needs at least one field')
+    ids = await repository_contacts.bulk_remove_contacts(body, current_user, db)
+    return {'affected': len(ids), 'ids': ids}
+
+
 @router.put("/{contact_id}", response_model=ContactResponse, status_code=status.HTTP_201_CREATED, description='No more than 10 requests per minute', dependencies=[Depends(RateLimiter(times=10, seconds=60))])
 async def update_contact(
-    body: ContactModel, contact_id: int, db: Session = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)
+    body: ContactModel, contact_id: int, db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)
 ):
     """
 The update_contact function updates a contact in the database.
@@ -126,7 +537,7 @@ The update_contact function updates a contact in the database.
 
 :param body: ContactModel: Pass the contact data to update
 :param contact_id: int: Find the contact in the database
-:param db: Session: Pass the database session to the repository
+:param db: AsyncSession: Pass the database session to the repository
 :param current_user: User: Get the user from the database
 :return: The Contact that was updated
     """
@@ -138,14 +549,35 @@ The update_contact function updates a contact in the database.
     return contact
 
 
+@router.patch("/{contact_id}", response_model=ContactResponse, description='No more than 10 requests per minute', dependencies=[Depends(RateLimiter(times=10, seconds=60))])
+async def patch_contact(
+    body: ContactPatch, contact_id: int, db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)
+):
+    """
+The patch_contact function changes some fields of a contact, the fields missing from the body keep their values.
+
+:param body: ContactPatch: The fields to change
+:param contact_id: int: Find the contact in the database
+:param db: AsyncSession: Pass the database session to the repository
+:param current_user: User: Get the user from the database
+:return: The Contact that was updated
+    """
+    contact = await repository_contacts.patch_contact(contact_id, body.dict(exclude_unset=True), current_user, db)
+    if contact is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found"
+        )
+    return contact
+
+
 @router.delete("/{contact_id}", response_model=ContactResponse, description='No more than 10 requests per minute', dependencies=[Depends(RateLimiter(times=10, seconds=60))])
-async def remove_contact(contact_id: int, db: Session = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+async def remove_contact(contact_id: int, db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
     """
 The remove_contact function removes a contact from the database.
     It takes in an integer representing the id of the contact to be removed, and returns a Contact object.
 
 :param contact_id: int: Specify the contact to be removed
-:param db: Session: Pass the database session to the repository
+:param db: AsyncSession: Pass the database session to the repository
 :param current_user: User: Get the current user, and the db: session parameter is used to get a database session
 :return: The contact that was removed
     """
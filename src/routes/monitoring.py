@@ -0,0 +1,106 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from src.conf.config import settings
+from src.database.db import engine
+from src.database.models import User
+from src.database.pool import get_pool_status
+from src.database.replicas import replica_router
+from src.services.auth import auth_service
+from src.services.contact_cache import contact_cache
+from src.services.identity_cache import identity_cache
+from src.services.rate_limit import rate_limits
+
+
+async def get_monitoring_user(current_user: User = Depends(auth_service.get_current_user)) -> User:
+    """
+The get_monitoring_user function is a dependency that lets only the users listed in settings.monitoring_emails
+    read the monitoring endpoints, which show hostnames, database users and the internals of the caches.
+
+:param current_user: User: The user who is reading
+:return: The user
+:rtype: User
+    """
+    if current_user.email not in settings.monitoring_emails:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed to read monitoring")
+    return current_user
+
+
+router = APIRouter(prefix='/monitoring', tags=["monitoring"], dependencies=[Depends(get_monitoring_user)])
+
+
+@router.get('/db-pool')
+async def read_pool_status():
+    """
+The read_pool_status function returns the current pressure of the database connection pool of this worker.
+
+:return: Pool size, checked out connections, overflow in use, checkout wait histogram and checkout timeouts
+:rtype: dict
+    """
+    return get_pool_status(engine.pool)
+
+
+@router.get('/db-replicas')
+async def read_replica_status():
+    """
+The read_replica_status function returns the read replicas known to this worker and the result of their last health check.
+
+:return: The replica urls without passwords and their health
+:rtype: list[dict]
+    """
+    return replica_router.status()
+
+
+@router.get('/contact-cache')
+async def read_contact_cache_status():
+    """
+The read_contact_cache_status function returns the hit and miss counters of the contact cache of this worker.
+
+:return: Hits per tier, misses, the hit ratio, invalidations, Redis errors and the number of local entries
+:rtype: dict
+    """
+    return contact_cache.status()
+
+
+@router.get('/identity-cache')
+async def read_identity_cache_status():
+    """
+The read_identity_cache_status function returns the hit and miss counters of the identity cache of this worker.
+
+:return: Hits per tier, misses, the hit ratio, invalidations, Redis errors and the number of local entries
+:rtype: dict
+    """
+    return identity_cache.status()
+
+
+@router.get('/password-hashing')
+async def read_password_hashing_status():
+    """
+The read_password_hashing_status function returns the load of the password hashing pool of this worker.
+
+:return: Hashes and verifications done, rehashes, rejected calls, pending calls and the time calls waited for a thread
+:rtype: dict
+    """
+    return auth_service.password_hasher.status()
+
+
+@router.get('/token-cache')
+async def read_token_cache_status():
+    """
+The read_token_cache_status function returns the hit and miss counters of the verified token cache of this worker.
+
+:return: Hits, misses, the hit ratio, local and remote revocations and the number of tokens kept
+:rtype: dict
+    """
+    return auth_service.token_cache.status()
+
+
+@router.get('/rate-limits')
+async def read_rate_limit_status():
+    """
+The read_rate_limit_status function returns the rate limiting counters of this worker.
+
+:return: Allowed and limited requests, synchronizations with Redis, Redis errors, whether the worker is limiting
+    on its own because Redis is unavailable and the number of buckets
+:rtype: dict
+    """
+    return rate_limits.status()
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, status, UploadFile, File
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import cloudinary
 import cloudinary.uploader
 
@@ -20,7 +20,7 @@ async def read_users_me(current_user: User = Depends(auth_service.get_current_us
 
 @router.patch('/avatar', response_model=UserDb)
 async def update_avatar_user(file: UploadFile = File(), current_user: User = Depends(auth_service.get_current_user),
-                             db: Session = Depends(get_db)):
+                             db: AsyncSession = Depends(get_db)):
     """
 The update_avatar_user function is used to update the avatar of a user.
     The function takes in an UploadFile object, which contains the file that will be uploaded to Cloudinary.
@@ -30,7 +30,7 @@ The update_avatar_user function is used to update the avatar of a user.
 
 :param file: UploadFile: Upload the file to cloudinary
 :param current_user: User: Get the current user from the database
-:param db: Session: Create a database session
+:param db: AsyncSession: Create a database session
 :return: The user object
 
     """
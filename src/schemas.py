@@ -1,4 +1,6 @@
-from pydantic import BaseModel, Field, EmailStr
+from enum import Enum
+
+from pydantic import BaseModel, Field, EmailStr, validator
 from typing import Optional
 from datetime import date
 
@@ -18,6 +20,119 @@ class ContactResponse(ContactModel):
         orm_mode = True
 
 
+class ContactPatch(BaseModel):
+    first_name: Optional[str] = Field(max_length=25)
+    last_name: Optional[str] = Field(max_length=25)
+    email: Optional[EmailStr]
+    phone_number: Optional[str] = Field(max_length=13)
+    birthday: Optional[date]
+
+    @validator('first_name', 'last_name', 'email')
+    def required_not_null(cls, value):
+        # may be left out, but not cleared
+        if value is None:
+            raise ValueError('may not be null')
+        return value
+
+
+class ContactFilter(BaseModel):
+    ids: Optional[list[int]] = Field(max_items=10000)
+    first_name: Optional[str]
+    last_name: Optional[str]
+    email: Optional[str]
+    email_domain: Optional[str]
+
+
+class ContactBulkUpdate(BaseModel):
+    filter: ContactFilter
+    values: ContactPatch
+
+
+class ContactBulkResult(BaseModel):
+    affected: int
+    ids: list[int]
+
+
+class DuplicateGroup(BaseModel):
+    reasons: list[str]
+    contacts: list[ContactResponse]
+
+
+class ContactMerge(BaseModel):
+    ids: list[int] = Field(min_items=2, max_items=1000)
+    primary_id: Optional[int]
+
+    @validator('ids')
+    def distinct_ids(cls, value):
+        # a merge of a contact with itself would do nothing
+        if len(set(value)) < 2:
+            raise ValueError('at least 2 distinct ids are required')
+        return value
+
+
+class ContactSearchResult(ContactResponse):
+    score: float
+
+
+class ContactSuggestion(BaseModel):
+    id: int
+    first_name: str
+    last_name: str
+    email: str
+
+
+class ContactFileFormat(str, Enum):
+    csv = 'csv'
+    jsonl = 'jsonl'
+    vcard = 'vcard'
+
+
+class ContactImportError(BaseModel):
+    row: int
+    error: str
+
+
+class ContactImportReport(BaseModel):
+    imported: int
+    failed: int
+    errors: list[ContactImportError]
+
+
+class ContactSort(str, Enum):
+    id = 'id'
+    id_desc = '-id'
+    first_name = 'first_name'
+    first_name_desc = '-first_name'
+    last_name = 'last_name'
+    last_name_desc = '-last_name'
+    email = 'email'
+    email_desc = '-email'
+
+
+class BirthdayDayCount(BaseModel):
+    month: int
+    day: int
+    count: int
+
+
+class BirthdayMonthCount(BaseModel):
+    month: int
+    count: int
+
+
+class DomainCount(BaseModel):
+    domain: str
+    count: int
+
+
+class ContactStats(BaseModel):
+    total: int
+    domains: list[DomainCount]
+    months: list[BirthdayMonthCount]
+    missing_phone: int
+    missing_birthday: int
+
+
 class UserModel(BaseModel):
     username: str = Field(min_length=5, max_length=16)
     email: EmailStr
@@ -30,7 +145,6 @@ class UserDb(BaseModel):
     # last_name: str
     username: str
     email: EmailStr
-    password: str
     avatar: str
     # refresh_token: str
 
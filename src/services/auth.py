@@ -3,17 +3,22 @@ from typing import Optional
 from jose import JWTError, jwt
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.db import get_db
-from src.repository import users as repository_users
+from src.database.events import on_users_changed
+from src.services import identity_cache as identity_cache_service
+from src.services.passwords import PasswordHasher
+from src.services.token_cache import VerifiedTokenCache
 from src.conf.config import settings
 
 
 class Auth:
-    pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+    password_hasher = PasswordHasher(settings.bcrypt_rounds, settings.password_hash_workers,
+                                     settings.password_hash_max_pending)
+    pwd_context = password_hasher.context
+    token_cache = VerifiedTokenCache(settings.token_cache_entries, settings.token_cache_ttl)
     SECRET_KEY = settings.secret_key
     ALGORITHM = settings.algorithm
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl='/api/auth/login')
@@ -24,6 +29,13 @@ class Auth:
     def get_password_hash(self, password: str):
         return self.pwd_context.hash(password)
 
+    async def hash_password(self, password: str) -> str:
+        # the request handlers hash off the event loop, the methods above block it
+        return await self.password_hasher.hash(password)
+
+    async def verify_and_update_password(self, plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+        return await self.password_hasher.verify_and_update(plain_password, hashed_password)
+
     def create_email_token(self, data: dict):
         to_encode = data.copy()
         expire = datetime.utcnow() + timedelta(days=7)
@@ -51,17 +63,24 @@ class Auth:
         encoded_refresh_token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
         return encoded_refresh_token
 
-    async def decode_refresh_token(self, refresh_token: str):
+    def decode_token(self, token: str) -> dict:
+        # a token presented again is not verified again, see VerifiedTokenCache
+        payload = self.token_cache.get(token)
+        if payload is None:
+            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            self.token_cache.put(token, payload)
+        return payload
+
+    async def decode_refresh_token(self, refresh_token: str) -> dict:
         try:
-            payload = jwt.decode(refresh_token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            payload = self.decode_token(refresh_token)
             if payload['scope'] == 'refresh_token':
-                email = payload['sub']
-                return email
+                return payload
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid scope for token')
         except JWTError:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Could not validate credentials')
 
-    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
@@ -69,7 +88,7 @@ class Auth:
         )
         try:
             # Decode JWT
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            payload = self.decode_token(token)
             if payload['scope'] == 'access_token':
                 email = payload["sub"]
                 if email is None:
@@ -79,14 +98,14 @@ class Auth:
         except JWTError as e:
             raise credentials_exception
 
-        user = await repository_users.get_user_by_email(email, db)
+        user = await identity_cache_service.get_user_by_email(email, db)
         if user is None:
             raise credentials_exception
         return user
 
     async def get_email_from_token(self, token: str):
         try:
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            payload = self.decode_token(token)
             email = payload["sub"]
             return email
         except JWTError as e:
@@ -96,3 +115,5 @@ class Auth:
 
 
 auth_service = Auth()
+# tokens are revoked along with every write to the account, such as a new refresh token
+on_users_changed(auth_service.token_cache.revoke)
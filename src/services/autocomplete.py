@@ -0,0 +1,142 @@
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+
+from redis import asyncio as aioredis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.database.events import on_contacts_changed
+from src.database.models import User
+from src.repository import contacts as repository_contacts
+from src.services.cache import listen_invalidations
+
+_MISSING = object()
+
+
+class PrefixIndex:
+    """
+The PrefixIndex class is an in-memory autocomplete index over one contact book.
+    It keeps a sorted list of lowercase keys per field, so a lookup is a binary search followed by at most limit steps.
+    """
+
+    def __init__(self, rows: list[tuple]):
+        self.rows = {}
+        fields = ([], [], [], [])
+        for contact_id, first_name, last_name, email in rows:
+            self.rows[contact_id] = (first_name, last_name, email)
+            keys = (first_name.lower(), last_name.lower(), f'{first_name} {last_name}'.lower(), email.lower())
+            for field, key in zip(fields, keys):
+                field.append((key, contact_id))
+        self.fields = [sorted(field) for field in fields]
+
+    def search(self, query: str, limit: int) -> list[dict]:
+        candidates = set()
+        for field in self.fields:
+            position = bisect_left(field, (query,))
+            for key, contact_id in field[position:position + limit]:
+                if not key.startswith(query):
+                    break
+                candidates.add(contact_id)
+
+        ranked = []
+        for contact_id in candidates:
+            first_name, last_name, email = self.rows[contact_id]
+            rank = repository_contacts.rank_suggestion(first_name, last_name, email, query)
+            ranked.append((rank, contact_id))
+        ranked.sort()
+        return [dict(zip(('id', 'first_name', 'last_name', 'email'), (contact_id, *self.rows[contact_id])))
+                for _, contact_id in ranked[:limit]]
+
+
+class AutocompleteCache:
+    """
+The AutocompleteCache class keeps the PrefixIndex of the most recently used contact books of this worker.
+    Books larger than max_contacts are remembered as too large and served from the database.
+    Entries are dropped when the book is written through this worker and, once listen runs, when the contact cache
+    of another worker publishes a write to it. They expire after ttl seconds in any case.
+    """
+
+    def __init__(self, max_users: int, max_contacts: int, ttl: float):
+        self.max_users = max_users
+        self.max_contacts = max_contacts
+        self.ttl = ttl
+        self.redis: aioredis.Redis | None = None
+        self._entries: OrderedDict[int, tuple[float, PrefixIndex | None]] = OrderedDict()
+        self._invalidations = 0
+
+    def connect(self, redis: aioredis.Redis | None) -> None:
+        self.redis = redis
+
+    def get(self, user_id: int):
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            return _MISSING
+        self._entries.move_to_end(user_id)
+        return entry[1]
+
+    def token(self) -> int:
+        return self._invalidations
+
+    def put(self, user_id: int, index: PrefixIndex | None, token: int) -> None:
+        # an invalidation since the rows were read means they may be stale
+        if token != self._invalidations:
+            return
+        self._entries[user_id] = (time.monotonic() + self.ttl, index)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_users:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_ids: set[int]) -> None:
+        self._invalidations += 1
+        for user_id in user_ids:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._invalidations += 1
+        self._entries.clear()
+
+    async def listen(self, channel: str, origin: str) -> None:
+        """
+The listen function drops the books written through the other workers until it is cancelled.
+    The writes are published by their contact cache, whose messages carry the ids of the users and the origin
+    of the worker, so the writes of this worker, which were dropped already, are skipped.
+    When the subscription fails every book is dropped, as messages may have been missed, and it subscribes again.
+
+:param channel: str: The invalidation channel of the contact cache
+:param origin: str: The origin of the contact cache of this worker
+:return: None
+        """
+        await listen_invalidations(self.redis, channel, origin, self.invalidate, self.clear)
+
+
+autocomplete_cache = AutocompleteCache(settings.autocomplete_cache_users, settings.autocomplete_cache_contacts,
+                                       settings.autocomplete_cache_ttl)
+on_contacts_changed(autocomplete_cache.invalidate)
+
+
+async def suggest(query: str, limit: int, user: User, db: AsyncSession) -> list[dict]:
+    """
+The suggest function returns the autocomplete suggestions for a query.
+    Small contact books are answered from the in-memory PrefixIndex, large ones by the prefix indexes of the database.
+
+:param query: str: What the user typed so far
+:param limit: int: The number of suggestions
+:param user: User: The owner of the contacts
+:param db: AsyncSession: Access the database
+:return: Suggestions with id, first_name, last_name and email, best first
+:rtype: list[dict]
+    """
+    query = ' '.join(query.lower().split())
+    if not query:
+        return []
+    if autocomplete_cache.max_users > 0:
+        index = autocomplete_cache.get(user.id)
+        if index is _MISSING:
+            token = autocomplete_cache.token()
+            rows = await repository_contacts.get_suggestion_rows(user, db, autocomplete_cache.max_contacts + 1)
+            index = PrefixIndex(rows) if len(rows) <= autocomplete_cache.max_contacts else None
+            autocomplete_cache.put(user.id, index, token)
+        if index is not None:
+            return index.search(query, limit)
+    return await repository_contacts.autocomplete(query, limit, user, db)
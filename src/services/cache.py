@@ -0,0 +1,257 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable
+
+import orjson
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError, WatchError
+
+_MISSING = object()
+# A generation must outlive every read that started before it changed
+GENERATION_TTL = 24 * 60 * 60
+# Seconds to wait before subscribing again after the pub/sub connection failed
+RESUBSCRIBE_DELAY = 1
+
+
+async def listen_invalidations(redis: aioredis.Redis, channel: str, origin: str, invalidate: Callable[[set], None],
+                               failed: Callable[[], None]) -> None:
+    """
+The listen_invalidations function calls invalidate with the owners of every invalidation that a ReadThroughCache
+    of another worker publishes on channel, until it is cancelled. Messages of the given origin are skipped,
+    the worker applied them when it published them. When the subscription fails, failed is called, as messages
+    may have been missed, and it subscribes again.
+    Other worker-local caches of the same owners follow the invalidations of a ReadThroughCache with it.
+
+:param redis: aioredis.Redis: The Redis the invalidations are published on
+:param channel: str: The channel of the ReadThroughCache
+:param origin: str: The origin of the ReadThroughCache of this worker
+:param invalidate: Callable[[set], None]: Drops the reads of the owners
+:param failed: Callable[[], None]: Drops every read
+:return: None
+    """
+    while True:
+        try:
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(channel)
+                async for message in pubsub.listen():
+                    if message['type'] != 'message':
+                        continue
+                    data = orjson.loads(message['data'])
+                    if data['origin'] != origin:
+                        invalidate(set(data['owners']))
+        except (RedisError, OSError):
+            failed()
+            await asyncio.sleep(RESUBSCRIBE_DELAY)
+
+
+class LocalCache:
+    """
+The LocalCache class is the in-process tier: the most recently used reads of this worker, each for ttl seconds.
+    Reads are grouped by owner, such as a user's contact book, and the reads of an owner are dropped together
+    when it is written, through this worker or, by pub/sub, another one.
+    A read that was loaded while its owner was invalidated is not stored, see token.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple[Hashable, bytes], tuple[float, object]] = OrderedDict()
+        self._keys: dict[Hashable, set[bytes]] = {}
+        # the invalidation counter when each owner was last invalidated, and the counter below which every
+        # token is stale because that record was cleared to stay bounded
+        self._counter = 0
+        self._invalidated: dict[Hashable, int] = {}
+        self._floor = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, owner: Hashable, key: bytes):
+        entry = self._entries.get((owner, key))
+        if entry is None or entry[0] < time.monotonic():
+            return _MISSING
+        self._entries.move_to_end((owner, key))
+        return entry[1]
+
+    def token(self) -> int:
+        return self._counter
+
+    def put(self, owner: Hashable, key: bytes, value, token: int) -> None:
+        if token < self._floor or self._invalidated.get(owner, -1) > token or self.max_entries <= 0:
+            return
+        self._entries[(owner, key)] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end((owner, key))
+        self._keys.setdefault(owner, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            (old_owner, old_key), _ = self._entries.popitem(last=False)
+            keys = self._keys[old_owner]
+            keys.discard(old_key)
+            if not keys:
+                del self._keys[old_owner]
+
+    def invalidate(self, owners: set) -> None:
+        self._counter += 1
+        if len(self._invalidated) > self.max_entries:
+            self._invalidated.clear()
+            self._floor = self._counter
+        for owner in owners:
+            self._invalidated[owner] = self._counter
+            for key in self._keys.pop(owner, ()):
+                del self._entries[(owner, key)]
+
+    def clear(self) -> None:
+        self.invalidate(set(self._keys))
+
+
+class ReadThroughCache:
+    """
+The ReadThroughCache class caches reads in two tiers: a LocalCache per worker and, once connect is called,
+    Redis shared by all workers. A read is looked up in the LocalCache, then in Redis, then loaded from the
+    database and stored in both. Reads belong to an owner, an int or a str, whose reads are invalidated together.
+
+    An invalidation drops the owner's reads from the LocalCache right away. It also drops them from Redis and
+    publishes the owners, so the other workers drop them from their LocalCache too. Redis keeps a generation
+    per owner that every invalidation increments, and a read loaded under an older generation is not stored.
+    Redis errors are counted and the read falls back to the database, the cache never fails a read.
+    """
+
+    def __init__(self, prefix: str, max_entries: int, ttl: float, redis_ttl: float):
+        self.prefix = prefix
+        self.channel = f'{prefix}:invalidate'
+        self.local = LocalCache(max_entries, ttl)
+        self.redis_ttl = redis_ttl
+        self.redis: aioredis.Redis | None = None
+        # lets a worker skip its own invalidation messages
+        self.origin = uuid.uuid4().hex
+        self._pending: set[asyncio.Task] = set()
+        self.metrics = dict.fromkeys(('local_hits', 'redis_hits', 'misses', 'invalidations', 'remote_invalidations',
+                                      'redis_errors'), 0)
+
+    def connect(self, redis: aioredis.Redis | None) -> None:
+        self.redis = redis
+
+    def status(self) -> dict:
+        hits = self.metrics['local_hits'] + self.metrics['redis_hits']
+        reads = hits + self.metrics['misses']
+        return {**self.metrics, 'hit_ratio': hits / reads if reads else None, 'local_entries': len(self.local),
+                'redis': self.redis is not None}
+
+    def _hash_key(self, owner: Hashable) -> str:
+        # the reads of an owner, one field per read
+        return f'{self.prefix}:{owner}'
+
+    def _generation_key(self, owner: Hashable) -> str:
+        return f'{self.prefix}:{owner}:generation'
+
+    async def fetch(self, owner: Hashable, key: bytes, load: Callable[[], Awaitable], dump: Callable = orjson.dumps,
+                    load_payload: Callable = orjson.loads):
+        """
+The fetch function returns a read from the first tier that has it, loading it on a miss.
+
+:param owner: Hashable: The owner of the read, such as the id of the user whose contacts are read
+:param key: bytes: Identifies the read among the owner's, such as the function and its arguments
+:param load: Callable[[], Awaitable]: Reads the value from the database
+:param dump: Callable: Encodes the value for Redis
+:param load_payload: Callable: Decodes the value from Redis
+:return: The value
+        """
+        value = self.local.get(owner, key)
+        if value is not _MISSING:
+            self.metrics['local_hits'] += 1
+            return value
+        token = self.local.token()
+        generation = _MISSING
+        if self.redis is not None:
+            try:
+                # this worker's own writes are gone from Redis before it reads there again
+                if self._pending:
+                    await asyncio.gather(*self._pending, return_exceptions=True)
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    pipe.hget(self._hash_key(owner), key)
+                    pipe.get(self._generation_key(owner))
+                    payload, generation = await pipe.execute()
+                if payload is not None:
+                    value = load_payload(payload)
+                    self.local.put(owner, key, value, token)
+                    self.metrics['redis_hits'] += 1
+                    return value
+            except (RedisError, OSError):
+                self.metrics['redis_errors'] += 1
+                generation = _MISSING
+        self.metrics['misses'] += 1
+        value = await load()
+        self.local.put(owner, key, value, token)
+        if generation is not _MISSING:
+            await self._store(owner, key, dump(value), generation)
+        return value
+
+    async def _store(self, owner: Hashable, key: bytes, payload: bytes, generation: bytes | None) -> None:
+        generation_key = self._generation_key(owner)
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                await pipe.watch(generation_key)
+                if await pipe.get(generation_key) != generation:
+                    return
+                pipe.multi()
+                pipe.hset(self._hash_key(owner), key, payload)
+                pipe.expire(self._hash_key(owner), int(self.redis_ttl))
+                await pipe.execute()
+        except WatchError:
+            pass
+        except (RedisError, OSError):
+            self.metrics['redis_errors'] += 1
+
+    def invalidate(self, owners: set) -> None:
+        """
+The invalidate function drops the cached reads of the owners that were written.
+    It is called once the write has been committed: the LocalCache is cleared right away, and Redis and the other
+    workers are told in the background. The next read of this worker waits for that to finish.
+
+:param owners: set: The owners of the reads
+:return: None
+        """
+        self.metrics['invalidations'] += 1
+        self.local.invalidate(owners)
+        if self.redis is None:
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(self._invalidate_redis(set(owners)))
+        except RuntimeError:
+            # committed outside of the event loop, Redis entries expire after redis_ttl
+            return
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _invalidate_redis(self, owners: set) -> None:
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                for owner in sorted(owners):
+                    pipe.incr(self._generation_key(owner))
+                    pipe.expire(self._generation_key(owner), GENERATION_TTL)
+                    pipe.delete(self._hash_key(owner))
+                pipe.publish(self.channel, orjson.dumps({'origin': self.origin, 'owners': sorted(owners)}))
+                await pipe.execute()
+        except (RedisError, OSError):
+            self.metrics['redis_errors'] += 1
+
+    async def listen(self) -> None:
+        """
+The listen function applies the invalidations published by the other workers until it is cancelled.
+    When the subscription fails the LocalCache is cleared, as messages may have been missed, and it subscribes again.
+
+:return: None
+        """
+        def invalidate(owners: set) -> None:
+            self.metrics['remote_invalidations'] += 1
+            self.local.invalidate(owners)
+
+        def failed() -> None:
+            self.metrics['redis_errors'] += 1
+            self.local.clear()
+
+        await listen_invalidations(self.redis, self.channel, self.origin, invalidate, failed)
+
+    def clear(self) -> None:
+        self.local.clear()
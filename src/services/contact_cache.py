@@ -0,0 +1,201 @@
+from collections import namedtuple
+from datetime import date
+from functools import lru_cache
+
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.database.events import on_contacts_changed
+from src.database.models import User
+from src.repository import contacts as repository_contacts
+from src.schemas import ContactSort
+from src.services import duplicates as duplicates_service
+from src.services.cache import ReadThroughCache
+
+
+@lru_cache(maxsize=128)
+def _row_type(columns: tuple[str, ...]) -> type:
+    return namedtuple('ContactRow', columns)
+
+
+def dump_rows(rows: list) -> bytes:
+    """
+The dump_rows function encodes the rows read by the repository for Redis, the column names come first.
+
+:param rows: list: Rows with named columns
+:return: The encoded rows
+:rtype: bytes
+    """
+    return orjson.dumps([list(rows[0]._fields) if rows else [], *(tuple(row) for row in rows)])
+
+
+def load_rows(payload: bytes) -> list:
+    """
+The load_rows function decodes the rows of dump_rows into named tuples, which read like the rows of the repository.
+
+:param payload: bytes: The encoded rows
+:return: The rows
+:rtype: list
+    """
+    columns, *rows = orjson.loads(payload)
+    row_type = _row_type(tuple(columns))
+    if 'birthday' in columns:
+        position = columns.index('birthday')
+        for row in rows:
+            if row[position] is not None:
+                row[position] = date.fromisoformat(row[position])
+    return [row_type(*row) for row in rows]
+
+
+# The reads of a user's contact book, dropped on every write to the book. Misses read from a replica only once it
+# has caught up with the primary, see caught_up
+contact_cache = ReadThroughCache('contacts:cache', settings.contact_cache_entries, settings.contact_cache_ttl,
+                                 settings.contact_cache_redis_ttl)
+on_contacts_changed(contact_cache.invalidate)
+
+
+def _key(*parts) -> bytes:
+    return orjson.dumps(parts)
+
+
+async def caught_up(user: User, db: AsyncSession, version: int | None = None) -> AsyncSession:
+    """
+The caught_up function picks the session for a read that must be at least as new as a version of the book.
+    A replica session is kept when the replica has the version already, otherwise the read goes to the primary.
+    A lagging replica would otherwise fill the cache with contacts older than the generation they are stored
+    under, which the invalidation that should have dropped them has already passed.
+
+:param user: User: The owner of the contacts
+:param db: AsyncSession: The session of get_read_db, a replica session names its primary in info['primary']
+:param version: int | None: The version to reach, the current version on the primary when left out
+:return: The session to read with
+:rtype: AsyncSession
+    """
+    primary = db.info.get('primary')
+    if primary is None:
+        return db
+    if version is None:
+        version = await repository_contacts.get_contacts_version(user, primary)
+    # the replica applies writes in order, so reads after its version see at least that version
+    if await repository_contacts.get_contacts_version(user, db) >= version:
+        return db
+    return primary
+
+
+def _contact_row(contact):
+    return _row_type(repository_contacts.CONTACT_FIELDS)(*(getattr(contact, name)
+                                                          for name in repository_contacts.CONTACT_FIELDS))
+
+
+async def get_contact(contact_id: int, user: User, db: AsyncSession):
+    """
+The get_contact function is the cached repository get_contact.
+
+:param contact_id: int: The id of the contact
+:param user: User: The owner of the contact
+:param db: AsyncSession: Access the database on a miss
+:return: A row with the CONTACT_FIELDS of the contact, None when the user has no such contact
+    """
+    async def load():
+        contact = await repository_contacts.get_contact(contact_id, user, await caught_up(user, db))
+        return [] if contact is None else [_contact_row(contact)]
+
+    rows = await contact_cache.fetch(user.id, _key('contact', contact_id), load, dump_rows, load_rows)
+    return rows[0] if rows else None
+
+
+async def get_contacts(skip: int, limit: int, user: User, db: AsyncSession, sort: ContactSort | str = ContactSort.id,
+                       after: tuple | None = None, fields: tuple[str, ...] | None = None) -> list:
+    """
+The get_contacts function is the cached repository get_contacts, see there for the arguments.
+
+:return: Rows with the fields followed by the sort key
+:rtype: list
+    """
+    async def load():
+        return await repository_contacts.get_contacts(skip, limit, user, await caught_up(user, db), sort=sort,
+                                                      after=after, fields=fields)
+
+    key = _key('contacts', skip, limit, ContactSort(sort).value, after, fields)
+    return await contact_cache.fetch(user.id, key, load, dump_rows, load_rows)
+
+
+async def search_contact(search_params: dict, user: User, db: AsyncSession, fields: tuple[str, ...] | None = None) -> list:
+    """
+The search_contact function is the cached repository search_contact, see there for the arguments.
+
+:return: Rows with the fields of the contacts
+:rtype: list
+    """
+    async def load():
+        return await repository_contacts.search_contact(search_params, user, await caught_up(user, db), fields=fields)
+
+    key = _key('search', sorted((name, value) for name, value in search_params.items() if value), fields)
+    return await contact_cache.fetch(user.id, key, load, dump_rows, load_rows)
+
+
+async def get_upcoming_birthdays(db: AsyncSession, user: User, days: int = 7) -> list:
+    """
+The get_upcoming_birthdays function is the cached repository get_upcoming_birthdays.
+    The day is part of the key, as the window moves at midnight.
+
+:param db: AsyncSession: Access the database on a miss
+:param user: User: The owner of the contacts
+:param days: int: The size of the window in days, today included
+:return: Rows with the CONTACT_FIELDS of the contacts, nearest birthday first
+:rtype: list
+    """
+    today = date.today()
+
+    async def load():
+        return await repository_contacts.get_upcoming_birthdays(await caught_up(user, db), user, days, today=today)
+
+    return await contact_cache.fetch(user.id, _key('upcoming', days, today), load, dump_rows, load_rows)
+
+
+async def count_contacts(user: User, db: AsyncSession) -> int:
+    """
+The count_contacts function is the cached repository count_contacts.
+
+:param user: User: The owner of the contacts
+:param db: AsyncSession: Access the database on a miss
+:return: The number of contacts
+:rtype: int
+    """
+    async def load():
+        return await repository_contacts.count_contacts(user, await caught_up(user, db))
+
+    return await contact_cache.fetch(user.id, _key('count'), load)
+
+
+async def get_contacts_version(user: User, db: AsyncSession) -> int:
+    """
+The get_contacts_version function is the cached repository get_contacts_version, so a 304 needs no query.
+    A miss reads the version from the primary, as it is the version the other reads must reach.
+
+:param user: User: The owner of the contacts
+:param db: AsyncSession: Access the database on a miss, through its primary for a replica session
+:return: The version of the book
+:rtype: int
+    """
+    primary = db.info.get('primary', db)
+    return await contact_cache.fetch(user.id, _key('version'),
+                                     lambda: repository_contacts.get_contacts_version(user, primary))
+
+
+async def find_duplicates(user: User, db: AsyncSession, version: int) -> list[dict]:
+    """
+The find_duplicates function is the cached duplicates find_duplicates. The groups are keyed by the version of
+    the book, so the pages of the groups and the repeated visits are served from one scan of the book.
+
+:param user: User: The owner of the contacts
+:param db: AsyncSession: Access the database on a miss
+:param version: int: The version of the book, from get_contacts_version
+:return: The groups ordered by their first contact, each with the sorted ids and the reasons they matched
+:rtype: list[dict]
+    """
+    async def load():
+        return await duplicates_service.find_duplicates(user, await caught_up(user, db, version))
+
+    return await contact_cache.fetch(user.id, _key('duplicates', version), load)
@@ -0,0 +1,112 @@
+import csv
+import io
+import json
+import zlib
+from typing import AsyncIterator
+
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import User
+from src.repository import contacts as repository_contacts
+from src.schemas import ContactFileFormat
+
+MEDIA_TYPES = {
+    ContactFileFormat.csv: 'text/csv',
+    ContactFileFormat.jsonl: 'application/x-ndjson',
+    ContactFileFormat.vcard: 'text/vcard',
+}
+EXTENSIONS = {
+    ContactFileFormat.csv: 'csv',
+    ContactFileFormat.jsonl: 'jsonl',
+    ContactFileFormat.vcard: 'vcf',
+}
+# Bytes collected before a chunk is sent, and rows fetched from the database at once
+CHUNK_SIZE = 64 * 1024
+FETCH_SIZE = 1000
+
+
+class CSVFormatter:
+    def __init__(self):
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer, lineterminator='\r\n')
+
+    def header(self) -> str:
+        return self.row(repository_contacts.EXPORT_COLUMNS)
+
+    def row(self, values) -> str:
+        self.writer.writerow(['' if value is None else value for value in values])
+        text = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return text
+
+    def contact(self, contact: Row) -> str:
+        return self.row(contact)
+
+
+def format_jsonl(contact: Row) -> str:
+    record = contact._asdict()
+    if record['birthday'] is not None:
+        record['birthday'] = record['birthday'].isoformat()
+    return json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def _vcard_escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def format_vcard(contact: Row) -> str:
+    first_name, last_name = _vcard_escape(contact.first_name), _vcard_escape(contact.last_name)
+    lines = ['BEGIN:VCARD', 'VERSION:3.0', f'N:{last_name};{first_name};;;', f'FN:{first_name} {last_name}',
+             f'EMAIL:{_vcard_escape(contact.email)}']
+    if contact.phone_number:
+        lines.append(f'TEL:{_vcard_escape(contact.phone_number)}')
+    if contact.birthday:
+        lines.append(f'BDAY:{contact.birthday.isoformat()}')
+    lines.append('END:VCARD')
+    return '\r\n'.join(lines) + '\r\n'
+
+
+async def export_contacts(export_format: ContactFileFormat, user: User, db: AsyncSession,
+                          compress: bool = False) -> AsyncIterator[bytes]:
+    """
+The export_contacts function serializes the whole contact book of the user in one of the import formats.
+    Contacts are read through stream_contacts and written row by row into chunks of about CHUNK_SIZE bytes,
+    so the memory used does not depend on the size of the book. The CSV and JSON Lines files can be imported back.
+
+:param export_format: ContactFileFormat: The format of the file
+:param user: User: The owner of the contacts
+:param db: AsyncSession: Access the database, it must stay open until the iterator is exhausted
+:param compress: bool: Gzip the file
+:return: The chunks of the file
+:rtype: AsyncIterator[bytes]
+    """
+    if export_format == ContactFileFormat.csv:
+        formatter = CSVFormatter()
+        parts, size = [formatter.header()], 0
+        format_contact = formatter.contact
+    else:
+        parts, size = [], 0
+        format_contact = format_jsonl if export_format == ContactFileFormat.jsonl else format_vcard
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def flush() -> bytes:
+        data = ''.join(parts).encode()
+        parts.clear()
+        return compressor.compress(data) if compressor else data
+
+    async for contact in repository_contacts.stream_contacts(user, db, FETCH_SIZE):
+        text = format_contact(contact)
+        parts.append(text)
+        size += len(text)
+        if size >= CHUNK_SIZE:
+            size = 0
+            chunk = flush()
+            if chunk:
+                yield chunk
+    chunk = flush()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
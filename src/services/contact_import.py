@@ -0,0 +1,272 @@
+import asyncio
+import codecs
+import csv
+import json
+import re
+from datetime import date, datetime
+from typing import AsyncIterator, Iterator
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.database.models import User
+from src.repository import contacts as repository_contacts
+from src.schemas import ContactFileFormat, ContactModel
+
+CONTACT_FIELDS = ('first_name', 'last_name', 'email', 'phone_number', 'birthday')
+# A line longer than this is not a contact, stop instead of buffering it
+MAX_LINE_LENGTH = 64 * 1024
+_LINE_BREAK = re.compile(r'\r\n|\r|\n')
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+The iter_lines function splits a stream of UTF-8 bytes into lines without line endings.
+    Only the current line is kept in memory, a byte order mark at the start is dropped.
+
+:param chunks: AsyncIterator[bytes]: The uploaded bytes
+:return: The lines of the upload
+:rtype: AsyncIterator[str]
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    pending = ''
+    async for chunk in chunks:
+        try:
+            pending += decoder.decode(chunk)
+        except UnicodeDecodeError as err:
+            raise ImportFormatError(f'The upload is not valid UTF-8: {err.reason}')
+        # a trailing \r may be the first half of a \r\n split between chunks
+        carriage_return = pending.endswith('\r')
+        *lines, pending = _LINE_BREAK.split(pending[:-1] if carriage_return else pending)
+        for line in lines:
+            yield line
+        if carriage_return:
+            pending += '\r'
+        if len(pending) > MAX_LINE_LENGTH:
+            raise ImportFormatError(f'A line is longer than {MAX_LINE_LENGTH} characters')
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        for line in _LINE_BREAK.split(pending.removesuffix('\r')):
+            yield line
+
+
+def _blank_to_none(record: dict) -> dict:
+    return {field: value.strip() or None if isinstance(value, str) else value for field, value in record.items()}
+
+
+async def parse_csv(lines: AsyncIterator[str]) -> AsyncIterator[dict | ImportFormatError]:
+    """
+The parse_csv function reads contacts from CSV with a header row naming the ContactModel fields.
+    Quoted values may span lines: a record ends on the line that closes all of its quotes. Unknown columns are ignored.
+
+:param lines: AsyncIterator[str]: The lines of the upload
+:return: One dict of fields per record, or the error that made the record unreadable
+:rtype: AsyncIterator[dict | ImportFormatError]
+    """
+    header = None
+    record, quotes, length = [], 0, 0
+    async for line in lines:
+        record.append(line)
+        quotes += line.count('"')
+        length += len(line)
+        if quotes % 2:
+            if length > MAX_LINE_LENGTH:
+                raise ImportFormatError(f'A record is longer than {MAX_LINE_LENGTH} characters')
+            continue
+        text, record, quotes, length = '\n'.join(record), [], 0, 0
+        if header is None:
+            header = [name.strip().lower() for name in next(csv.reader([text]))]
+            if not {'first_name', 'last_name', 'email'} <= set(header):
+                raise ImportFormatError('The CSV header must name first_name, last_name and email')
+            continue
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if len(values) > len(header):
+            yield ImportFormatError(f'Expected {len(header)} values, got {len(values)}')
+            continue
+        yield _blank_to_none({name: value for name, value in zip(header, values) if name in CONTACT_FIELDS})
+    if record:
+        yield ImportFormatError('Unterminated quoted value')
+
+
+async def parse_jsonl(lines: AsyncIterator[str]) -> AsyncIterator[dict | ImportFormatError]:
+    """
+The parse_jsonl function reads contacts from JSON Lines, one object with ContactModel fields per line.
+
+:param lines: AsyncIterator[str]: The lines of the upload
+:return: One dict of fields per non-empty line, or the error that made the line unreadable
+:rtype: AsyncIterator[dict | ImportFormatError]
+    """
+    async for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as err:
+            yield ImportFormatError(f'Invalid JSON: {err.msg}')
+            continue
+        if not isinstance(record, dict):
+            yield ImportFormatError('Expected a JSON object')
+            continue
+        yield _blank_to_none({name: value for name, value in record.items() if name in CONTACT_FIELDS})
+
+
+_VCARD_COMPONENT = re.compile(r'((?:\\.|[^;\\])*)(?:;|$)')
+
+
+def _vcard_unescape(value: str) -> str:
+    return re.sub(r'\\(.)', lambda match: '\n' if match.group(1) in 'nN' else match.group(1), value)
+
+
+def _vcard_birthday(value: str) -> date | str:
+    for pattern, length in (('%Y-%m-%d', 10), ('%Y%m%d', 8)):
+        try:
+            return datetime.strptime(value[:length], pattern).date()
+        except ValueError:
+            pass
+    return value
+
+
+def _vcard_record(properties: list[tuple[str, str]]) -> dict:
+    record = {}
+    full_name = ''
+    for name, value in properties:
+        if name == 'N' and 'last_name' not in record:
+            # Family;Given;Additional;Prefixes;Suffixes, a \; inside a component is not a separator
+            components = _VCARD_COMPONENT.findall(value) + ['']
+            record['last_name'] = _vcard_unescape(components[0])
+            record['first_name'] = _vcard_unescape(components[1])
+        elif name == 'FN':
+            full_name = _vcard_unescape(value)
+        elif name == 'EMAIL':
+            record.setdefault('email', _vcard_unescape(value))
+        elif name == 'TEL':
+            record.setdefault('phone_number', _vcard_unescape(value))
+        elif name == 'BDAY':
+            record.setdefault('birthday', _vcard_birthday(value))
+    if not record.get('first_name') and not record.get('last_name'):
+        record['first_name'], _, record['last_name'] = full_name.partition(' ')
+    return _blank_to_none(record)
+
+
+def _vcard_properties(lines: list[str]) -> Iterator[tuple[str, str]]:
+    for line in lines:
+        name, _, value = line.partition(':')
+        # drop the group prefix and the parameters: item1.EMAIL;TYPE=work -> EMAIL
+        yield name.split(';')[0].rpartition('.')[2].upper(), value
+
+
+async def parse_vcard(lines: AsyncIterator[str]) -> AsyncIterator[dict | ImportFormatError]:
+    """
+The parse_vcard function reads contacts from vCard 3.0 or 4.0 cards.
+    The name comes from N, or from FN when N is empty, and the first EMAIL, TEL and BDAY of a card are used.
+
+:param lines: AsyncIterator[str]: The lines of the upload
+:return: One dict of fields per card, or the error that made the card unreadable
+:rtype: AsyncIterator[dict | ImportFormatError]
+    """
+    card = None
+    async for line in lines:
+        if card is not None and line[:1] in (' ', '\t') and card:
+            # folded line, continues the previous property
+            card[-1] += line[1:]
+            continue
+        keyword = line.strip().upper()
+        if keyword == 'BEGIN:VCARD':
+            if card is not None:
+                yield ImportFormatError('BEGIN:VCARD inside a card')
+            card = []
+        elif keyword == 'END:VCARD':
+            if card is None:
+                yield ImportFormatError('END:VCARD outside a card')
+                continue
+            yield _vcard_record(list(_vcard_properties(card)))
+            card = None
+        elif card is not None:
+            card.append(line)
+            if len(card) > 1000:
+                raise ImportFormatError('A card has more than 1000 lines')
+    if card is not None:
+        yield ImportFormatError('Missing END:VCARD')
+
+
+PARSERS = {
+    ContactFileFormat.csv: parse_csv,
+    ContactFileFormat.jsonl: parse_jsonl,
+    ContactFileFormat.vcard: parse_vcard,
+}
+
+
+def _validation_message(err: ValidationError) -> str:
+    return '; '.join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in err.errors())
+
+
+def validate_batch(records: list[tuple[int, dict | ImportFormatError]]) -> tuple[list[ContactModel], list[dict]]:
+    """
+The validate_batch function checks parsed records against ContactModel.
+
+:param records: list[tuple[int, dict | ImportFormatError]]: The records with their row numbers
+:return: The valid contacts and the errors of the other rows
+:rtype: tuple[list[ContactModel], list[dict]]
+    """
+    contacts, errors = [], []
+    for row, record in records:
+        if isinstance(record, ImportFormatError):
+            errors.append({'row': row, 'error': str(record)})
+            continue
+        try:
+            contacts.append(ContactModel(**record))
+        except ValidationError as err:
+            errors.append({'row': row, 'error': _validation_message(err)})
+    return contacts, errors
+
+
+async def import_contacts(chunks: AsyncIterator[bytes], import_format: ContactFileFormat, user: User, db: AsyncSession,
+                          batch_size: int | None = None, max_errors: int | None = None) -> dict:
+    """
+The import_contacts function adds the contacts of an uploaded file to the user's book.
+    The upload is parsed as it arrives and validated against ContactModel in batches. Email validation is slow,
+    so batches are validated in a worker thread to keep the event loop serving other requests.
+    Valid rows are inserted batch by batch, invalid rows are skipped and reported with their 1-based
+    position among the records of the file. All valid rows are committed together at the end,
+    a malformed file raises ImportFormatError and adds nothing.
+
+:param chunks: AsyncIterator[bytes]: The uploaded bytes
+:param import_format: ContactFileFormat: The format of the upload
+:param user: User: The owner of the new contacts
+:param db: AsyncSession: Access the database
+:param batch_size: int | None: The number of rows per insert, settings.import_batch_size by default
+:param max_errors: int | None: The number of errors to report in detail, settings.import_max_errors by default
+:return: The number of imported and failed rows and the first errors
+:rtype: dict
+    """
+    batch_size = batch_size or settings.import_batch_size
+    max_errors = settings.import_max_errors if max_errors is None else max_errors
+    report = {'imported': 0, 'failed': 0, 'errors': []}
+
+    async def flush(records):
+        contacts, errors = await asyncio.to_thread(validate_batch, records)
+        report['imported'] += await repository_contacts.insert_contacts(contacts, user, db)
+        report['failed'] += len(errors)
+        report['errors'].extend(errors[:max_errors - len(report['errors'])])
+
+    batch = []
+    try:
+        async for record in PARSERS[import_format](iter_lines(chunks)):
+            batch.append((len(batch) + report['imported'] + report['failed'] + 1, record))
+            if len(batch) >= batch_size:
+                await flush(batch)
+                batch = []
+        if batch:
+            await flush(batch)
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
+    return report
@@ -0,0 +1,193 @@
+import asyncio
+import re
+from datetime import date
+from functools import lru_cache
+
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import User
+from src.repository import contacts as repository_contacts
+from src.repository.search_utils import similarity
+
+# Two contacts whose names sound alike are duplicates when their names are at least this similar
+NAME_SIMILARITY = 0.5
+# The contacts a name is compared with per sound key, which keeps common names linear as well
+MAX_NAME_CANDIDATES = 4
+# The national significant number is 9 digits or more in most numbering plans, so the last 9 digits
+# are the same whether the number was written with the country code, a trunk prefix or neither
+PHONE_DIGITS = 9
+_LETTERS = re.compile(r'[^\W\d_]+')
+_NOT_DIGIT = re.compile(r'\D')
+_PHONE_PUNCTUATION = str.maketrans(dict.fromkeys(' +-().'))
+# Soundex digits of the Latin consonants, vowels become a separator 0 that is dropped after merging repeated
+# digits, h and w are dropped right away so they do not separate, and other letters are kept as they are
+_SOUNDEX = str.maketrans({**{letter: str(code) for code, letters in
+                             enumerate(('bfpv', 'cgjkqsxz', 'dt', 'l', 'mn', 'r'), 1) for letter in letters},
+                          **dict.fromkeys('aeiouy', '0'), **dict.fromkeys('hw')})
+
+
+def soundex(word: str) -> str:
+    """
+The soundex function returns the American Soundex code of a lowercase word: the first letter and three digits
+    for the consonants that follow, so names that sound alike, such as Jon and John, get the same code.
+    Letters outside the Latin alphabet have no digit and are kept as they are.
+
+:param word: str: The lowercase word
+:return: The code, at most four characters
+:rtype: str
+    """
+    # the first letter takes part in merging repeated digits but is written as a letter
+    mapped = word[1:].translate(_SOUNDEX)
+    code, last = word[0], word[0].translate(_SOUNDEX)
+    for digit in mapped:
+        if digit != last:
+            if digit != '0':
+                code += digit
+            last = digit
+    return code.ljust(4, '0')[:4] if word.isascii() else code[:4]
+
+
+@lru_cache(maxsize=100000)
+def sound_codes(name: str) -> str:
+    """
+The sound_codes function returns the Soundex codes of the words of a name in sorted order.
+    Names repeat a lot within a book, so the codes are cached.
+
+:param name: str: A first or last name
+:return: The codes separated by spaces, empty when the name has no letters
+:rtype: str
+    """
+    return ' '.join(sorted(soundex(word) for word in _LETTERS.findall(name.lower())))
+
+
+def name_key(first_name: str, last_name: str) -> str | None:
+    """
+The name_key function is the blocking key of a name: the Soundex codes of its words.
+    Case, spacing, punctuation and swapping the first and the last name do not change it.
+
+:param first_name: str: The first name
+:param last_name: str: The last name
+:return: The key, None when the name has no letters
+:rtype: str | None
+    """
+    first, last = sound_codes(first_name), sound_codes(last_name)
+    return (f'{first} {last}' if first <= last else f'{last} {first}').strip() or None
+
+
+def phone_key(phone_number: str | None) -> str | None:
+    """
+The phone_key function is the blocking key of a phone number: its last PHONE_DIGITS digits.
+
+:param phone_number: str | None: The phone number as it was written
+:return: The key, None when the number is missing or too short to tell contacts apart
+:rtype: str | None
+    """
+    if not phone_number:
+        return None
+    digits = phone_number.translate(_PHONE_PUNCTUATION)
+    if not digits.isdigit():
+        digits = _NOT_DIGIT.sub('', digits)
+    return digits[-PHONE_DIGITS:] if len(digits) >= PHONE_DIGITS else None
+
+
+def same_person(first: tuple[str, str, date | None], second: tuple[str, str, date | None]) -> bool:
+    """
+The same_person function tells whether two contacts with names that sound alike are the same person:
+    the birthdays must not differ and the full names must be at least NAME_SIMILARITY similar.
+
+:param first: tuple[str, str, date | None]: The first name, last name and birthday of a contact
+:param second: tuple[str, str, date | None]: The first name, last name and birthday of the other contact
+:return: True when they are likely the same person
+:rtype: bool
+    """
+    if first[2] and second[2] and first[2] != second[2]:
+        return False
+    if first[:2] == second[:2]:
+        return True
+    return similarity(f'{first[0]} {first[1]}', f'{second[0]} {second[1]}') >= NAME_SIMILARITY
+
+
+class DuplicateFinder:
+    """
+The DuplicateFinder class groups the likely duplicates of one contact book.
+    Every contact is hashed by its email, its phone number and the sound of its name, and only contacts
+    that share a key are compared, so the work grows linearly with the book instead of with every pair.
+    Contacts sharing an email or a phone number are duplicates. Contacts whose names sound alike are
+    duplicates when the names are similar enough and their birthdays do not differ.
+    Duplicates of duplicates end up in one group.
+    """
+
+    def __init__(self):
+        self.parents: dict[int, int] = {}
+        self.reasons: dict[int, set[str]] = {}
+        self.emails: dict[str, int] = {}
+        self.phones: dict[str, int] = {}
+        # the first contacts per name key that are not the same person, at most MAX_NAME_CANDIDATES.
+        # Tuples of strings and dates are not tracked by the garbage collector, lists would be.
+        self.names: dict[str, tuple[tuple[int, tuple[str, str, date | None]], ...]] = {}
+
+    def find(self, contact_id: int) -> int:
+        parents = self.parents
+        while parents.get(contact_id, contact_id) != contact_id:
+            parents[contact_id] = contact_id = parents.get(parents[contact_id], parents[contact_id])
+        return contact_id
+
+    def union(self, first: int, second: int, reason: str) -> None:
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            # the smaller id becomes the root, so a group is known by its oldest contact
+            first, second = min(first, second), max(first, second)
+            self.parents[second] = first
+            self.reasons.setdefault(first, set()).update(self.reasons.pop(second, ()))
+        self.reasons.setdefault(first, set()).add(reason)
+
+    def add(self, rows: list[Row]) -> None:
+        emails, phones, names = self.emails, self.phones, self.names
+        for contact_id, first_name, last_name, email, phone_number, birthday in rows:
+            other = emails.setdefault(email.strip(), contact_id)
+            if other != contact_id:
+                self.union(other, contact_id, 'email')
+
+            phone = phone_key(phone_number)
+            if phone is not None:
+                other = phones.setdefault(phone, contact_id)
+                if other != contact_id:
+                    self.union(other, contact_id, 'phone')
+
+            key = name_key(first_name, last_name)
+            if key is None:
+                continue
+            name = (first_name, last_name, birthday)
+            candidates = names.get(key, ())
+            for other, other_name in candidates:
+                if same_person(name, other_name):
+                    self.union(other, contact_id, 'name')
+                    break
+            else:
+                if len(candidates) < MAX_NAME_CANDIDATES:
+                    names[key] = candidates + ((contact_id, name),)
+
+    def groups(self) -> list[dict]:
+        members: dict[int, list[int]] = {}
+        for contact_id in self.parents:
+            members.setdefault(self.find(contact_id), []).append(contact_id)
+        return [{'ids': sorted(ids + [root]), 'reasons': sorted(self.reasons[root])}
+                for root, ids in sorted(members.items())]
+
+
+async def find_duplicates(user: User, db: AsyncSession) -> list[dict]:
+    """
+The find_duplicates function groups the likely duplicates of the user's contact book with a DuplicateFinder.
+    The book is read in batches and every batch is hashed in a worker thread, so the event loop keeps
+    serving other requests while a large book is scanned.
+
+:param user: User: The owner of the contacts
+:param db: AsyncSession: Access the database
+:return: The groups ordered by their first contact, each with the sorted ids and the reasons they matched
+:rtype: list[dict]
+    """
+    finder = DuplicateFinder()
+    async for rows in repository_contacts.stream_duplicate_keys(user, db):
+        await asyncio.to_thread(finder.add, rows)
+    return finder.groups()
@@ -0,0 +1,35 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.database.events import on_users_changed
+from src.database.models import User
+from src.repository import users as repository_users
+from src.services.cache import ReadThroughCache
+
+# Everything a request may read from the current user. The password hash is only read by the login, which loads
+# the user itself, so it is never cached. The refresh token column is no longer in use
+IDENTITY_COLUMNS = tuple(column.key for column in User.__table__.columns
+                         if column.key not in ('password', 'refresh_token'))
+
+# The account of a user by email, the subject of the access tokens, dropped on every write to the account
+identity_cache = ReadThroughCache('users:cache', settings.identity_cache_entries, settings.identity_cache_ttl,
+                                  settings.identity_cache_redis_ttl)
+on_users_changed(identity_cache.invalidate)
+
+
+async def get_user_by_email(email: str, db: AsyncSession) -> User | None:
+    """
+The get_user_by_email function is the cached repository get_user_by_email, for resolving the current user.
+    Every call returns a new User that is not attached to any session, so requests never share one.
+
+:param email: str: The email of the user
+:param db: AsyncSession: Access the database on a miss
+:return: The user without the password hash and the refresh token, None if there is no user with that email
+:rtype: User | None
+    """
+    async def load():
+        user = await repository_users.get_user_by_email(email, db)
+        return None if user is None else {name: getattr(user, name) for name in IDENTITY_COLUMNS}
+
+    values = await identity_cache.fetch(email, b'user', load)
+    return None if values is None else User(**values)
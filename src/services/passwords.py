@@ -0,0 +1,85 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+
+def _timed(func: Callable, *args):
+    # runs in the pool, the start time tells how long the call waited for a thread
+    return time.perf_counter(), func(*args)
+
+
+class PasswordHasher:
+    """
+The PasswordHasher class runs bcrypt in a pool of threads, so hashing a password never blocks the event loop.
+    bcrypt releases the GIL while it works, so the threads hash in parallel on as many cores as there are workers.
+    At most max_pending calls wait for or run in the pool, the calls beyond that are rejected with a 503
+    instead of queueing behind a burst of logins.
+    """
+
+    def __init__(self, rounds: int, workers: int, max_pending: int):
+        # hashes of a lower cost than rounds need an update, and are upgraded on the next login
+        self.context = CryptContext(schemes=['bcrypt'], deprecated='auto', bcrypt__default_rounds=rounds,
+                                    bcrypt__min_rounds=rounds)
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hasher')
+        self.pending = 0
+        self.metrics = dict.fromkeys(('hashes', 'verifications', 'rehashes', 'rejected'), 0)
+        self.queue_seconds = 0.0
+        self.max_queue_seconds = 0.0
+
+    def status(self) -> dict:
+        calls = self.metrics['hashes'] + self.metrics['verifications']
+        return {**self.metrics, 'rounds': self.rounds, 'workers': self.workers, 'pending': self.pending,
+                'max_pending': self.max_pending, 'avg_queue_ms': self.queue_seconds / calls * 1000 if calls else None,
+                'max_queue_ms': self.max_queue_seconds * 1000}
+
+    async def _run(self, func: Callable, *args):
+        if self.pending >= self.max_pending:
+            self.metrics['rejected'] += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail='Too many password checks in progress, try again shortly',
+                                headers={'Retry-After': '1'})
+        self.pending += 1
+        submitted = time.perf_counter()
+        try:
+            started, result = await asyncio.get_running_loop().run_in_executor(self.executor, _timed, func, *args)
+        finally:
+            self.pending -= 1
+        waited = started - submitted
+        self.queue_seconds += waited
+        self.max_queue_seconds = max(self.max_queue_seconds, waited)
+        return result
+
+    async def hash(self, password: str) -> str:
+        """
+The hash function hashes a password in the pool.
+
+:param password: str: The password
+:return: The bcrypt hash of the password
+:rtype: str
+        """
+        hashed = await self._run(self.context.hash, password)
+        self.metrics['hashes'] += 1
+        return hashed
+
+    async def verify_and_update(self, password: str, hashed: str) -> tuple[bool, str | None]:
+        """
+The verify_and_update function checks a password against its hash in the pool.
+    When the password matches a hash of an outdated cost, the password is hashed again at the current cost.
+
+:param password: str: The password
+:param hashed: str: The stored hash
+:return: Whether the password matches, and the new hash to store or None
+:rtype: tuple[bool, str | None]
+        """
+        verified, new_hash = await self._run(self.context.verify_and_update, password, hashed)
+        self.metrics['verifications'] += 1
+        if new_hash is not None:
+            self.metrics['rehashes'] += 1
+        return verified, new_hash
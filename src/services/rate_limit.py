@@ -0,0 +1,167 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+
+from fastapi import Depends, HTTPException, Request, status
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from src.conf.config import settings
+from src.database.models import User
+from src.services.auth import auth_service
+
+
+class Bucket:
+    """
+The Bucket class is the token bucket of one user on one route. It holds up to capacity tokens, refills at rate
+    tokens per second and every request takes a token. spent counts the tokens taken since the last synchronization
+    with Redis, seen is the Redis counter of the tokens taken by all workers at that synchronization.
+    """
+    __slots__ = ('capacity', 'rate', 'tokens', 'updated', 'spent', 'seen')
+
+    def __init__(self, capacity: int, rate: float, now: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = float(capacity)
+        self.updated = now
+        self.spent = 0
+        self.seen: int | None = None
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def idle(self, now: float) -> bool:
+        # refilled to capacity and nothing left to report, forgetting the bucket changes nothing
+        return self.spent == 0 and now - self.updated >= self.capacity / self.rate
+
+
+class RateLimits:
+    """
+The RateLimits class keeps the token buckets of this worker, so deciding on a request needs no round trip.
+    Once connect is called the buckets are reconciled with Redis every sync_interval seconds, in one pipeline:
+    each bucket adds the tokens it took to a counter shared by all workers and takes from itself the tokens the
+    other workers took in the meantime. All workers' buckets of a key so drain together, as one bucket would.
+
+    When Redis is unavailable the workers keep limiting on their own, each one allows the full rate, and they
+    catch up on what they took once Redis is back. Requests never fail because of Redis.
+    """
+
+    def __init__(self, max_keys: int, sync_interval: float, prefix: str = 'ratelimit'):
+        self.max_keys = max_keys
+        self.sync_interval = sync_interval
+        self.prefix = prefix
+        self.buckets: OrderedDict[str, Bucket] = OrderedDict()
+        self.redis: aioredis.Redis | None = None
+        self.degraded = False
+        self.metrics = dict.fromkeys(('allowed', 'limited', 'syncs', 'redis_errors'), 0)
+
+    def connect(self, redis: aioredis.Redis | None) -> None:
+        self.redis = redis
+        self.degraded = False
+
+    def status(self) -> dict:
+        return {**self.metrics, 'buckets': len(self.buckets), 'redis': self.redis is not None,
+                'degraded': self.degraded}
+
+    def take(self, key: str, times: int, seconds: float) -> float:
+        """
+The take function takes a token from the bucket of a key for a request.
+
+:param key: str: The user and the route of the request
+:param times: int: The number of requests allowed in seconds, the capacity of the bucket
+:param seconds: float: The time in which the bucket refills
+:return: 0 when the request is allowed, otherwise the seconds until it would be
+:rtype: float
+        """
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = Bucket(times, times / seconds, now)
+            while len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+            bucket.refill(now)
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            bucket.spent += 1
+            self.metrics['allowed'] += 1
+            return 0
+        self.metrics['limited'] += 1
+        return (1 - bucket.tokens) / bucket.rate
+
+    async def sync(self) -> None:
+        """
+The sync function reconciles the buckets of this worker with the other workers' through Redis, in one round trip.
+
+:return: None
+        """
+        now = time.monotonic()
+        for key in [key for key, bucket in self.buckets.items() if bucket.idle(now)]:
+            del self.buckets[key]
+        if self.redis is None or not self.buckets:
+            return
+        batch = [(key, bucket, bucket.spent) for key, bucket in self.buckets.items()]
+        for _, bucket, _ in batch:
+            bucket.spent = 0
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, bucket, spent in batch:
+                    pipe.incrby(f'{self.prefix}:{key}', spent)
+                    # the counter outlives the refill of the bucket, then it is of no use
+                    pipe.expire(f'{self.prefix}:{key}', math.ceil(bucket.capacity / bucket.rate) + 1)
+                totals = (await pipe.execute())[::2]
+        except (RedisError, OSError):
+            for _, bucket, spent in batch:
+                bucket.spent += spent
+            self.metrics['redis_errors'] += 1
+            self.degraded = True
+            return
+        self.metrics['syncs'] += 1
+        self.degraded = False
+        now = time.monotonic()
+        for (_, bucket, spent), total in zip(batch, totals):
+            # the first synchronization of a bucket only learns where the counter stands
+            if bucket.seen is not None:
+                others = total - bucket.seen - spent
+                if others > 0:
+                    bucket.refill(now)
+                    bucket.tokens = max(0.0, bucket.tokens - others)
+            bucket.seen = total
+
+    async def run(self) -> None:
+        """
+The run function synchronizes the buckets every sync_interval seconds until it is cancelled.
+
+:return: None
+        """
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            await self.sync()
+
+    def clear(self) -> None:
+        self.buckets.clear()
+
+
+rate_limits = RateLimits(settings.rate_limit_keys, settings.rate_limit_sync_interval)
+
+
+class RateLimiter:
+    """
+The RateLimiter class is a route dependency that allows each user times requests per seconds on the route.
+    A burst of times requests is allowed, after that requests are allowed as fast as the bucket refills.
+    """
+
+    def __init__(self, times: int, seconds: float):
+        self.times = times
+        self.seconds = seconds
+
+    async def __call__(self, request: Request, current_user: User = Depends(auth_service.get_current_user)) -> None:
+        route = request.scope.get('route')
+        key = f'{current_user.id}:{request.method}:{getattr(route, "path", request.url.path)}'
+        retry_after = rate_limits.take(key, self.times, self.seconds)
+        if retry_after:
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail='Too Many Requests',
+                                headers={'Retry-After': str(math.ceil(retry_after))})
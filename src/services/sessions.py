@@ -0,0 +1,151 @@
+import time
+import uuid
+
+from fastapi import HTTPException, status
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError, WatchError
+
+from src.conf.config import settings
+
+# The outcomes of presenting a refresh token
+ROTATED = 'rotated'
+REUSED = 'reused'
+MISSING = 'missing'
+
+
+class LocalSessionStore:
+    """
+The LocalSessionStore class keeps the sessions in this worker, for tests and for a single worker without Redis.
+    """
+
+    def __init__(self):
+        self._sessions: dict[tuple[str, str], tuple[float, str]] = {}
+
+    def _current(self, subject: str, session_id: str) -> str | None:
+        entry = self._sessions.get((subject, session_id))
+        if entry is None or entry[0] < time.monotonic():
+            self._sessions.pop((subject, session_id), None)
+            return None
+        return entry[1]
+
+    async def create(self, subject: str, session_id: str, token_id: str, ttl: int) -> None:
+        now = time.monotonic()
+        for key in [key for key, (deadline, _) in self._sessions.items() if deadline < now]:
+            del self._sessions[key]
+        self._sessions[(subject, session_id)] = (now + ttl, token_id)
+
+    async def rotate(self, subject: str, session_id: str, token_id: str, new_token_id: str, ttl: int) -> str:
+        current = self._current(subject, session_id)
+        if current is None:
+            return MISSING
+        if current != token_id:
+            del self._sessions[(subject, session_id)]
+            return REUSED
+        self._sessions[(subject, session_id)] = (time.monotonic() + ttl, new_token_id)
+        return ROTATED
+
+    async def revoke(self, subject: str, session_id: str) -> None:
+        self._sessions.pop((subject, session_id), None)
+
+
+class RedisSessionStore:
+    """
+The RedisSessionStore class keeps a key per session in Redis, shared by all workers.
+    The key holds the id of the one refresh token of the session that is still valid, and expires with it.
+    """
+
+    def __init__(self, redis: aioredis.Redis, prefix: str = 'sessions'):
+        self.redis = redis
+        self.prefix = prefix
+
+    def _key(self, subject: str, session_id: str) -> str:
+        return f'{self.prefix}:{subject}:{session_id}'
+
+    async def create(self, subject: str, session_id: str, token_id: str, ttl: int) -> None:
+        await self.redis.set(self._key(subject, session_id), token_id, ex=ttl)
+
+    async def rotate(self, subject: str, session_id: str, token_id: str, new_token_id: str, ttl: int) -> str:
+        key = self._key(subject, session_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    # of two refreshes with the same token only one rotates, the other one sees a reuse
+                    await pipe.watch(key)
+                    current = await pipe.get(key)
+                    if current is None:
+                        return MISSING
+                    pipe.multi()
+                    if current != token_id.encode():
+                        pipe.delete(key)
+                        await pipe.execute()
+                        return REUSED
+                    pipe.set(key, new_token_id, ex=ttl)
+                    await pipe.execute()
+                    return ROTATED
+                except WatchError:
+                    continue
+
+    async def revoke(self, subject: str, session_id: str) -> None:
+        await self.redis.delete(self._key(subject, session_id))
+
+
+class RefreshSessions:
+    """
+The RefreshSessions class tracks the sessions opened by logging in, one per device, and their refresh tokens.
+    Every refresh token names its session and has an id of its own. Presenting it rotates the session to a new
+    token, presenting a token that was already rotated away revokes the session, as the token has been stolen.
+    Sessions expire ttl seconds after their last refresh.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.store = LocalSessionStore()
+
+    def connect(self, redis: aioredis.Redis | None) -> None:
+        self.store = LocalSessionStore() if redis is None else RedisSessionStore(redis)
+
+    async def _call(self, method: str, *args):
+        try:
+            return await getattr(self.store, method)(*args)
+        except (RedisError, OSError):
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail='Sessions are unavailable, try again shortly', headers={'Retry-After': '1'})
+
+    async def start(self, subject: str) -> dict:
+        """
+The start function opens a session for a user who just logged in.
+
+:param subject: str: The email of the user
+:return: The claims naming the session and its first refresh token
+:rtype: dict
+        """
+        claims = {'sub': subject, 'sid': uuid.uuid4().hex, 'jti': uuid.uuid4().hex}
+        await self._call('create', subject, claims['sid'], claims['jti'], self.ttl)
+        return claims
+
+    async def rotate(self, payload: dict) -> tuple[str, dict | None]:
+        """
+The rotate function exchanges a refresh token for the next one of its session.
+
+:param payload: dict: The verified claims of the presented refresh token
+:return: ROTATED and the claims of the next token, or REUSED or MISSING and None
+:rtype: tuple[str, dict | None]
+        """
+        if 'sid' not in payload or 'jti' not in payload:
+            return MISSING, None
+        claims = {'sub': payload['sub'], 'sid': payload['sid'], 'jti': uuid.uuid4().hex}
+        outcome = await self._call('rotate', payload['sub'], payload['sid'], payload['jti'], claims['jti'], self.ttl)
+        return outcome, claims if outcome == ROTATED else None
+
+    async def revoke(self, payload: dict) -> None:
+        """
+The revoke function ends the session of a refresh token.
+
+:param payload: dict: The verified claims of the refresh token
+:return: None
+        """
+        if 'sid' in payload:
+            await self._call('revoke', payload['sub'], payload['sid'])
+
+
+refresh_sessions = RefreshSessions(settings.refresh_token_ttl)
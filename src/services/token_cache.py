@@ -0,0 +1,116 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+from redis import asyncio as aioredis
+
+from src.services.cache import listen_invalidations
+
+
+class VerifiedTokenCache:
+    """
+The VerifiedTokenCache class remembers the payloads of the tokens whose signature and claims were verified,
+    so a token presented again is not decoded again. Tokens are kept by digest, the most recently used ones
+    up to max_entries, each until the token expires but for no more than ttl seconds.
+    The tokens of a subject are dropped together when its account is written, which is how a token is revoked.
+    A write through another worker revokes them here once listen runs, as the identity cache publishes it.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[bytes, tuple[float, str | None, dict]] = OrderedDict()
+        self._subjects: dict[str, set[bytes]] = {}
+        self.redis: aioredis.Redis | None = None
+        self.metrics = dict.fromkeys(('hits', 'misses', 'revocations', 'remote_revocations'), 0)
+
+    def connect(self, redis: aioredis.Redis | None) -> None:
+        self.redis = redis
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def status(self) -> dict:
+        reads = self.metrics['hits'] + self.metrics['misses']
+        return {**self.metrics, 'hit_ratio': self.metrics['hits'] / reads if reads else None, 'entries': len(self)}
+
+    def get(self, token: str) -> dict | None:
+        """
+The get function returns the payload of a token verified before, None when it has to be verified.
+
+:param token: str: The encoded token
+:return: The payload, which must not be changed
+:rtype: dict | None
+        """
+        digest = self.digest(token)
+        entry = self._entries.get(digest)
+        if entry is None or entry[0] < time.monotonic():
+            self.metrics['misses'] += 1
+            return None
+        self._entries.move_to_end(digest)
+        self.metrics['hits'] += 1
+        return entry[2]
+
+    def put(self, token: str, payload: dict) -> None:
+        """
+The put function remembers the payload of a token that was just verified.
+
+:param token: str: The encoded token
+:param payload: dict: The verified claims of the token
+:return: None
+        """
+        ttl = self.ttl
+        if 'exp' in payload:
+            ttl = min(ttl, payload['exp'] - time.time())
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        digest = self.digest(token)
+        subject = payload.get('sub')
+        self._entries[digest] = (time.monotonic() + ttl, subject, payload)
+        self._entries.move_to_end(digest)
+        self._subjects.setdefault(subject, set()).add(digest)
+        while len(self._entries) > self.max_entries:
+            old_digest, (_, old_subject, _) = self._entries.popitem(last=False)
+            self._forget(old_subject, old_digest)
+
+    def _forget(self, subject: str | None, digest: bytes) -> None:
+        digests = self._subjects[subject]
+        digests.discard(digest)
+        if not digests:
+            del self._subjects[subject]
+
+    def revoke(self, subjects: set[str]) -> None:
+        """
+The revoke function drops the tokens of the subjects, they are verified again when they are presented next.
+
+:param subjects: set[str]: The subjects of the tokens, the emails of the users
+:return: None
+        """
+        self.metrics['revocations'] += 1
+        for subject in subjects:
+            for digest in self._subjects.pop(subject, ()):
+                del self._entries[digest]
+
+    async def listen(self, channel: str, origin: str) -> None:
+        """
+The listen function revokes the tokens of the accounts written through the other workers until it is cancelled.
+    The identity cache publishes the emails of every account written, and the messages of this worker are skipped,
+    its tokens were revoked by the commit. When the subscription fails every token is dropped and it subscribes again.
+
+:param channel: str: The invalidation channel of the identity cache
+:param origin: str: The origin of the identity cache of this worker
+:return: None
+        """
+        def revoke(subjects: set[str]) -> None:
+            self.metrics['remote_revocations'] += 1
+            self.revoke(subjects)
+
+        await listen_invalidations(self.redis, channel, origin, revoke, self.clear)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._subjects.clear()
@@ -0,0 +1,86 @@
+import os
+import sys
+import unittest
+
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from src.database import events
+from src.database.models import Base, User
+
+SQLITE_URL = 'sqlite+aiosqlite://'
+POSTGRES_URL = os.environ.get('TEST_POSTGRES_URL')
+
+
+class SQLTestCase(unittest.IsolatedAsyncioTestCase):
+    """
+The SQLTestCase class runs every test against a fresh schema, with the users inserted.
+    A test module subclasses it once with its tests and adds its rows in populate. The subclass is not run itself:
+    it is run by two copies added to its module, TestSQLite<Name> on SQLite and TestPostgres<Name> on the database
+    at TEST_POSTGRES_URL, skipped when that is not set. Name is the subclass name without SQLTestCase.
+    """
+    __test__ = False
+    url = None
+    # the rows of the users table, the tests read and write for user 1
+    users = [{'id': i, 'email': f'u{i}@example.com', 'password': 'x'} for i in (1, 2)]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'url' in vars(cls):
+            return
+        module = sys.modules[cls.__module__]
+        name = cls.__name__.removesuffix('SQLTestCase')
+        for backend, url in (('SQLite', SQLITE_URL), ('Postgres', POSTGRES_URL)):
+            test_case = type(f'Test{backend}{name}', (cls,), {'url': url, '__test__': True, '__module__': cls.__module__})
+            if url is None:
+                test_case = unittest.skip('TEST_POSTGRES_URL is not set')(test_case)
+            setattr(module, test_case.__name__, test_case)
+
+    async def prepare(self, conn):
+        # runs before the schema is created, such as for database extensions
+        pass
+
+    async def populate(self, conn):
+        pass
+
+    async def asyncSetUp(self):
+        if self.url is None:
+            # the subclass of a module, which unittest.main runs as well
+            self.skipTest('runs on SQLite and Postgres through its copies')
+        self.engine = create_async_engine(self.url)
+        # also disposed when prepare skips the test
+        self.addAsyncCleanup(self.engine.dispose)
+        async with self.engine.begin() as conn:
+            await self.prepare(conn)
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(User), self.users)
+            await self.populate(conn)
+        self.session = async_sessionmaker(self.engine, expire_on_commit=False)()
+        self.user = User(id=1)
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+
+    @staticmethod
+    async def create_extension(conn, name: str) -> bool:
+        # a Postgres extension, False when the server does not have it
+        available = await conn.exec_driver_sql(f"SELECT 1 FROM pg_available_extensions WHERE name = '{name}'")
+        if available.first() is None:
+            return False
+        await conn.exec_driver_sql(f'CREATE EXTENSION IF NOT EXISTS {name}')
+        return True
+
+    def listen_statements(self, listener) -> None:
+        # listener(conn, cursor, statement, parameters, context, executemany) sees every statement until the end
+        event.listen(self.engine.sync_engine, 'before_cursor_execute', listener)
+        self.addCleanup(event.remove, self.engine.sync_engine, 'before_cursor_execute', listener)
+
+    def listen_contacts_changed(self) -> list:
+        # the sets of users whose contacts were changed, one per commit
+        changed = []
+        events.on_contacts_changed(changed.append)
+        self.addCleanup(events._listeners.remove, changed.append)
+        return changed
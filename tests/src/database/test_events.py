@@ -0,0 +1,72 @@
+import unittest
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from src.database import events
+from src.database.events import mark_contacts_changed, mark_users_changed, on_contacts_changed, on_users_changed
+
+
+class TestContactsChanged(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine('sqlite+aiosqlite://')
+        self.session = async_sessionmaker(self.engine)()
+        self.calls = []
+        on_contacts_changed(self.calls.append)
+
+    async def asyncTearDown(self):
+        events._listeners.remove(self.calls.append)
+        await self.session.close()
+        await self.engine.dispose()
+
+    async def test_listeners_called_after_commit(self):
+        mark_contacts_changed(self.session, 1)
+        mark_contacts_changed(self.session, [2, 3])
+        self.assertEqual(self.calls, [])
+
+        await self.session.commit()
+        self.assertEqual(self.calls, [{1, 2, 3}])
+
+        await self.session.commit()
+        self.assertEqual(len(self.calls), 1)
+
+    async def test_rollback_discards_changes(self):
+        await self.session.connection()
+        mark_contacts_changed(self.session, 1)
+        await self.session.rollback()
+        await self.session.commit()
+        self.assertEqual(self.calls, [])
+
+
+class TestUsersChanged(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine('sqlite+aiosqlite://')
+        self.session = async_sessionmaker(self.engine)()
+        self.calls, self.contact_calls = [], []
+        on_users_changed(self.calls.append)
+        on_contacts_changed(self.contact_calls.append)
+
+    async def asyncTearDown(self):
+        events._account_listeners.remove(self.calls.append)
+        events._listeners.remove(self.contact_calls.append)
+        await self.session.close()
+        await self.engine.dispose()
+
+    async def test_listeners_called_after_commit(self):
+        mark_users_changed(self.session, 'a@example.com')
+        mark_users_changed(self.session, ['b@example.com'])
+        await self.session.commit()
+        self.assertEqual(self.calls, [{'a@example.com', 'b@example.com'}])
+        self.assertEqual(self.contact_calls, [])
+
+    async def test_rollback_discards_changes(self):
+        await self.session.connection()
+        mark_users_changed(self.session, 'a@example.com')
+        await self.session.rollback()
+        await self.session.commit()
+        self.assertEqual(self.calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.database.pool import InstrumentedQueuePool, PoolStats, get_pool_status
+
+
+class TestPoolStats(unittest.TestCase):
+
+    def test_observe_wait(self):
+        stats = PoolStats(buckets=(1, 10))
+        stats.observe_wait(0.0005)
+        stats.observe_wait(0.005)
+        stats.observe_wait(0.5)
+
+        self.assertEqual(stats.checkouts, 3)
+        self.assertEqual(stats.histogram(), {'<=1ms': 1, '<=10ms': 1, '>10ms': 1})
+
+
+class TestInstrumentedQueuePool(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        path = os.path.join(tempfile.mkdtemp(), 'pool.db')
+        self.engine = create_async_engine(f'sqlite+aiosqlite:///{path}', poolclass=InstrumentedQueuePool,
+                                          pool_size=1, max_overflow=0, pool_timeout=0.05)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def test_checkout_timeout_is_counted(self):
+        async with self.engine.connect() as conn:
+            await conn.execute(text('SELECT 1'))
+            status = get_pool_status(self.engine.pool)
+            self.assertEqual(status['checked_out'], 1)
+
+            with self.assertRaises(exc.TimeoutError):
+                async with self.engine.connect():
+                    pass
+
+        status = get_pool_status(self.engine.pool)
+        self.assertEqual(status['checked_out'], 0)
+        self.assertEqual(status['checkouts'], 1)
+        self.assertEqual(status['checkout_timeouts'], 1)
+        self.assertEqual(sum(status['wait_ms_histogram'].values()), 1)
+
+    async def test_stats_survive_dispose(self):
+        stats = self.engine.pool.stats
+        await self.engine.dispose()
+        self.assertIs(self.engine.pool.stats, stats)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+
+from src.database.models import Contact
+from src.repository.contacts import get_contacts, get_contact, search_contact, get_birthdays_between, autocomplete, \
+    fuzzy_search
+from tests import sql_test_case
+
+
+class QueryPlanSQLTestCase(sql_test_case.SQLTestCase):
+    """
+Runs the hot repository queries, captures the SQL they emit and asserts the plan uses the contact indexes.
+    """
+    # the index fuzzy search reads, None when the database cannot build it
+    fuzzy_index = None
+    users = [{'id': i, 'email': f'u{i}@example.com', 'password': 'x'} for i in range(1, 21)]
+
+    async def prepare(self, conn):
+        if conn.dialect.name == 'sqlite':
+            self.fuzzy_index = 'contacts_fts'
+        elif await self.create_extension(conn, 'pg_trgm'):
+            self.fuzzy_index = '_lower_trgm'
+
+    async def populate(self, conn):
+        await conn.execute(insert(Contact), [
+            {'first_name': f'First{i % 10}', 'last_name': f'Last{i}', 'email': f'c{i}@example.com',
+             'birthday': date(1990, 1, 1) + timedelta(days=i), 'user_id': 1 + i % 20} for i in range(4000)
+        ])
+        await conn.exec_driver_sql('ANALYZE')
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.statements = []
+        self.listen_statements(self.capture)
+
+    def capture(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    async def explain(self, statement, parameters) -> str:
+        async with self.engine.connect() as conn:
+            if conn.dialect.name == 'sqlite':
+                result = await conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)
+                return '\n'.join(row[-1] for row in result)
+            # the test table is tiny, so forbid sequential scans to see which index the planner would pick
+            await conn.exec_driver_sql('SET enable_seqscan = off')
+            result = await conn.exec_driver_sql(f'EXPLAIN {statement}', parameters)
+            return '\n'.join(row[0] for row in result)
+
+    async def plan_of_last_query(self) -> str:
+        statement, parameters = self.statements[-1]
+        return await self.explain(statement, parameters)
+
+    async def test_get_contacts_uses_user_index(self):
+        await get_contacts(skip=0, limit=10, user=self.user, db=self.session)
+        plan = await self.plan_of_last_query()
+        self.assertTrue('ix_contacts_user_id_id' in plan or 'pkey' in plan or 'PRIMARY KEY' in plan, plan)
+
+    async def test_get_contacts_keyset_uses_user_index(self):
+        await get_contacts(skip=0, limit=10, user=self.user, db=self.session, after=(1000,))
+        plan = await self.plan_of_last_query()
+        self.assertTrue('ix_contacts_user_id_id' in plan or 'pkey' in plan or 'PRIMARY KEY' in plan, plan)
+
+    async def test_get_contacts_keyset_by_name_uses_name_index(self):
+        await get_contacts(skip=0, limit=10, user=self.user, db=self.session, sort='last_name',
+                           after=('Last100', 'First0', 100))
+        self.assertIn('ix_contacts_user_id_last_name_first_name', await self.plan_of_last_query())
+
+    async def test_birthday_range_uses_doy_index(self):
+        await get_birthdays_between(date(2023, 3, 1), date(2023, 3, 31), self.user, self.session)
+        self.assertIn('ix_contacts_user_id_birthday_doy', await self.plan_of_last_query())
+
+    async def test_birthday_range_over_year_end_uses_doy_index(self):
+        await get_birthdays_between(date(2023, 12, 25), date(2024, 1, 5), self.user, self.session)
+        self.assertIn('ix_contacts_user_id_birthday_doy', await self.plan_of_last_query())
+
+    async def test_get_contact_uses_index(self):
+        await get_contact(contact_id=1, user=self.user, db=self.session)
+        plan = await self.plan_of_last_query()
+        self.assertTrue('ix_contacts_user_id_id' in plan or 'pkey' in plan or 'PRIMARY KEY' in plan, plan)
+
+    async def test_search_by_name_uses_name_index(self):
+        await search_contact({'first_name': 'First1', 'last_name': 'Last1'}, user=self.user, db=self.session)
+        self.assertIn('ix_contacts_user_id_last_name_first_name', await self.plan_of_last_query())
+
+    async def test_search_by_first_name_uses_first_name_index(self):
+        await search_contact({'first_name': 'First1'}, user=self.user, db=self.session)
+        self.assertIn('ix_contacts_user_id_first_name', await self.plan_of_last_query())
+
+    async def test_search_by_email_uses_email_index(self):
+        await search_contact({'email': 'c1@example.com'}, user=self.user, db=self.session)
+        self.assertIn('ix_contacts_user_id_email', await self.plan_of_last_query())
+
+    async def test_autocomplete_uses_prefix_indexes(self):
+        await autocomplete('first1 la', limit=10, user=self.user, db=self.session)
+        plan = await self.plan_of_last_query()
+        for index in ('ix_contacts_user_id_first_name_lower', 'ix_contacts_user_id_last_name_lower',
+                      'ix_contacts_user_id_email_lower'):
+            self.assertIn(index, plan)
+
+    async def test_fuzzy_search_uses_trigram_index(self):
+        if self.fuzzy_index is None:
+            self.skipTest('pg_trgm is not available')
+        await fuzzy_search('Frist1', user=self.user, db=self.session)
+        self.assertIn(self.fuzzy_index, await self.plan_of_last_query())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from redis.exceptions import ConnectionError
+
+from src.database.replicas import ReplicaRouter
+
+
+class TestReplicaRouter(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        folder = tempfile.mkdtemp()
+        self.urls = [
+            f'sqlite:///{os.path.join(folder, "replica1.db")}',
+            f'sqlite:///{os.path.join(folder, "replica2.db")}',
+            f'sqlite:///{os.path.join(folder, "missing", "replica3.db")}',
+        ]
+        self.router = ReplicaRouter(self.urls, pin_seconds=60, check_timeout=1)
+
+    async def asyncTearDown(self):
+        await self.router.dispose()
+
+    async def make_workers(self):
+        # two workers of the app, sharing Redis
+        redis = FakeRedis(server=FakeServer())
+        other = ReplicaRouter(self.urls, pin_seconds=60, check_timeout=1)
+        self.addAsyncCleanup(other.dispose)
+        self.router.connect(redis)
+        other.connect(redis)
+        return self.router, other
+
+    async def test_unhealthy_replica_is_skipped(self):
+        await self.router.check_health()
+        self.assertEqual(self.router.healthy, [True, True, False])
+
+        chosen = {await self.router.choose(1) for _ in range(6)}
+        self.assertEqual(chosen, set(self.router.sessionmakers[:2]))
+
+    async def test_no_healthy_replica_falls_back_to_primary(self):
+        self.router.healthy = [False, False, False]
+        self.assertIsNone(await self.router.choose(1))
+
+    async def test_pin_after_write(self):
+        self.router.pin(1)
+        self.assertIsNone(await self.router.choose(1))
+        self.assertIsNotNone(await self.router.choose(2))
+
+    async def test_pin_expires(self):
+        self.router.pin_seconds = 0
+        self.router.pin(1)
+        self.assertIsNotNone(await self.router.choose(1))
+
+    async def test_pin_is_shared_by_workers(self):
+        writer, reader = await self.make_workers()
+        writer.pin(1)
+        self.assertIsNone(await writer.choose(1))
+        await writer.flush()
+        self.assertIsNone(await reader.choose(1))
+        self.assertIsNotNone(await reader.choose(2))
+
+    async def test_shared_pin_expires(self):
+        writer, reader = await self.make_workers()
+        writer.pin_seconds = 0.05
+        writer.pin(1)
+        await writer.flush()
+        self.assertIsNone(await reader.choose(1))
+        await asyncio.sleep(0.1)
+        self.assertIsNotNone(await reader.choose(1))
+
+    async def test_redis_errors_read_from_primary(self):
+        _, reader = await self.make_workers()
+
+        async def fail(*args, **kwargs):
+            raise ConnectionError()
+        reader.redis.exists = fail
+        self.assertIsNone(await reader.choose(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+
+from src.database.models import Contact, User
+from src.repository.birthday_utils import days_until_birthday, is_upcoming_birthday, birthday_doy, birthday_doy_range
+from src.repository.contacts import (
+    get_upcoming_birthdays,
+    get_birthdays_between,
+    count_birthdays_by_day,
+    count_birthdays_by_month,
+)
+from tests import sql_test_case
+
+BIRTHDAYS = [date(1990, 1, 1), date(1985, 2, 28), date(2000, 2, 29), date(1999, 3, 1), date(1970, 7, 15),
+             date(1995, 12, 30), date(1995, 12, 31)]
+TODAYS = [date(2023, 1, 1), date(2023, 2, 27), date(2023, 2, 28), date(2023, 3, 1), date(2023, 12, 28),
+          date(2024, 2, 28), date(2024, 2, 29), date(2024, 12, 31), date(2025, 7, 15)]
+
+
+def next_birthday(birthday: date, today: date) -> date:
+    # reference implementation: walk day by day, February 29 falls on March 1 in non-leap years
+    day = today
+    while True:
+        if (day.month, day.day) == (birthday.month, birthday.day):
+            return day
+        if (birthday.month, birthday.day) == (2, 29) and (day.month, day.day) == (3, 1) \
+                and (day - timedelta(days=1)).day != 29:
+            return day
+        day += timedelta(days=1)
+
+
+class TestDaysUntilBirthday(unittest.TestCase):
+
+    def test_matches_calendar(self):
+        for today in TODAYS:
+            for birthday in BIRTHDAYS:
+                with self.subTest(today=today, birthday=birthday):
+                    expected = (next_birthday(birthday, today) - today).days
+                    self.assertEqual(days_until_birthday(birthday, today), expected)
+
+    def test_is_upcoming_birthday_uses_given_day(self):
+        contacts = [Contact(birthday=date(1990, 1, 1)), Contact(birthday=date(1990, 1, 9)), Contact(birthday=None)]
+        result = is_upcoming_birthday(contacts, days=7, today=date(2023, 12, 28))
+        self.assertEqual(result, contacts[:1])
+
+    def test_birthday_doy(self):
+        self.assertEqual(birthday_doy(date(1990, 1, 1)), 1)
+        self.assertEqual(birthday_doy(date(2000, 2, 29)), 60)
+        self.assertEqual(birthday_doy(date(1999, 3, 1)), 61)
+        self.assertEqual(birthday_doy(date(1999, 12, 31)), 366)
+
+    def test_birthday_doy_range(self):
+        self.assertEqual(birthday_doy_range(date(2023, 3, 1), date(2023, 3, 31)), (60, 91))
+        self.assertEqual(birthday_doy_range(date(2024, 3, 1), date(2024, 3, 31)), (61, 91))
+        self.assertEqual(birthday_doy_range(date(2023, 12, 25), date(2024, 1, 5)), (360, 5))
+        self.assertEqual(birthday_doy_range(date(2023, 1, 1), date(2023, 12, 31)), (1, 366))
+        self.assertIsNone(birthday_doy_range(date(2023, 7, 1), date(2024, 7, 1)))
+
+
+class BirthdaySQLTestCase(sql_test_case.SQLTestCase):
+
+    async def populate(self, conn):
+        await conn.execute(insert(Contact), [
+            {'id': i + 1, 'first_name': 'f', 'last_name': 'l', 'email': 'e@example.com', 'birthday': birthday,
+             'user_id': 1} for i, birthday in enumerate(BIRTHDAYS + [None])
+        ])
+
+    async def test_matches_python(self):
+        for today in TODAYS:
+            for days in (0, 1, 7, 30, 364):
+                with self.subTest(today=today, days=days):
+                    result = await get_upcoming_birthdays(self.session, User(id=1), days=days, today=today)
+                    expected = is_upcoming_birthday([Contact(birthday=b) for b in BIRTHDAYS], days=days, today=today)
+                    self.assertEqual(sorted(c.birthday for c in result), sorted(c.birthday for c in expected))
+
+    async def test_get_birthdays_between_whole_year(self):
+        result = await get_birthdays_between(date(2023, 7, 1), date(2024, 7, 1), User(id=1), self.session)
+        self.assertEqual([c.birthday for c in result], BIRTHDAYS[4:] + BIRTHDAYS[:4])
+
+    async def test_get_birthdays_between_limit(self):
+        result = await get_birthdays_between(date(2023, 1, 1), date(2023, 3, 1), User(id=1), self.session,
+                                             skip=1, limit=2)
+        self.assertEqual([c.birthday for c in result], BIRTHDAYS[1:3])
+
+    async def test_count_birthdays(self):
+        by_day = await count_birthdays_by_day(User(id=1), self.session)
+        self.assertEqual(by_day, {(b.month, b.day): 1 for b in BIRTHDAYS})
+
+        by_month = await count_birthdays_by_month(User(id=1), self.session)
+        self.assertEqual(by_month, {1: 1, 2: 2, 3: 1, 4: 0, 5: 0, 6: 0, 7: 1, 8: 0, 9: 0, 10: 0, 11: 0, 12: 2})
+
+    async def test_get_upcoming_birthdays_wraps_year_end(self):
+        result = await get_upcoming_birthdays(self.session, User(id=1), days=7, today=date(2023, 12, 28))
+        self.assertEqual([c.birthday for c in result], [date(1995, 12, 30), date(1995, 12, 31), date(1990, 1, 1)])
+
+    async def test_get_upcoming_birthdays_february_29(self):
+        result = await get_upcoming_birthdays(self.session, User(id=1), days=0, today=date(2023, 3, 1))
+        self.assertEqual([c.birthday for c in result], [date(2000, 2, 29), date(1999, 3, 1)])
+
+        result = await get_upcoming_birthdays(self.session, User(id=1), days=0, today=date(2024, 2, 29))
+        self.assertEqual([c.birthday for c in result], [date(2000, 2, 29)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+from sqlalchemy import insert, select
+
+from src.database.models import Contact
+from src.repository.contacts import bulk_update_contacts, bulk_remove_contacts
+from src.schemas import ContactFilter
+from tests import sql_test_case
+
+CONTACTS = [('John', 'Doe', 'john@Example.com'), ('Anna', 'Doe', 'anna@example.com'),
+            ('Bob', 'Adams', 'bob@example.org'), ('Carl', 'Zed', 'carl@exampleXcom.net'),
+            ('Dina', 'Doe', 'dina@sub.example.com')]
+
+
+class BulkSQLTestCase(sql_test_case.SQLTestCase):
+
+    async def populate(self, conn):
+        await conn.execute(insert(Contact), [
+            {'first_name': f, 'last_name': l, 'email': e, 'user_id': user_id}
+            for user_id in (1, 2) for f, l, e in CONTACTS
+        ])
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.statements = []
+        self.listen_statements(self.capture)
+        self.changed = self.listen_contacts_changed()
+
+    def capture(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    async def names(self, user_id: int = 1) -> list[tuple]:
+        result = await self.session.execute(select(Contact.first_name, Contact.last_name)
+                                            .filter(Contact.user_id == user_id).order_by(Contact.id))
+        return [tuple(row) for row in result]
+
+    async def test_remove_by_ids(self):
+        # ids 6..10 belong to the other user
+        ids = await bulk_remove_contacts(ContactFilter(ids=[1, 3, 6, 999]), self.user, self.session)
+        self.assertEqual(sorted(ids), [1, 3])
+        self.assertEqual(len(self.statements), 1)
+        self.assertEqual([name for name, _ in await self.names()], ['Anna', 'Carl', 'Dina'])
+        self.assertEqual(len(await self.names(2)), 5)
+        self.assertEqual(self.changed, [{1}])
+
+    async def test_remove_by_email_domain(self):
+        ids = await bulk_remove_contacts(ContactFilter(email_domain='@EXAMPLE.com'), self.user, self.session)
+        self.assertEqual(sorted(ids), [1, 2])
+
+    async def test_update_by_filter(self):
+        ids = await bulk_update_contacts(ContactFilter(last_name='Doe', email_domain='example.com'),
+                                         {'last_name': 'Smith', 'phone_number': '+380501234567'}, self.user, self.session)
+        self.assertEqual(sorted(ids), [1, 2])
+        self.assertEqual(len(self.statements), 1)
+        self.assertEqual(await self.names(), [('John', 'Smith'), ('Anna', 'Smith'), ('Bob', 'Adams'), ('Carl', 'Zed'),
+                                              ('Dina', 'Doe')])
+        phones = await self.session.execute(select(Contact.phone_number).filter(Contact.id.in_(ids)))
+        self.assertEqual(set(phones.scalars()), {'+380501234567'})
+
+    async def test_nothing_matches(self):
+        ids = await bulk_update_contacts(ContactFilter(ids=[]), {'first_name': 'X'}, self.user, self.session)
+        self.assertEqual(ids, [])
+        self.assertEqual(self.changed, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+from collections import Counter
+from datetime import date
+
+from sqlalchemy import delete, select, update
+
+from src.database.models import Contact, User
+from src.repository.contacts import (create_contact, patch_contact, remove_contact, insert_contacts,
+                                     bulk_update_contacts, bulk_remove_contacts, count_contacts, get_contact_stats,
+                                     get_contacts_version)
+from src.schemas import ContactFilter, ContactModel
+from tests import sql_test_case
+
+
+class StatsSQLTestCase(sql_test_case.SQLTestCase):
+
+    async def expected(self, user_id: int) -> dict:
+        # the statistics computed the slow way, straight from the contacts
+        result = await self.session.execute(select(Contact.email, Contact.birthday, Contact.phone_number)
+                                            .filter(Contact.user_id == user_id))
+        rows = result.all()
+        domains = Counter(email.lower().partition('@')[2] for email, _, _ in rows)
+        months = Counter(birthday.month for _, birthday, _ in rows if birthday)
+        return {
+            'total': len(rows),
+            'domains': [{'domain': domain, 'count': count}
+                        for domain, count in sorted(domains.items(), key=lambda item: (-item[1], item[0]))],
+            'months': [{'month': month, 'count': months[month]} for month in range(1, 13)],
+            'missing_phone': sum(1 for _, _, phone in rows if not phone),
+            'missing_birthday': sum(1 for _, birthday, _ in rows if not birthday),
+        }
+
+    async def assertStatsMatch(self):
+        for user_id in (1, 2):
+            expected = await self.expected(user_id)
+            self.assertEqual(await get_contact_stats(User(id=user_id), self.session), expected)
+            self.assertEqual(await count_contacts(User(id=user_id), self.session), expected['total'])
+
+    async def test_empty_book(self):
+        stats = await get_contact_stats(self.user, self.session)
+        self.assertEqual((stats['total'], stats['domains'], stats['missing_phone']), (0, [], 0))
+        self.assertEqual(len(stats['months']), 12)
+        self.assertEqual(await count_contacts(self.user, self.session), 0)
+
+    async def test_single_writes(self):
+        first = await create_contact(ContactModel(first_name='John', last_name='Doe', email='john@Example.com',
+                                                  birthday=date(1990, 3, 1)), self.user, self.session)
+        await create_contact(ContactModel(first_name='Anna', last_name='Doe', email='anna@example.com',
+                                          phone_number='+380501234567'), self.user, self.session)
+        await create_contact(ContactModel(first_name='Bob', last_name='Adams', email='bob@mail.org'),
+                             User(id=2), self.session)
+        await self.assertStatsMatch()
+        stats = await get_contact_stats(self.user, self.session)
+        self.assertEqual(stats['domains'], [{'domain': 'example.com', 'count': 2}])
+        self.assertEqual(stats['months'][2], {'month': 3, 'count': 1})
+        self.assertEqual((stats['missing_phone'], stats['missing_birthday']), (1, 1))
+
+        await patch_contact(first.id, {'email': 'john@mail.org', 'birthday': None, 'phone_number': '1234567'},
+                            self.user, self.session)
+        await self.assertStatsMatch()
+        # a write that leaves the counted fields alone changes nothing
+        await patch_contact(first.id, {'first_name': 'Jon'}, self.user, self.session)
+        await self.assertStatsMatch()
+        await remove_contact(first.id, self.user, self.session)
+        await self.assertStatsMatch()
+
+    async def test_bulk_writes(self):
+        bodies = [ContactModel(first_name=f'Name{i}', last_name='Doe', email=f'n{i}@{("a.com", "b.com")[i % 2]}',
+                               birthday=date(1990, i % 12 + 1, 1) if i % 3 else None) for i in range(30)]
+        await insert_contacts(bodies, self.user, self.session)
+        await self.session.commit()
+        await self.assertStatsMatch()
+
+        await bulk_update_contacts(ContactFilter(email_domain='a.com'), {'phone_number': '1234567', 'birthday': None},
+                                   self.user, self.session)
+        await self.assertStatsMatch()
+        await bulk_remove_contacts(ContactFilter(email_domain='b.com'), self.user, self.session)
+        await self.assertStatsMatch()
+
+    async def test_reassigned_and_rolled_back(self):
+        await insert_contacts([ContactModel(first_name='John', last_name='Doe', email=f'j{i}@a.com')
+                               for i in range(5)], self.user, self.session)
+        await self.session.commit()
+        await self.session.execute(update(Contact).filter(Contact.email.in_(['j0@a.com', 'j1@a.com'])).values(user_id=2))
+        await self.session.commit()
+        await self.assertStatsMatch()
+        self.assertEqual(await count_contacts(User(id=2), self.session), 2)
+
+        await self.session.execute(delete(Contact))
+        await self.session.rollback()
+        await self.assertStatsMatch()
+        self.assertEqual(await count_contacts(self.user, self.session), 3)
+
+    async def test_version_grows_with_every_write(self):
+        versions = [await get_contacts_version(self.user, self.session)]
+
+        async def assertGrew():
+            versions.append(await get_contacts_version(self.user, self.session))
+            self.assertGreater(versions[-1], versions[-2])
+
+        contact = await create_contact(ContactModel(first_name='John', last_name='Doe', email='john@a.com'),
+                                       self.user, self.session)
+        await assertGrew()
+        # a column that no statistic counts
+        await patch_contact(contact.id, {'first_name': 'Jon'}, self.user, self.session)
+        await assertGrew()
+        await insert_contacts([ContactModel(first_name='Anna', last_name='Doe', email='anna@a.com')], self.user, self.session)
+        await self.session.commit()
+        await assertGrew()
+        await bulk_update_contacts(ContactFilter(email_domain='a.com'), {'last_name': 'Smith'}, self.user, self.session)
+        await assertGrew()
+        await remove_contact(contact.id, self.user, self.session)
+        await assertGrew()
+
+        # neither another book nor a rolled back write changes it
+        await create_contact(ContactModel(first_name='Bob', last_name='Adams', email='bob@a.com'), User(id=2), self.session)
+        await self.session.execute(delete(Contact))
+        await self.session.rollback()
+        self.assertEqual(await get_contacts_version(self.user, self.session), versions[-1])
+        await self.assertStatsMatch()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,9 @@
+import base64
+import json
 import unittest
 from unittest.mock import MagicMock
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models import Contact, User
 from src.schemas import ContactModel
@@ -10,66 +12,141 @@ from src.repository.contacts import (
     get_contact,
     create_contact,
     update_contact,
+    patch_contact,
     remove_contact,
     search_contact,
     get_upcoming_birthdays,
+    encode_cursor,
+    decode_cursor,
+    parse_fields,
 )
 
 
 class TestContacts(unittest.IsolatedAsyncioTestCase):
 
     def setUp(self):
-        self.session = MagicMock(spec=Session)
+        self.session = MagicMock(spec=AsyncSession)
         self.user = User(id=1)
 
+    def set_result(self, value):
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = value
+        result.scalars.return_value.first.return_value = value
+        result.all.return_value = value
+        self.session.execute.return_value = result
+
     async def test_get_contacts(self):
         contacts = [Contact(), Contact(), Contact()]
-        query_mock = self.session.query.return_value
-        query_mock.filter.return_value = query_mock
-        query_mock.offset.return_value = query_mock
-        query_mock.limit.return_value = query_mock
-        query_mock.all.return_value = contacts
+        self.set_result(contacts)
 
         result = await get_contacts(skip=0, limit=10, user=self.user, db=self.session)
         self.assertEqual(result, contacts)
 
+    async def test_get_contacts_after_cursor(self):
+        contacts = [Contact(), Contact()]
+        self.set_result(contacts)
+
+        result = await get_contacts(skip=0, limit=2, user=self.user, db=self.session, sort='-last_name',
+                                    after=('Doe', 'John', 7))
+        self.assertEqual(result, contacts)
+        stmt = self.session.execute.call_args.args[0]
+        self.assertIn('ORDER BY contacts.last_name DESC, contacts.first_name DESC, contacts.id DESC', str(stmt))
+
+    async def test_get_contacts_fields(self):
+        rows = [MagicMock(), MagicMock()]
+        self.set_result(rows)
+
+        result = await get_contacts(skip=0, limit=2, user=self.user, db=self.session, sort='last_name',
+                                    fields=('id', 'first_name'))
+        self.assertEqual(result, rows)
+        stmt = self.session.execute.call_args.args[0]
+        # the requested columns and the sort key, nothing else
+        self.assertEqual([column.name for column in stmt.selected_columns], ['id', 'first_name', 'last_name'])
+
+    def test_parse_fields(self):
+        self.assertEqual(parse_fields('last_name, id,first_name,id'), ('first_name', 'last_name', 'id'))
+        with self.assertRaises(ValueError):
+            parse_fields('id,password')
+        with self.assertRaises(ValueError):
+            parse_fields(' ,')
+
+    def test_cursor_round_trip(self):
+        contact = Contact(id=7, first_name='John', last_name='Doe', email='john@example.com')
+        cursor = encode_cursor('last_name', contact)
+        self.assertEqual(decode_cursor(cursor, 'last_name'), ('Doe', 'John', 7))
+
+    def test_cursor_for_other_sort(self):
+        cursor = encode_cursor('id', Contact(id=7))
+        with self.assertRaises(ValueError):
+            decode_cursor(cursor, 'email')
+
+    def test_malformed_cursor(self):
+        with self.assertRaises(ValueError):
+            decode_cursor('not-a-cursor', 'id')
+
+    def test_cursor_with_wrong_value_types(self):
+        for sort, values in [('id', [{}]), ('id', [[1]]), ('id', ['x']), ('id', [True]), ('email', [7, 1]),
+                             ('email', ['john@example.com', None])]:
+            payload = json.dumps([sort, values]).encode()
+            cursor = base64.urlsafe_b64encode(payload).decode()
+            with self.subTest(sort=sort, values=values), self.assertRaises(ValueError):
+                decode_cursor(cursor, sort)
+
     async def test_create_contact(self):
         body = ContactModel(first_name='test', last_name='test', email='test@gmail.com')
+        contact = Contact(id=1, first_name='test', last_name='test', email='test@gmail.com', user_id=self.user.id)
+        self.set_result(contact)
+
         result = await create_contact(body=body, user=self.user, db=self.session)
-        self.assertEqual(body.first_name, result.first_name)
-        self.assertEqual(body.last_name, result.last_name)
-        self.assertEqual(body.email, result.email)
-        self.assertEqual(self.user.id, result.user_id)
+        self.assertEqual(result, contact)
+        stmt = self.session.execute.call_args.args[0]
+        self.assertTrue(str(stmt).startswith('INSERT INTO contacts'))
+        self.assertIn('RETURNING', str(stmt))
+        self.assertEqual(stmt.compile().params['user_id'], self.user.id)
+        self.session.add.assert_not_called()
+        self.session.commit.assert_awaited_once()
+        self.session.refresh.assert_not_called()
 
     async def test_update_contact_found(self):
         body = ContactModel(first_name='test_first', last_name='test_last', email='test@gmail.com')
-        contact = await create_contact(body=body, user=self.user, db=self.session)
-
-        self.session.query().filter().first.return_value = contact
-        self.session.commit.return_value = None
+        contact = Contact(id=1, first_name='test_first', last_name='test_last', email='test@gmail.com')
+        self.set_result(contact)
 
         result = await update_contact(contact_id=1, body=body, user=self.user, db=self.session)
 
-        self.assertEqual(result.id, contact.id)
-        self.assertEqual(result.first_name, contact.first_name)
-        self.assertEqual(result.last_name, contact.last_name)
-        self.assertEqual(result.email, contact.email)
+        self.assertEqual(result, contact)
+        stmt = self.session.execute.call_args.args[0]
+        self.assertTrue(str(stmt).startswith('UPDATE contacts SET'))
+        self.assertEqual(stmt.compile().params['first_name'], 'test_first')
+        self.session.execute.assert_awaited_once()
+        self.session.commit.assert_awaited_once()
 
     async def test_update_contact_not_found(self):
         body = ContactModel(first_name='test_first', last_name='test_last', email='test@gmail.com')
-        self.session.query().filter().first.return_value = None
-        self.session.commit.return_value = None
+        self.set_result(None)
         result = await update_contact(contact_id=1, body=body, user=self.user, db=self.session)
         self.assertIsNone(result)
 
+    async def test_patch_contact_writes_given_columns(self):
+        contact = Contact(id=1)
+        self.set_result(contact)
+        result = await patch_contact(contact_id=1, values={'phone_number': '+380501234567'}, user=self.user,
+                                     db=self.session)
+        self.assertEqual(result, contact)
+        stmt = self.session.execute.call_args.args[0]
+        self.assertIn('SET phone_number=', str(stmt))
+        self.assertNotIn('first_name=', str(stmt))
+
     async def test_remove_contact_found(self):
         contact = Contact()
-        self.session.query().filter().first.return_value = contact
+        self.set_result(contact)
         result = await remove_contact(contact_id=1, user=self.user, db=self.session)
         self.assertEqual(result, contact)
+        self.assertTrue(str(self.session.execute.call_args.args[0]).startswith('DELETE FROM contacts'))
+        self.session.delete.assert_not_called()
 
     async def test_remove_contact_not_found(self):
-        self.session.query().filter().first.return_value = None
+        self.set_result(None)
         result = await remove_contact(contact_id=1, user=self.user, db=self.session)
         self.assertIsNone(result)
 
@@ -85,14 +162,21 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
             Contact(first_name='John', last_name='Smith', email='john.smith@example.com')
         ]
 
-        query_mock = self.session.query.return_value
-        query_mock.filter.return_value = query_mock
-        query_mock.all.return_value = contacts
+        self.set_result(contacts)
 
         result = await search_contact(search_params, user=self.user, db=self.session)
 
         self.assertEqual(result, contacts)
 
+    async def test_search_contact_fields(self):
+        rows = [MagicMock()]
+        self.set_result(rows)
+
+        result = await search_contact({'last_name': 'Doe'}, user=self.user, db=self.session, fields=('email',))
+        self.assertEqual(result, rows)
+        stmt = self.session.execute.call_args.args[0]
+        self.assertEqual([column.name for column in stmt.selected_columns], ['email'])
+
     async def test_search_contact_without_params(self):
         search_params = {}
 
@@ -101,7 +185,7 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
             Contact(first_name='John', last_name='Smith', email='john.smith@example.com')
         ]
 
-        self.session.query().filter().all.return_value = contacts
+        self.set_result(contacts)
 
         result = await search_contact(search_params, user=self.user, db=self.session)
 
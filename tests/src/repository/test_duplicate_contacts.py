@@ -0,0 +1,60 @@
+import unittest
+from datetime import date
+
+from sqlalchemy import insert, select
+
+from src.database.models import Contact
+from src.repository.contacts import get_contact_stats, merge_contacts
+from src.services.duplicates import find_duplicates
+from tests import sql_test_case
+
+CONTACTS = [
+    ('John', 'Doe', 'john@example.com', None, date(1990, 3, 1)),
+    ('Jon', 'Doe', 'JOHN@example.com', '+380501234567', None),
+    ('Anna', 'Smith', 'anna@example.com', None, None),
+    ('Ann', 'White', 'white@example.com', '050-123-45-67', None),
+    ('Bob', 'Adams', 'bob@example.com', None, None),
+]
+
+
+class DuplicatesSQLTestCase(sql_test_case.SQLTestCase):
+
+    async def populate(self, conn):
+        await conn.execute(insert(Contact), [
+            {'first_name': f, 'last_name': l, 'email': e, 'phone_number': p, 'birthday': b, 'user_id': user_id}
+            for user_id in (1, 2) for f, l, e, p, b in CONTACTS
+        ])
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.changed = self.listen_contacts_changed()
+
+    async def test_find_duplicates(self):
+        groups = await find_duplicates(self.user, self.session)
+        # John Doe and Jon Doe share an email, Jon Doe and Ann White a phone number, ids 6..10 are the other user's
+        self.assertEqual(groups, [{'ids': [1, 2, 4], 'reasons': ['email', 'name', 'phone']}])
+
+    async def test_merge(self):
+        contact = await merge_contacts([2, 1, 4], 1, self.user, self.session)
+        self.assertEqual((contact.id, contact.first_name, contact.phone_number, contact.birthday),
+                         (1, 'John', '+380501234567', date(1990, 3, 1)))
+        ids = (await self.session.execute(select(Contact.id).filter(Contact.user_id == 1).order_by(Contact.id))).scalars()
+        self.assertEqual(list(ids), [1, 3, 5])
+        self.assertEqual(self.changed, [{1}])
+        self.assertEqual((await get_contact_stats(self.user, self.session))['total'], 3)
+        self.assertEqual(await find_duplicates(self.user, self.session), [])
+
+    async def test_merge_keeps_primary_values(self):
+        contact = await merge_contacts([2, 1], 2, self.user, self.session)
+        self.assertEqual((contact.id, contact.first_name, contact.phone_number, contact.birthday),
+                         (2, 'Jon', '+380501234567', date(1990, 3, 1)))
+
+    async def test_merge_other_users_contact(self):
+        self.assertIsNone(await merge_contacts([1, 6], 1, self.user, self.session))
+        count = (await self.session.execute(select(Contact.id).filter(Contact.id.in_([1, 6])))).all()
+        self.assertEqual(len(count), 2)
+        self.assertEqual(self.changed, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import importlib.util
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy import Column, Computed, String, column, insert, select
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateColumn
+
+from src.conf.config import settings
+from src.database.models import Contact, User
+from src.repository.contacts import get_contacts_by_phone, patch_contact
+from src.repository.phone_utils import normalize_phone, normalize_phone_expr
+from tests import sql_test_case
+
+# phone_number holds at most 13 characters
+NUMBERS = ['+380501234567', '0501234567', '050 123-45-67', '(050)1234567', '380501234567', '050.123.45.67',
+           '+1 555 0100', '', None]
+
+
+class TestNormalizePhone(unittest.TestCase):
+    def test_formats(self):
+        for number in NUMBERS[:6]:
+            with self.subTest(number=number):
+                self.assertEqual(normalize_phone(number), '+380501234567')
+        self.assertEqual(normalize_phone('00380501234567'), '+380501234567')
+        self.assertEqual(normalize_phone('+1 555 0100'), '+15550100')
+        self.assertIsNone(normalize_phone(' - '))
+        self.assertIsNone(normalize_phone(None))
+
+    def test_country_code_setting(self):
+        with patch.object(settings, 'phone_country_code', '1'):
+            self.assertEqual(normalize_phone('0555 0100'), '+15550100')
+            sql = str(normalize_phone_expr(column('phone_number')).compile(compile_kwargs={'literal_binds': True}))
+        self.assertIn("'+1'", sql)
+        self.assertNotIn("'+380'", sql)
+
+    def test_migration_matches_model(self):
+        path = Path(__file__).parents[3] / 'migrations' / 'versions' / 'a9d3e6b24c17_added_phone_e164.py'
+        spec = importlib.util.spec_from_file_location('a9d3e6b24c17_added_phone_e164', path)
+        migration = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(migration)
+        added = Column('phone_e164', String(16), Computed(migration.PHONE_E164, persisted=True))
+        self.assertEqual(str(CreateColumn(added).compile(dialect=sqlite.dialect())),
+                         str(CreateColumn(Contact.__table__.c.phone_e164).compile(dialect=sqlite.dialect())))
+
+
+class PhoneSQLTestCase(sql_test_case.SQLTestCase):
+
+    async def populate(self, conn):
+        await conn.execute(insert(Contact), [
+            {'first_name': 'N', 'last_name': str(i), 'email': f'n{i}@example.com', 'phone_number': number,
+             'user_id': 1 + i % 2}
+            for i, number in enumerate(NUMBERS)
+        ])
+
+    async def test_column_matches_python(self):
+        result = await self.session.execute(select(Contact.phone_number, Contact.phone_e164))
+        for number, e164 in result:
+            with self.subTest(number=number):
+                self.assertEqual(e164, normalize_phone(number))
+
+    async def test_lookup(self):
+        contacts = await get_contacts_by_phone('050-123-45-67', self.user, self.session)
+        # the even positions of the first six numbers belong to user 1
+        self.assertEqual([c.last_name for c in contacts], ['0', '2', '4'])
+        self.assertEqual(await get_contacts_by_phone('--', self.user, self.session), [])
+
+    async def test_column_follows_updates(self):
+        contact = (await get_contacts_by_phone('+15550100', User(id=1), self.session))[0]
+        await patch_contact(contact.id, {'phone_number': '0671112233'}, self.user, self.session)
+        self.assertEqual(await get_contacts_by_phone('+15550100', self.user, self.session), [])
+        self.assertEqual([c.id for c in await get_contacts_by_phone('067 111 22 33', self.user, self.session)],
+                         [contact.id])
+
+
+if __name__ == '__main__':
+    unittest.main()
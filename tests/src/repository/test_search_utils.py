@@ -0,0 +1,77 @@
+import unittest
+
+from sqlalchemy import insert, update, delete
+
+from src.database.models import Contact
+from src.repository.contacts import fuzzy_search
+from src.repository.search_utils import trigrams, similarity, fts_query
+from tests import sql_test_case
+
+CONTACTS = [('John', 'Doe', 'john.doe@example.com'), ('Jon', 'Dough', 'jd@example.com'),
+            ('Anna', 'Smith', 'anna@example.com'), ('Hanna', 'Smyth', 'hs@example.com'),
+            ('Bob', 'Adams', 'bob@example.com')]
+
+
+class TestTrigrams(unittest.TestCase):
+
+    def test_trigrams(self):
+        self.assertEqual(trigrams('Word'), {'  w', ' wo', 'wor', 'ord', 'rd '})
+        self.assertEqual(trigrams('a.b'), {'  a', ' a ', '  b', ' b '})
+        self.assertEqual(trigrams('--'), set())
+
+    def test_similarity_matches_pg_trgm(self):
+        self.assertAlmostEqual(similarity('hello', 'hallo'), 1 / 3)
+        self.assertAlmostEqual(similarity('word', 'two words'), 4 / 11)
+        self.assertEqual(similarity('abc', 'abc'), 1.0)
+        self.assertEqual(similarity('abc', '--'), 0.0)
+        self.assertIsNone(similarity(None, 'abc'))
+
+    def test_fts_query(self):
+        self.assertEqual(fts_query('Jo'), '" jo" OR "jo "')
+        self.assertIsNone(fts_query('!'))
+
+
+class FuzzySearchSQLTestCase(sql_test_case.SQLTestCase):
+
+    async def prepare(self, conn):
+        if conn.dialect.name == 'postgresql' and not await self.create_extension(conn, 'pg_trgm'):
+            self.skipTest('pg_trgm is not available')
+
+    async def populate(self, conn):
+        await conn.execute(insert(Contact), [
+            {'first_name': f, 'last_name': l, 'email': e, 'user_id': user_id}
+            for user_id in (1, 2) for f, l, e in CONTACTS
+        ])
+
+    async def search(self, query, **kw):
+        return [(c.first_name, c.last_name) for c, _ in await fuzzy_search(query, self.user, self.session, **kw)]
+
+    async def test_ranked_by_similarity(self):
+        self.assertEqual(await self.search('Smiht'), [('Anna', 'Smith')])
+        self.assertEqual(await self.search('jhon doe'), [('John', 'Doe')])
+        self.assertEqual(await self.search('xyz'), [])
+
+    async def test_score_matches_python(self):
+        results = await fuzzy_search('hanna', self.user, self.session)
+        self.assertEqual([c.first_name for c, _ in results], ['Hanna', 'Anna'])
+        for contact, score in results:
+            expected = max(similarity('hanna', field) for field in
+                           (contact.first_name, contact.last_name, f'{contact.first_name} {contact.last_name}', contact.email))
+            self.assertAlmostEqual(score, expected, places=6)
+
+    async def test_pagination(self):
+        first_page = await self.search('hanna', limit=1)
+        second_page = await self.search('hanna', skip=1, limit=1)
+        self.assertEqual(first_page + second_page, [('Hanna', 'Smyth'), ('Anna', 'Smith')])
+
+    async def test_index_follows_writes(self):
+        async with self.session.begin():
+            await self.session.execute(update(Contact).filter(Contact.first_name == 'Bob').values(first_name='Robert'))
+            await self.session.execute(delete(Contact).filter(Contact.last_name == 'Smith'))
+        self.assertEqual(await self.search('Robrt'), [('Robert', 'Adams')])
+        self.assertEqual(await self.search('Bob'), [])
+        self.assertEqual(await self.search('Smiht'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
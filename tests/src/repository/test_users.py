@@ -1,7 +1,7 @@
 import unittest
 from unittest.mock import MagicMock
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
 from src.database.models import User
@@ -12,18 +12,24 @@ from src.repository.users import (
     update_token,
     confirmed_email,
     update_avatar,
+    update_password,
 )
 
 
 class TestUsers(unittest.IsolatedAsyncioTestCase):
 
     def setUp(self):
-        self.session = MagicMock(spec=Session)
+        self.session = MagicMock(spec=AsyncSession)
         self.user = User(id=1)
 
+    def set_result(self, value):
+        result = MagicMock()
+        result.scalars.return_value.first.return_value = value
+        self.session.execute.return_value = result
+
     async def test_get_user_by_email(self):
         user = UserModel(username='testname', email='test@gmail.com', password='testpass')
-        self.session.query().filter().first.return_value = user
+        self.set_result(user)
 
         result = await get_user_by_email(email='test@gmail.com', db=self.session)
 
@@ -32,7 +38,7 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
 
     async def test_get_user_by_email_not_found(self):
         email = 'nonexistent@example.com'
-        self.session.query().filter().first.return_value = None
+        self.set_result(None)
 
         result = await get_user_by_email(email=email, db=self.session)
 
@@ -44,8 +50,8 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
         result = await create_user(body=body, db=self.session)
 
         self.session.add.assert_called_once_with(result)
-        self.session.commit.assert_called_once()
-        self.session.refresh.assert_called_once_with(result)
+        self.session.commit.assert_awaited_once()
+        self.session.refresh.assert_awaited_once_with(result)
 
         self.assertEqual(result.username, body.username)
         self.assertEqual(result.email, body.email)
@@ -57,29 +63,35 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
         await update_token(user=self.user, token=token, db=self.session)
 
         self.assertEqual(self.user.refresh_token, token)
-        self.session.commit.assert_called_once()
+        self.session.commit.assert_awaited_once()
+
+    async def test_update_password(self):
+        await update_password(user=self.user, password_hash="new_hash", db=self.session)
+
+        self.assertEqual(self.user.password, "new_hash")
+        self.session.commit.assert_awaited_once()
 
     async def test_confirmed_email(self):
         email = "test@example.com"
         user = User(email=email, confirmed=False)
-        self.session.query().filter().first.return_value = user
+        self.set_result(user)
 
         await confirmed_email(email=email, db=self.session)
 
         self.assertTrue(user.confirmed)
-        self.session.commit.assert_called_once()
+        self.session.commit.assert_awaited_once()
 
     async def test_update_avatar(self):
         email = "test@example.com"
         url = "https://example.com/avatar.jpg"
         user = User(email=email, avatar=None)
-        self.session.query().filter().first.return_value = user
+        self.set_result(user)
 
         result = await update_avatar(email=email, url=url, db=self.session)
 
         self.assertEqual(result, user)
         self.assertEqual(result.avatar, url)
-        self.session.commit.assert_called_once()
+        self.session.commit.assert_awaited_once()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,49 @@
+import unittest
+from datetime import date
+
+from src.database.models import User
+from src.repository.contacts import create_contact, update_contact, patch_contact, remove_contact, get_contact
+from src.schemas import ContactModel
+from tests import sql_test_case
+
+
+class WritePathSQLTestCase(sql_test_case.SQLTestCase):
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.statements = []
+        self.listen_statements(self.capture)
+
+    def capture(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    async def test_each_write_is_one_statement(self):
+        body = ContactModel(first_name='John', last_name='Doe', email='john@example.com', birthday=date(1990, 3, 1))
+        contact = await create_contact(body, self.user, self.session)
+        self.assertEqual(len(self.statements), 1)
+        self.assertEqual((contact.first_name_lower, contact.birthday_doy), ('john', 61))
+
+        body.first_name = 'Jon'
+        contact = await update_contact(contact.id, body, self.user, self.session)
+        self.assertEqual(len(self.statements), 2)
+        self.assertEqual((contact.first_name, contact.first_name_lower), ('Jon', 'jon'))
+
+        contact = await patch_contact(contact.id, {'phone_number': '+380501234567'}, self.user, self.session)
+        self.assertEqual(len(self.statements), 3)
+        self.assertEqual((contact.first_name, contact.phone_number), ('Jon', '+380501234567'))
+
+        removed = await remove_contact(contact.id, self.user, self.session)
+        self.assertEqual(len(self.statements), 4)
+        self.assertEqual(removed.id, contact.id)
+        self.assertIsNone(await get_contact(contact.id, self.user, self.session))
+
+    async def test_other_users_contact_is_untouched(self):
+        body = ContactModel(first_name='John', last_name='Doe', email='john@example.com')
+        contact = await create_contact(body, User(id=2), self.session)
+        self.assertIsNone(await patch_contact(contact.id, {'first_name': 'X'}, self.user, self.session))
+        self.assertIsNone(await remove_contact(contact.id, self.user, self.session))
+        self.assertEqual((await get_contact(contact.id, User(id=2), self.session)).first_name, 'John')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,271 @@
+import base64
+import json
+import os
+import tempfile
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from src.database.models import Base
+
+
+@pytest.fixture(scope="module")
+def contacts(client, token):
+    created = []
+    for first_name, last_name in [("John", "Doe"), ("Anna", "Smith"), ("Bob", "Adams"), ("Carl", "Doe"), ("Dina", "Zed")]:
+        response = client.post(
+            "/api/contacts/",
+            json={"first_name": first_name, "last_name": last_name, "email": f"{first_name.lower()}@example.com"},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert response.status_code == 200, response.text
+        created.append(response.json())
+    return created
+
+
+def test_read_contacts_skip_limit(client, token, contacts):
+    response = client.get("/api/contacts/", params={"skip": 1, "limit": 2}, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, response.text
+    assert [c["id"] for c in response.json()] == [c["id"] for c in contacts[1:3]]
+
+
+def test_read_contacts_cursor(client, token, contacts):
+    headers = {"Authorization": f"Bearer {token}"}
+    seen = []
+    params = {"limit": 2, "sort": "last_name"}
+    while True:
+        response = client.get("/api/contacts/", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        seen.extend((c["last_name"], c["first_name"]) for c in response.json())
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+    assert seen == sorted((c["last_name"], c["first_name"]) for c in contacts)
+
+
+def test_read_contacts_cursor_descending(client, token, contacts):
+    headers = {"Authorization": f"Bearer {token}"}
+    first = client.get("/api/contacts/", params={"limit": 3, "sort": "-id"}, headers=headers)
+    second = client.get("/api/contacts/", params={"limit": 3, "sort": "-id", "cursor": first.headers["X-Next-Cursor"]},
+                        headers=headers)
+    ids = [c["id"] for c in first.json() + second.json()]
+    assert ids == sorted((c["id"] for c in contacts), reverse=True)
+
+
+def test_read_contacts_cursor_wrong_sort(client, token, contacts):
+    headers = {"Authorization": f"Bearer {token}"}
+    first = client.get("/api/contacts/", params={"limit": 2, "sort": "email"}, headers=headers)
+    response = client.get("/api/contacts/", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]}, headers=headers)
+    assert response.status_code == 400, response.text
+
+
+def test_read_contacts_bad_cursor(client, token, contacts):
+    response = client.get("/api/contacts/", params={"cursor": "garbage"}, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 400, response.text
+
+
+@pytest.mark.parametrize("values", [[{}], [[1]], ["x"]])
+def test_read_contacts_cursor_wrong_types(client, token, contacts, values):
+    cursor = base64.urlsafe_b64encode(json.dumps(["id", values]).encode()).decode()
+    response = client.get("/api/contacts/", params={"cursor": cursor}, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 400, response.text
+
+
+def test_read_contacts_fields(client, token, contacts):
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {"limit": 2, "sort": "last_name", "fields": "first_name,id"}
+    response = client.get("/api/contacts/", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    assert all(set(c) == {"id", "first_name"} for c in response.json())
+    assert "X-Total-Count" in response.headers
+    # the cursor still works when the sort key is not among the fields
+    params["cursor"] = response.headers["X-Next-Cursor"]
+    following = client.get("/api/contacts/", params=params, headers=headers)
+    assert following.status_code == 200, following.text
+    assert not {c["id"] for c in response.json()} & {c["id"] for c in following.json()}
+
+    response = client.get("/api/contacts/search", params={"last_name": "Doe", "fields": "email"}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert sorted(response.json(), key=lambda c: c["email"]) == [{"email": "carl@example.com"}, {"email": "john@example.com"}]
+
+    response = client.get("/api/contacts/", params={"fields": "id,password"}, headers=headers)
+    assert response.status_code == 400, response.text
+
+
+def test_conditional_reads(client, token, contacts):
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.get("/api/contacts/", headers=headers)
+    assert response.status_code == 200, response.text
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+
+    for path in ("/api/contacts/", "/api/contacts/upcoming-birthdays"):
+        response = client.get(path, headers=headers)
+        unchanged = client.get(path, headers=dict(headers, **{"If-None-Match": response.headers["ETag"]}))
+        assert unchanged.status_code == 304, unchanged.text
+        assert unchanged.content == b"" and unchanged.headers["ETag"] == response.headers["ETag"]
+    # another read of the same book has another ETag
+    assert client.get("/api/contacts/", params={"limit": 1}, headers=headers).headers["ETag"] != etag
+
+    client.patch(f"/api/contacts/{contacts[0]['id']}", json={"first_name": contacts[0]["first_name"]}, headers=headers)
+    response = client.get("/api/contacts/", headers=dict(headers, **{"If-None-Match": f'"x", {etag}'}))
+    assert response.status_code == 200, response.text
+    assert response.headers["ETag"] != etag
+
+
+def test_stats_and_total_count(client, token, contacts):
+    headers = {"Authorization": f"Bearer {token}"}
+    listed = client.get("/api/contacts/", params={"limit": 1000}, headers=headers)
+    assert listed.status_code == 200, listed.text
+    response = client.get("/api/contacts/stats", headers=headers)
+    assert response.status_code == 200, response.text
+    stats = response.json()
+    assert stats["total"] == len(listed.json()) == int(listed.headers["X-Total-Count"])
+    assert {"domain": "example.com", "count": len(contacts)} in stats["domains"]
+    assert stats["missing_birthday"] == sum(1 for c in listed.json() if not c["birthday"])
+    assert [m["month"] for m in stats["months"]] == list(range(1, 13))
+
+
+def test_birthdays_range(client, token, contacts):
+    response = client.get("/api/contacts/birthdays", params={"from": "2023-01-01", "to": "2023-12-31"},
+                          headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, response.text
+    assert response.json() == []
+
+
+def test_birthdays_skip_a_lagging_replica(client, token, monkeypatch):
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.post("/api/contacts/", headers=headers, json={
+        "first_name": "Lagging", "last_name": "Replica", "email": "lagging@example.com", "birthday": "1990-06-15"})
+    assert response.status_code == 200, response.text
+    # a replica that has applied none of the writes
+    path = os.path.join(tempfile.mkdtemp(), "replica.db")
+    Base.metadata.create_all(create_engine(f"sqlite:///{path}"))
+    replica = async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool))
+    monkeypatch.setattr("src.routes.contacts.replica_router.choose", AsyncMock(return_value=replica))
+
+    response = client.get("/api/contacts/birthdays", params={"from": "2023-06-01", "to": "2023-06-30"}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert [c["first_name"] for c in response.json()] == ["Lagging"]
+
+
+def test_birthdays_range_reversed(client, token):
+    response = client.get("/api/contacts/birthdays", params={"from": "2023-02-01", "to": "2023-01-01"},
+                          headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 400, response.text
+
+
+def test_birthday_months(client, token, contacts):
+    response = client.get("/api/contacts/birthdays/months", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, response.text
+    assert [m["month"] for m in response.json()] == list(range(1, 13))
+
+
+def test_autocomplete(client, token, contacts):
+    response = client.get("/api/contacts/autocomplete", params={"q": " DO"}, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, response.text
+    assert [(c["first_name"], c["last_name"]) for c in response.json()] == [("John", "Doe"), ("Carl", "Doe")]
+
+
+def test_fuzzy_search(client, token, contacts):
+    response = client.get("/api/contacts/search/fuzzy", params={"q": "Smiht"}, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, response.text
+    assert [(c["first_name"], c["last_name"]) for c in response.json()] == [("Anna", "Smith")]
+    assert 0 < response.json()[0]["score"] < 1
+
+
+def test_import_contacts(client, token):
+    body = "first_name,last_name,email\nImported,One,imported1@example.com\nImported,Two,bad\n"
+    response = client.post("/api/contacts/import", content=body,
+                           headers={"Authorization": f"Bearer {token}", "Content-Type": "text/csv"})
+    assert response.status_code == 200, response.text
+    assert response.json()["imported"] == 1
+    assert response.json()["errors"][0]["row"] == 2
+
+
+def test_import_contacts_unknown_format(client, token):
+    response = client.post("/api/contacts/import", content="x", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 415, response.text
+
+
+def test_export_contacts(client, token, contacts):
+    response = client.get("/api/contacts/export", params={"format": "jsonl"}, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-disposition"] == 'attachment; filename="contacts.jsonl"'
+    assert [line["id"] for line in map(json.loads, response.text.splitlines())][:len(contacts)] == [c["id"] for c in contacts]
+
+
+def test_bulk_update_and_delete(client, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    body = "first_name,last_name,email\nBulk,One,bulk1@bulk.example\nBulk,Two,bulk2@bulk.example\n"
+    client.post("/api/contacts/import", content=body, headers=dict(headers, **{"Content-Type": "text/csv"}))
+
+    response = client.post("/api/contacts/bulk-update", headers=headers,
+                           json={"filter": {"email_domain": "bulk.example"}, "values": {"last_name": "Updated"}})
+    assert response.status_code == 200, response.text
+    assert response.json()["affected"] == 2
+
+    response = client.post("/api/contacts/bulk-delete", headers=headers, json={"ids": response.json()["ids"]})
+    assert response.status_code == 200, response.text
+    assert response.json()["affected"] == 2
+
+
+def test_bulk_requires_a_filter(client, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.post("/api/contacts/bulk-delete", headers=headers, json={}).status_code == 400
+    response = client.post("/api/contacts/bulk-update", headers=headers,
+                           json={"filter": {"ids": [1]}, "values": {"first_name": None}})
+    assert response.status_code == 422
+
+
+def test_patch_contact(client, token, contacts):
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.patch(f"/api/contacts/{contacts[0]['id']}", json={"phone_number": "+380501234567"}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json() == dict(contacts[0], phone_number="+380501234567")
+    assert client.patch("/api/contacts/999999", json={"first_name": "X"}, headers=headers).status_code == 404
+
+
+def test_duplicates_and_merge(client, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    body = "first_name,last_name,email,phone_number\nDup,One,dup@dup.example,\nDupe,Another,DUP@dup.example,0501112233\n"
+    client.post("/api/contacts/import", content=body, headers=dict(headers, **{"Content-Type": "text/csv"}))
+
+    response = client.get("/api/contacts/duplicates", headers=headers)
+    assert response.status_code == 200, response.text
+    assert int(response.headers["X-Total-Count"]) == len(response.json())
+    group = next(g for g in response.json() if g["contacts"][0]["email"] == "dup@dup.example")
+    assert group["reasons"] == ["email"]
+    ids = [c["id"] for c in group["contacts"]]
+
+    response = client.post("/api/contacts/duplicates/merge", headers=headers, json={"ids": [ids[0], ids[0]]})
+    assert response.status_code == 422, response.text
+    response = client.post("/api/contacts/duplicates/merge", headers=headers, json={"ids": ids, "primary_id": 999999})
+    assert response.status_code == 400, response.text
+    response = client.post("/api/contacts/duplicates/merge", headers=headers, json={"ids": ids})
+    assert response.status_code == 200, response.text
+    assert (response.json()["id"], response.json()["phone_number"]) == (ids[0], "0501112233")
+    assert client.get(f"/api/contacts/{ids[1]}", headers=headers).status_code == 404
+    response = client.post("/api/contacts/duplicates/merge", headers=headers, json={"ids": ids})
+    assert response.status_code == 404, response.text
+
+
+def test_read_contacts_by_phone(client, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.post("/api/contacts/", headers=headers, json={
+        "first_name": "Caller", "last_name": "Id", "email": "caller@example.com", "phone_number": "067 765-43-21"})
+    assert response.status_code == 200, response.text
+    response = client.get("/api/contacts/by-phone/+380677654321", headers=headers)
+    assert response.status_code == 200, response.text
+    assert [c["email"] for c in response.json()] == ["caller@example.com"]
+    assert client.get("/api/contacts/by-phone/0000000000", headers=headers).json() == []
+
+
+@pytest.mark.parametrize("params", [{"skip": -1}, {"limit": 0}, {"limit": -5}])
+def test_birthdays_page_bounds(client, token, params):
+    response = client.get("/api/contacts/birthdays", params=params, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 422, response.text
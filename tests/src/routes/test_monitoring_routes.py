@@ -0,0 +1,17 @@
+from src.conf.config import settings
+
+
+def test_monitoring_requires_login(client):
+    response = client.get("/api/monitoring/db-replicas")
+    assert response.status_code == 401, response.text
+
+
+def test_monitoring_refuses_other_users(client, token):
+    response = client.get("/api/monitoring/db-replicas", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 403, response.text
+
+
+def test_monitoring_for_listed_users(client, token, user, monkeypatch):
+    monkeypatch.setattr(settings, "monitoring_emails", [user["email"]])
+    response = client.get("/api/monitoring/db-pool", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, response.text
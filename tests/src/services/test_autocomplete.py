@@ -0,0 +1,126 @@
+import asyncio
+import random
+import unittest
+
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from sqlalchemy import insert, select
+
+from src.database.models import Contact
+from src.repository.contacts import autocomplete, create_contact
+from src.schemas import ContactModel
+from src.services.autocomplete import PrefixIndex, AutocompleteCache, autocomplete_cache, suggest, _MISSING
+from src.services.cache import ReadThroughCache
+from tests import sql_test_case
+
+ROWS = [
+    (1, 'John', 'Doe', 'john.doe@example.com'),
+    (2, 'Johanna', 'Smith', 'jo@example.com'),
+    (3, 'Jo', 'Black', 'black@example.com'),
+    (4, 'Anna', 'Johnson', 'anna@example.com'),
+    (5, 'John', 'Dorian', 'jd@example.com'),
+]
+
+
+class TestPrefixIndex(unittest.TestCase):
+
+    def test_ranking(self):
+        index = PrefixIndex(ROWS)
+        self.assertEqual([s['id'] for s in index.search('jo', 10)], [3, 2, 1, 5, 4])
+
+    def test_full_name(self):
+        index = PrefixIndex(ROWS)
+        self.assertEqual([s['id'] for s in index.search('john do', 10)], [1, 5])
+
+    def test_limit(self):
+        index = PrefixIndex(ROWS)
+        self.assertEqual([s['id'] for s in index.search('jo', 2)], [3, 2])
+
+    def test_no_match(self):
+        self.assertEqual(PrefixIndex(ROWS).search('zz', 10), [])
+
+
+class TestAutocompleteCache(unittest.TestCase):
+
+    def test_lru(self):
+        cache = AutocompleteCache(max_users=1, max_contacts=10, ttl=60)
+        cache.put(1, PrefixIndex(ROWS), cache.token())
+        cache.put(2, None, cache.token())
+        self.assertIsNone(cache.get(2))
+        self.assertIsNot(cache.get(1), cache.get(2))
+
+    def test_stale_put_is_ignored(self):
+        cache = AutocompleteCache(max_users=10, max_contacts=10, ttl=60)
+        token = cache.token()
+        cache.invalidate({1})
+        cache.put(1, PrefixIndex(ROWS), token)
+        self.assertEqual(cache.get(1), cache.get(99))
+
+
+class TestAutocompleteCacheListen(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        server = FakeServer()
+        # the contact cache of a worker that writes, the autocomplete cache of another worker and its own one
+        self.writer = ReadThroughCache('test', 100, 60, 600)
+        self.writer.connect(FakeRedis(server=server))
+        self.other, self.own = AutocompleteCache(10, 10, 60), AutocompleteCache(10, 10, 60)
+        self.listeners = []
+        for cache, origin in ((self.other, 'other'), (self.own, self.writer.origin)):
+            cache.connect(FakeRedis(server=server))
+            cache.put(1, PrefixIndex(ROWS), cache.token())
+            self.listeners.append(asyncio.create_task(cache.listen(self.writer.channel, origin)))
+        await asyncio.sleep(0.05)
+
+    async def asyncTearDown(self):
+        for listener in self.listeners:
+            listener.cancel()
+        await asyncio.gather(*self.listeners, return_exceptions=True)
+
+    async def test_write_of_another_worker_drops_the_book(self):
+        self.writer.invalidate({1})
+        await asyncio.gather(*self.writer._pending)
+        for _ in range(100):
+            if self.other.get(1) is _MISSING:
+                break
+            await asyncio.sleep(0.01)
+        self.assertIs(self.other.get(1), _MISSING)
+        # the writer's own autocomplete cache was invalidated by the commit, not by its message
+        self.assertIsInstance(self.own.get(1), PrefixIndex)
+
+
+class AutocompleteSQLTestCase(sql_test_case.SQLTestCase):
+
+    async def populate(self, conn):
+        random.seed(7)
+        names = ['John', 'Johanna', 'Jo', 'Anna', 'Annie', 'Bob', 'Bobby', 'Carl', 'Carla', 'Dina']
+        contacts = [{'first_name': random.choice(names), 'last_name': random.choice(names) + 'son',
+                     'email': f'{random.choice(names).lower()}{i}@ex.com', 'user_id': 1} for i in range(300)]
+        await conn.execute(insert(Contact), contacts)
+        result = await conn.execute(select(Contact.id, Contact.first_name, Contact.last_name, Contact.email))
+        self.rows = [tuple(row) for row in result]
+
+    async def test_database_matches_memory(self):
+        index = PrefixIndex(self.rows)
+        for query in ['j', 'jo', 'joh', 'john', 'john b', 'anna', 'ann', 'b', 'carla', 'dina1', 'x', 'bobbyson']:
+            with self.subTest(query=query):
+                self.assertEqual(await autocomplete(query, 7, self.user, self.session), index.search(query, 7))
+
+    async def test_suggest_sees_new_contact(self):
+        autocomplete_cache.invalidate({1})
+        self.assertEqual(await suggest('Zed', 5, self.user, self.session), [])
+
+        await create_contact(ContactModel(first_name='Zed', last_name='Zeta', email='zed@example.com'),
+                             self.user, self.session)
+        self.assertEqual([s['first_name'] for s in await suggest('ze', 5, self.user, self.session)], ['Zed'])
+
+    async def test_non_ascii_names(self):
+        await create_contact(ContactModel(first_name='Олена', last_name='Їжак', email='olena@example.com'),
+                             self.user, self.session)
+        for query in ('оле', 'їжак', 'олена ї'):
+            with self.subTest(query=query):
+                self.assertEqual([s['first_name'] for s in await autocomplete(query, 5, self.user, self.session)],
+                                 ['Олена'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from redis.exceptions import ConnectionError
+
+from src.services.cache import LocalCache, ReadThroughCache, _MISSING
+from src.services.contact_cache import dump_rows, load_rows, _row_type
+
+Row = _row_type(('first_name', 'birthday', 'id'))
+
+
+class TestLocalCache(unittest.TestCase):
+    def test_lru(self):
+        cache = LocalCache(max_entries=2, ttl=60)
+        for key in (b'a', b'b', b'c'):
+            cache.put(1, key, key.decode(), cache.token())
+        self.assertIs(cache.get(1, b'a'), _MISSING)
+        self.assertEqual((cache.get(1, b'b'), cache.get(1, b'c'), len(cache)), ('b', 'c', 2))
+
+    def test_ttl(self):
+        cache = LocalCache(max_entries=10, ttl=60)
+        cache.put(1, b'a', 'a', cache.token())
+        with patch('src.services.cache.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertIs(cache.get(1, b'a'), _MISSING)
+
+    def test_invalidate_drops_only_the_written_owners(self):
+        cache = LocalCache(max_entries=10, ttl=60)
+        cache.put(1, b'a', 'a', cache.token())
+        cache.put(2, b'a', 'b', cache.token())
+        cache.invalidate({1})
+        self.assertIs(cache.get(1, b'a'), _MISSING)
+        self.assertEqual(cache.get(2, b'a'), 'b')
+
+    def test_stale_put_is_ignored(self):
+        cache = LocalCache(max_entries=10, ttl=60)
+        token = cache.token()
+        cache.invalidate({1})
+        cache.put(1, b'a', 'stale', token)
+        cache.put(2, b'a', 'fresh', token)
+        self.assertIs(cache.get(1, b'a'), _MISSING)
+        self.assertEqual(cache.get(2, b'a'), 'fresh')
+
+    def test_stale_put_is_ignored_after_the_record_is_cleared(self):
+        cache = LocalCache(max_entries=1, ttl=60)
+        token = cache.token()
+        cache.invalidate({1, 2})
+        cache.invalidate({3})
+        cache.put(1, b'a', 'stale', token)
+        self.assertIs(cache.get(1, b'a'), _MISSING)
+
+
+class TestReadThroughCache(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        server = FakeServer()
+        # two workers sharing one Redis
+        self.first, self.second = ReadThroughCache('test', 100, 60, 600), ReadThroughCache('test', 100, 60, 600)
+        self.first.connect(FakeRedis(server=server))
+        self.second.connect(FakeRedis(server=server))
+        self.listeners = [asyncio.create_task(cache.listen()) for cache in (self.first, self.second)]
+        await asyncio.sleep(0.05)
+
+    async def asyncTearDown(self):
+        for listener in self.listeners:
+            listener.cancel()
+        await asyncio.gather(*self.listeners, return_exceptions=True)
+
+    async def test_read_through_both_tiers(self):
+        load = AsyncMock(return_value=[Row('John', None, 1)])
+        self.assertEqual(await self.first.fetch(1, b'k', load, dump_rows, load_rows), [Row('John', None, 1)])
+        self.assertEqual(await self.first.fetch(1, b'k', load, dump_rows, load_rows), [Row('John', None, 1)])
+        self.assertEqual(await self.second.fetch(1, b'k', load, dump_rows, load_rows), [Row('John', None, 1)])
+        self.assertEqual(load.await_count, 1)
+        self.assertEqual((self.first.metrics['misses'], self.first.metrics['local_hits']), (1, 1))
+        self.assertEqual(self.second.metrics['redis_hits'], 1)
+        self.assertEqual(self.first.status()['hit_ratio'], 0.5)
+
+    async def test_invalidation_reaches_every_tier_and_worker(self):
+        load = AsyncMock(side_effect=[1, 2, 3])
+        self.assertEqual(await self.first.fetch(1, b'k', load), 1)
+        self.assertEqual(await self.second.fetch(1, b'k', load), 1)
+
+        self.first.invalidate({1})
+        # the writer reads what it wrote right away
+        self.assertEqual(await self.first.fetch(1, b'k', load), 2)
+        for _ in range(100):
+            if self.second.metrics['remote_invalidations']:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(self.second.metrics['remote_invalidations'], 1)
+        self.assertEqual(self.first.metrics['remote_invalidations'], 0)
+        self.assertEqual(await self.second.fetch(1, b'k', load), 2)
+        self.assertEqual(load.await_count, 2)
+
+    async def test_read_loaded_before_an_invalidation_is_not_stored(self):
+        loading, release = asyncio.Event(), asyncio.Event()
+
+        async def slow_load():
+            loading.set()
+            await release.wait()
+            return 'stale'
+
+        read = asyncio.create_task(self.first.fetch(1, b'k', slow_load))
+        await loading.wait()
+        self.second.invalidate({1})
+        await asyncio.gather(*self.second._pending)
+        release.set()
+        self.assertEqual(await read, 'stale')
+        self.assertEqual(await self.first.fetch(1, b'k', AsyncMock(return_value='fresh')), 'fresh')
+
+    async def test_redis_errors_fall_back_to_the_database(self):
+        self.first.redis.pipeline = lambda *args, **kwargs: (_ for _ in ()).throw(ConnectionError())
+        self.assertEqual(await self.first.fetch(1, b'k', AsyncMock(return_value='value')), 'value')
+        self.assertEqual(self.first.metrics['redis_errors'], 1)
+        self.first.invalidate({1})
+        await asyncio.gather(*self.first._pending)
+        self.assertEqual(self.first.metrics['redis_errors'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
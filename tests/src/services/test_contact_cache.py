@@ -0,0 +1,131 @@
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from src.database.models import Base, Contact, User
+from src.repository.contacts import bulk_remove_contacts, create_contact, patch_contact
+from src.schemas import ContactFilter, ContactModel
+from src.services import contact_cache as contact_cache_service, duplicates as duplicates_service
+from src.services.contact_cache import contact_cache, dump_rows, load_rows, _row_type
+from tests import sql_test_case
+
+Row = _row_type(('first_name', 'birthday', 'id'))
+
+
+class TestRows(unittest.TestCase):
+    def test_round_trip(self):
+        rows = [Row('John', date(1990, 5, 1), 1), Row('Анна', None, 2)]
+        loaded = load_rows(dump_rows(rows))
+        self.assertEqual(loaded, rows)
+        self.assertEqual(loaded[0].birthday, date(1990, 5, 1))
+        self.assertEqual(load_rows(dump_rows([])), [])
+
+
+class CacheSQLTestCase(sql_test_case.SQLTestCase):
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        contact_cache.clear()
+        contact_cache.connect(FakeRedis(server=FakeServer()))
+
+    async def asyncTearDown(self):
+        contact_cache.connect(None)
+        contact_cache.clear()
+        await super().asyncTearDown()
+
+    async def test_writes_invalidate_the_cached_reads(self):
+        contact = await create_contact(ContactModel(first_name='John', last_name='Doe', email='john@example.com',
+                                                    birthday=date(1990, 5, 1)), self.user, self.session)
+        self.assertEqual([c.first_name for c in await contact_cache_service.get_contacts(0, 10, self.user, self.session)],
+                         ['John'])
+        self.assertEqual((await contact_cache_service.get_contact(contact.id, self.user, self.session)).birthday,
+                         date(1990, 5, 1))
+        version = await contact_cache_service.get_contacts_version(self.user, self.session)
+
+        await patch_contact(contact.id, {'first_name': 'Jon'}, self.user, self.session)
+        self.assertEqual([c.first_name for c in await contact_cache_service.get_contacts(0, 10, self.user, self.session)],
+                         ['Jon'])
+        self.assertEqual((await contact_cache_service.get_contact(contact.id, self.user, self.session)).first_name, 'Jon')
+        self.assertGreater(await contact_cache_service.get_contacts_version(self.user, self.session), version)
+
+        # served from Redis once this worker forgets them
+        contact_cache.local.clear()
+        hits = contact_cache.metrics['redis_hits']
+        self.assertEqual((await contact_cache_service.get_contact(contact.id, self.user, self.session)).first_name, 'Jon')
+        self.assertEqual(contact_cache.metrics['redis_hits'], hits + 1)
+
+        await bulk_remove_contacts(ContactFilter(email_domain='example.com'), self.user, self.session)
+        self.assertEqual(await contact_cache_service.get_contacts(0, 10, self.user, self.session), [])
+        self.assertEqual(await contact_cache_service.count_contacts(self.user, self.session), 0)
+        self.assertIsNone(await contact_cache_service.get_contact(contact.id, self.user, self.session))
+
+    async def replica(self):
+        # a replica that has applied none of the writes yet, its session names the primary as get_read_db does
+        engine = create_async_engine(sql_test_case.SQLITE_URL)
+        self.addAsyncCleanup(engine.dispose)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(User), self.users)
+        session = async_sessionmaker(engine, expire_on_commit=False)(info={'primary': self.session})
+        self.addAsyncCleanup(session.close)
+        return session
+
+    async def test_lagging_replica_does_not_fill_the_cache(self):
+        replica = await self.replica()
+        await create_contact(ContactModel(first_name='John', last_name='Doe', email='john@example.com'),
+                             self.user, self.session)
+        for _ in range(2):
+            rows = await contact_cache_service.get_contacts(0, 10, self.user, replica)
+            self.assertEqual([c.first_name for c in rows], ['John'])
+            self.assertEqual(await contact_cache_service.count_contacts(self.user, replica), 1)
+            # and Redis holds what the primary returned
+            contact_cache.local.clear()
+        self.assertEqual(await contact_cache_service.get_contacts_version(self.user, replica),
+                         await contact_cache_service.get_contacts_version(self.user, self.session))
+
+    async def test_caught_up_replica_serves_the_misses(self):
+        replica = await self.replica()
+        contact = await create_contact(ContactModel(first_name='John', last_name='Doe', email='john@example.com'),
+                                       self.user, self.session)
+        # replicated, told apart by the name
+        await replica.execute(insert(Contact), [{'id': contact.id, 'first_name': 'Replica', 'last_name': 'Doe',
+                                                 'email': 'john@example.com', 'user_id': 1}])
+        await replica.commit()
+        rows = await contact_cache_service.get_contacts(0, 10, self.user, replica)
+        self.assertEqual([c.first_name for c in rows], ['Replica'])
+        row = await contact_cache_service.get_contact(contact.id, self.user, replica)
+        self.assertEqual(row.first_name, 'Replica')
+
+    async def test_duplicates_are_scanned_once_per_version(self):
+        for email in ('john@example.com', 'JOHN@example.com'):
+            await create_contact(ContactModel(first_name='John', last_name='Doe', email=email), self.user, self.session)
+        with patch('src.services.duplicates.find_duplicates', wraps=duplicates_service.find_duplicates) as scan:
+            for _ in range(3):
+                version = await contact_cache_service.get_contacts_version(self.user, self.session)
+                groups = await contact_cache_service.find_duplicates(self.user, self.session, version)
+                self.assertEqual([group['reasons'] for group in groups], [['email', 'name']])
+            self.assertEqual(scan.call_count, 1)
+
+            await create_contact(ContactModel(first_name='Anna', last_name='Smith', email='john@example.com'),
+                                 self.user, self.session)
+            version = await contact_cache_service.get_contacts_version(self.user, self.session)
+            groups = await contact_cache_service.find_duplicates(self.user, self.session, version)
+            self.assertEqual([len(group['ids']) for group in groups], [3])
+            self.assertEqual(scan.call_count, 2)
+
+    async def test_books_are_cached_apart(self):
+        for user_id in (1, 2):
+            await create_contact(ContactModel(first_name=f'User{user_id}', last_name='Doe', email=f'{user_id}@a.com'),
+                                 User(id=user_id), self.session)
+        for user_id in (1, 2):
+            rows = await contact_cache_service.search_contact({'last_name': 'Doe'}, User(id=user_id), self.session)
+            self.assertEqual([row.first_name for row in rows], [f'User{user_id}'])
+
+
+if __name__ == '__main__':
+    unittest.main()
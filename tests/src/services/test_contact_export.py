@@ -0,0 +1,84 @@
+import gzip
+import json
+import unittest
+from datetime import date
+
+from sqlalchemy import insert, select
+
+from src.database.models import Contact, User
+from src.schemas import ContactFileFormat
+from src.services import contact_export
+from src.services.contact_import import import_contacts, iter_lines, parse_vcard
+from tests import sql_test_case
+
+CONTACTS = [
+    {'first_name': 'John', 'last_name': 'Doe', 'email': 'john@example.com', 'phone_number': '+380501234567',
+     'birthday': date(1990, 5, 1)},
+    {'first_name': 'Anna, "Ann"', 'last_name': 'Smith;Jones', 'email': 'anna@example.com', 'phone_number': None,
+     'birthday': None},
+]
+
+
+class ExportSQLTestCase(sql_test_case.SQLTestCase):
+
+    async def populate(self, conn):
+        await conn.execute(insert(Contact), [dict(contact, user_id=1) for contact in CONTACTS])
+        await conn.execute(insert(Contact), [dict(CONTACTS[0], user_id=2)])
+
+    async def export(self, export_format, compress=False) -> bytes:
+        chunks = [chunk async for chunk in contact_export.export_contacts(export_format, self.user, self.session,
+                                                                            compress=compress)]
+        return b''.join(chunks)
+
+    async def test_csv(self):
+        data = await self.export(ContactFileFormat.csv)
+        self.assertEqual(data.decode().split('\r\n'), [
+            'id,first_name,last_name,email,phone_number,birthday',
+            '1,John,Doe,john@example.com,+380501234567,1990-05-01',
+            '2,"Anna, ""Ann""",Smith;Jones,anna@example.com,,',
+            '',
+        ])
+
+    async def test_jsonl(self):
+        data = await self.export(ContactFileFormat.jsonl)
+        records = [json.loads(line) for line in data.decode().splitlines()]
+        self.assertEqual(records, [dict(contact, id=i + 1, birthday=contact['birthday'] and contact['birthday'].isoformat())
+                                   for i, contact in enumerate(CONTACTS)])
+
+    async def test_vcard_parses_back(self):
+        data = await self.export(ContactFileFormat.vcard)
+
+        async def chunks():
+            yield data
+        records = [record async for record in parse_vcard(iter_lines(chunks()))]
+        self.assertEqual(records, [{key: value for key, value in contact.items() if value is not None}
+                                   for contact in CONTACTS])
+
+    async def test_gzip(self):
+        self.assertEqual(gzip.decompress(await self.export(ContactFileFormat.csv, compress=True)),
+                         await self.export(ContactFileFormat.csv))
+
+    async def test_round_trip(self):
+        data = await self.export(ContactFileFormat.csv)
+
+        async def chunks():
+            yield data
+        report = await import_contacts(chunks(), ContactFileFormat.csv, User(id=2), self.session)
+        self.assertEqual(report['imported'], 2)
+        result = await self.session.execute(select(Contact.first_name).filter(Contact.user_id == 2).order_by(Contact.id))
+        self.assertEqual(list(result.scalars()), ['John', 'John', 'Anna, "Ann"'])
+
+    async def test_large_book_is_chunked(self):
+        await self.session.execute(insert(Contact), [
+            {'first_name': f'F{i}', 'last_name': 'L', 'email': f'c{i}@example.com', 'user_id': 1} for i in range(5000)
+        ])
+        await self.session.commit()
+        chunks = [chunk async for chunk in contact_export.export_contacts(ContactFileFormat.jsonl, self.user,
+                                                                            self.session)]
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(chunk) < 2 * contact_export.CHUNK_SIZE for chunk in chunks))
+        self.assertEqual(b''.join(chunks).count(b'\n'), 5002)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+from datetime import date
+
+from sqlalchemy import select
+
+from src.database.models import Contact
+from src.schemas import ContactFileFormat
+from src.services.contact_import import (
+    ImportFormatError,
+    import_contacts,
+    iter_lines,
+    parse_csv,
+    parse_jsonl,
+    parse_vcard,
+)
+from tests import sql_test_case
+
+CSV = ('﻿first_name,Last_Name,email,birthday,notes\r\n'
+       'John,Doe,john@example.com,1990-05-01,"multi\r\nline, note"\r\n'
+       'Anna,Smith,not-an-email,,\r\n'
+       '\r\n'
+       'Bob,Adams,bob@example.com,,x,extra\r\n'
+       '"Carl","O""Neil",carl@example.com,,\n')
+
+JSONL = ('{"first_name": "John", "last_name": "Doe", "email": "john@example.com", "phone_number": ""}\n'
+         '{"first_name": "Anna"\n'
+         '[]\n'
+         '\n'
+         '{"first_name": "Bob", "last_name": "Adams", "email": "bob@example.com", "birthday": "1990-05-01"}\n')
+
+VCARD = ('BEGIN:VCARD\r\nVERSION:3.0\r\nN:Doe;John;;;\r\nFN:John Doe\r\nitem1.EMAIL;TYPE=work:john@exa\r\n mple.com\r\n'
+         'EMAIL:second@example.com\r\nTEL;TYPE=cell:+380501234567\r\nBDAY:19900501\r\nEND:VCARD\r\n'
+         'BEGIN:VCARD\r\nVERSION:4.0\r\nFN:Anna Smith\r\nEMAIL:anna@example.com\r\nEND:VCARD\r\n'
+         'BEGIN:VCARD\r\nN:Adams;Bob\r\n')
+
+
+async def chunked(text: str, size: int = 7):
+    data = text.encode()
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def collect(parser, text: str) -> list:
+    return [record if isinstance(record, dict) else str(record) async for record in parser(iter_lines(chunked(text)))]
+
+
+class TestParsers(unittest.IsolatedAsyncioTestCase):
+
+    async def test_iter_lines(self):
+        lines = [line async for line in iter_lines(chunked('a\r\nb\rc\n\nd', 1))]
+        self.assertEqual(lines, ['a', 'b', 'c', '', 'd'])
+
+    async def test_iter_lines_invalid_utf8(self):
+        async def chunks():
+            yield b'\xff\xfe'
+        with self.assertRaises(ImportFormatError):
+            [line async for line in iter_lines(chunks())]
+
+    async def test_csv(self):
+        records = await collect(parse_csv, CSV)
+        self.assertEqual(records, [
+            {'first_name': 'John', 'last_name': 'Doe', 'email': 'john@example.com', 'birthday': '1990-05-01'},
+            {'first_name': 'Anna', 'last_name': 'Smith', 'email': 'not-an-email', 'birthday': None},
+            'Expected 5 values, got 6',
+            {'first_name': 'Carl', 'last_name': "O\"Neil", 'email': 'carl@example.com', 'birthday': None},
+        ])
+
+    async def test_csv_requires_header(self):
+        with self.assertRaises(ImportFormatError):
+            await collect(parse_csv, 'name,email\nJohn,john@example.com\n')
+
+    async def test_jsonl(self):
+        records = await collect(parse_jsonl, JSONL)
+        self.assertEqual(records[0], {'first_name': 'John', 'last_name': 'Doe', 'email': 'john@example.com',
+                                      'phone_number': None})
+        self.assertTrue(records[1].startswith('Invalid JSON'))
+        self.assertEqual(records[2], 'Expected a JSON object')
+        self.assertEqual(records[3]['first_name'], 'Bob')
+
+    async def test_vcard(self):
+        records = await collect(parse_vcard, VCARD)
+        self.assertEqual(records, [
+            {'last_name': 'Doe', 'first_name': 'John', 'email': 'john@example.com', 'phone_number': '+380501234567',
+             'birthday': date(1990, 5, 1)},
+            {'first_name': 'Anna', 'last_name': 'Smith', 'email': 'anna@example.com'},
+            'Missing END:VCARD',
+        ])
+
+
+class ImportSQLTestCase(sql_test_case.SQLTestCase):
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.changed = self.listen_contacts_changed()
+
+    async def names(self) -> list[str]:
+        result = await self.session.execute(select(Contact.first_name).order_by(Contact.id))
+        return list(result.scalars())
+
+    async def test_import_csv(self):
+        report = await import_contacts(chunked(CSV), ContactFileFormat.csv, self.user, self.session, batch_size=2)
+        self.assertEqual(report['imported'], 2)
+        self.assertEqual(report['failed'], 2)
+        self.assertEqual([error['row'] for error in report['errors']], [2, 3])
+        self.assertTrue(report['errors'][0]['error'].startswith('email:'))
+        self.assertEqual(await self.names(), ['John', 'Carl'])
+        self.assertEqual(self.changed, [{1}])
+
+    async def test_import_many_batches(self):
+        lines = ''.join(f'{{"first_name": "F{i}", "last_name": "L", "email": "c{i}@example.com"}}\n' for i in range(250))
+        report = await import_contacts(chunked(lines, 4096), ContactFileFormat.jsonl, self.user, self.session,
+                                       batch_size=100, max_errors=0)
+        self.assertEqual(report, {'imported': 250, 'failed': 0, 'errors': []})
+        self.assertEqual(await self.names(), [f'F{i}' for i in range(250)])
+
+    async def test_import_vcard(self):
+        report = await import_contacts(chunked(VCARD), ContactFileFormat.vcard, self.user, self.session)
+        self.assertEqual((report['imported'], report['failed']), (2, 1))
+        contact = (await self.session.execute(select(Contact).filter(Contact.first_name == 'John'))).scalar_one()
+        self.assertEqual((contact.phone_number, contact.birthday), ('+380501234567', date(1990, 5, 1)))
+
+    async def test_malformed_file_adds_nothing(self):
+        text = 'first_name,last_name,email\n' + 'John,Doe,john@example.com\n' * 5 + 'x' * 70000
+        with self.assertRaises(ImportFormatError):
+            await import_contacts(chunked(text, 1024), ContactFileFormat.csv, self.user, self.session, batch_size=2)
+        self.assertEqual(await self.names(), [])
+        self.assertEqual(self.changed, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from datetime import date
+from types import SimpleNamespace
+from typing import List
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.schemas import ContactResponse
+from src.services.contact_json import RESPONSE_FIELDS, contacts_json, contacts_response, response_email
+
+ROWS = [
+    ('John', 'Doe', 'john@example.com', '+380501234567', date(1990, 5, 1), 1),
+    ('Анна "Ann"', 'Ünal\\\t\x01', 'Anna.Smith@Example.COM', None, None, 2),
+    ('Zoë', '😀', ' zoe@mail.org', '0501234567', date(1, 1, 1), 3),
+]
+
+
+class TestContactJSON(unittest.TestCase):
+    def test_same_bytes_as_response_model(self):
+        app = FastAPI()
+
+        @app.get('/model', response_model=List[ContactResponse])
+        def model():
+            # what the endpoints returned before: ORM objects validated through ContactResponse
+            return [SimpleNamespace(**dict(zip(RESPONSE_FIELDS, row))) for row in ROWS]
+
+        @app.get('/fast', response_model=List[ContactResponse])
+        def fast():
+            return contacts_response(ROWS)
+
+        client = TestClient(app)
+        expected, actual = client.get('/model'), client.get('/fast')
+        self.assertEqual(actual.content, expected.content)
+        self.assertEqual(actual.headers['content-type'], expected.headers['content-type'])
+
+    def test_fields(self):
+        # columns after the requested fields, such as a sort key, are left out
+        rows = [('John', 1, 'Doe'), ('Anna', 2, 'Smith')]
+        self.assertEqual(contacts_json(rows, ('first_name', 'id')),
+                         b'[{"first_name":"John","id":1},{"first_name":"Anna","id":2}]')
+        self.assertEqual(contacts_json([]), b'[]')
+
+    def test_response_email(self):
+        self.assertEqual(response_email('John.Doe@example.com'), 'John.Doe@example.com')
+        self.assertEqual(response_email('John.Doe@Example.com'), 'John.Doe@example.com')
+        self.assertEqual(response_email('Ann <ann@x.org>'), 'ann@x.org')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from datetime import date
+
+from src.services.duplicates import DuplicateFinder, name_key, phone_key, soundex
+
+
+class TestKeys(unittest.TestCase):
+    def test_soundex(self):
+        for word, code in [('robert', 'r163'), ('rupert', 'r163'), ('rubin', 'r150'), ('ashcraft', 'a261'),
+                           ('tymczak', 't522'), ('pfister', 'p236'), ('honeyman', 'h555'), ('lee', 'l000')]:
+            with self.subTest(word=word):
+                self.assertEqual(soundex(word), code)
+
+    def test_name_key_ignores_case_spacing_and_order(self):
+        self.assertEqual(name_key('John', 'Doe'), name_key('  jon ', 'DOE'))
+        self.assertEqual(name_key('John', 'Doe'), name_key('Doe', 'John'))
+        self.assertNotEqual(name_key('John', 'Doe'), name_key('Anna', 'Doe'))
+        self.assertIsNone(name_key('', '-'))
+
+    def test_phone_key_ignores_formatting(self):
+        self.assertEqual(phone_key('+38 (050) 123-45-67'), '501234567')
+        self.assertEqual(phone_key('050-123-45-67'), '501234567')
+        self.assertEqual(phone_key('380501234567'), '501234567')
+        self.assertIsNone(phone_key('12-34'))
+        self.assertIsNone(phone_key(None))
+
+
+class TestDuplicateFinder(unittest.TestCase):
+    def groups(self, rows: list[tuple]) -> list[dict]:
+        finder = DuplicateFinder()
+        finder.add(rows)
+        return finder.groups()
+
+    def test_email_and_phone(self):
+        groups = self.groups([
+            (1, 'john', 'doe', 'john@example.com', None, None),
+            (2, 'johnny', 'walker', ' john@example.com', None, None),
+            (3, 'anna', 'smith', 'anna@example.com', '+380501234567', None),
+            (4, 'ann', 'white', 'a.white@example.com', '050 123 45 67', None),
+            (5, 'bob', 'adams', 'bob@example.com', None, None),
+        ])
+        self.assertEqual(groups, [{'ids': [1, 2], 'reasons': ['email']}, {'ids': [3, 4], 'reasons': ['phone']}])
+
+    def test_similar_names(self):
+        groups = self.groups([
+            (1, 'john', 'doe', 'a@example.com', None, date(1990, 1, 1)),
+            (2, 'jon', 'doe', 'b@example.com', None, None),
+            (3, 'doe', 'john', 'c@example.com', None, date(1990, 1, 1)),
+            # sounds alike, but was born on another day
+            (4, 'john', 'doe', 'd@example.com', None, date(1985, 5, 5)),
+            (5, 'jane', 'dow', 'e@example.com', None, None),
+        ])
+        self.assertEqual(groups, [{'ids': [1, 2, 3], 'reasons': ['name']}])
+
+    def test_transitive_groups(self):
+        groups = self.groups([
+            (1, 'john', 'doe', 'john@example.com', None, None),
+            (2, 'x', 'y', 'john@example.com', '0501234567', None),
+            (3, 'z', 'w', 'z@example.com', '+380501234567', None),
+        ])
+        self.assertEqual(groups, [{'ids': [1, 2, 3], 'reasons': ['email', 'phone']}])
+
+    def test_batches(self):
+        finder = DuplicateFinder()
+        finder.add([(1, 'john', 'doe', 'john@example.com', None, None)])
+        finder.add([(2, 'anna', 'smith', 'john@example.com', None, None)])
+        finder.add([])
+        self.assertEqual(finder.groups(), [{'ids': [1, 2], 'reasons': ['email']}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from fastapi import HTTPException
+
+from src.database.models import User
+from src.repository.users import confirmed_email, create_user, get_user_by_email, update_avatar, update_token
+from src.schemas import UserModel
+from src.services.auth import auth_service
+from src.services.identity_cache import identity_cache
+from tests import sql_test_case
+
+
+class IdentityCacheSQLTestCase(sql_test_case.SQLTestCase):
+
+    # without an id, as create_user takes the next one from the sequence
+    users = [{'username': 'john', 'email': 'john@example.com', 'password': 'hash', 'refresh_token': 'secret'}]
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.queries = []
+        self.listen_statements(self.count_query)
+        identity_cache.clear()
+        identity_cache.connect(FakeRedis(server=FakeServer()))
+        self.token = await auth_service.create_access_token(data={'sub': 'john@example.com'})
+
+    def count_query(self, conn, cursor, statement, *args):
+        self.queries.append(statement)
+
+    async def asyncTearDown(self):
+        identity_cache.connect(None)
+        identity_cache.clear()
+        await super().asyncTearDown()
+
+    async def current_user(self) -> User:
+        return await auth_service.get_current_user(self.token, self.session)
+
+    async def test_warm_cache_needs_no_query(self):
+        user = await self.current_user()
+        self.assertEqual((user.id, user.username), (1, 'john'))
+        self.assertIsNone(user.password)
+        self.assertIsNone(user.refresh_token)
+        # neither is in Redis
+        cached = await identity_cache.redis.hgetall('users:cache:john@example.com')
+        self.assertNotIn(b'hash', b''.join(cached.values()))
+        self.queries.clear()
+
+        again = await self.current_user()
+        self.assertEqual(self.queries, [])
+        self.assertEqual(again.id, 1)
+        self.assertIsNot(again, user)
+
+        # and none from Redis once this worker forgets it
+        identity_cache.local.clear()
+        await self.current_user()
+        self.assertEqual(self.queries, [])
+
+    async def test_writes_invalidate_the_cached_user(self):
+        self.assertFalse((await self.current_user()).confirmed)
+        await confirmed_email('john@example.com', self.session)
+        self.assertTrue((await self.current_user()).confirmed)
+
+        await update_avatar('john@example.com', 'https://example.com/john.png', self.session)
+        self.assertEqual((await self.current_user()).avatar, 'https://example.com/john.png')
+
+        invalidations = identity_cache.metrics['invalidations']
+        await update_token(await get_user_by_email('john@example.com', self.session), None, self.session)
+        self.assertEqual(identity_cache.metrics['invalidations'], invalidations + 1)
+
+    async def test_unknown_user_until_signup(self):
+        self.token = await auth_service.create_access_token(data={'sub': 'jane@example.com'})
+        with self.assertRaises(HTTPException) as raised:
+            await self.current_user()
+        self.assertEqual(raised.exception.status_code, 401)
+
+        await create_user(UserModel(username='janedoe', email='jane@example.com', password='password'), self.session)
+        self.assertEqual((await self.current_user()).username, 'janedoe')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import asyncio
+import threading
+import unittest
+
+from fastapi import HTTPException
+from passlib.hash import bcrypt
+
+from src.services.passwords import PasswordHasher
+
+
+class TestPasswordHasher(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.hasher = PasswordHasher(rounds=5, workers=2, max_pending=4)
+
+    def tearDown(self):
+        self.hasher.executor.shutdown()
+
+    async def test_hash_and_verify(self):
+        hashed = await self.hasher.hash('secret')
+        self.assertTrue(hashed.startswith('$2b$05$'))
+        self.assertEqual(await self.hasher.verify_and_update('secret', hashed), (True, None))
+        self.assertEqual(await self.hasher.verify_and_update('wrong', hashed), (False, None))
+        status = self.hasher.status()
+        self.assertEqual((status['hashes'], status['verifications'], status['pending']), (1, 2, 0))
+        self.assertIsNotNone(status['avg_queue_ms'])
+
+    async def test_runs_off_the_event_loop(self):
+        threads = []
+        original = self.hasher.context.hash
+
+        def hash(password):
+            threads.append(threading.current_thread().name)
+            return original(password)
+
+        self.hasher.context.hash = hash
+        await self.hasher.hash('secret')
+        self.assertTrue(threads[0].startswith('password-hasher'))
+
+    async def test_lower_cost_is_upgraded(self):
+        hashed = bcrypt.using(rounds=4).hash('secret')
+        verified, new_hash = await self.hasher.verify_and_update('secret', hashed)
+        self.assertTrue(verified)
+        self.assertTrue(new_hash.startswith('$2b$05$'))
+        self.assertEqual(await self.hasher.verify_and_update('secret', new_hash), (True, None))
+        self.assertEqual(self.hasher.metrics['rehashes'], 1)
+        self.assertEqual(await self.hasher.verify_and_update('wrong', hashed), (False, None))
+
+    async def test_calls_beyond_max_pending_are_rejected(self):
+        self.hasher.max_pending = 1
+        results = await asyncio.gather(self.hasher.hash('a'), self.hasher.hash('b'), return_exceptions=True)
+        rejected = [result for result in results if isinstance(result, HTTPException)]
+        self.assertEqual(len(rejected), 1)
+        self.assertEqual(rejected[0].status_code, 503)
+        self.assertEqual(self.hasher.metrics['rejected'], 1)
+        # the pool takes calls again once it has room
+        self.assertTrue((await self.hasher.hash('c')).startswith('$2b$'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from fastapi import HTTPException
+from fastapi.routing import APIRoute
+from redis.exceptions import ConnectionError
+from starlette.requests import Request
+
+from src.database.models import User
+from src.services.rate_limit import RateLimiter, RateLimits, rate_limits
+
+
+def later(seconds: float):
+    return patch('src.services.rate_limit.time.monotonic', return_value=time.monotonic() + seconds)
+
+
+class TestRateLimits(unittest.TestCase):
+    def test_burst_then_refill(self):
+        limits = RateLimits(max_keys=10, sync_interval=1)
+        self.assertEqual([limits.take('k', 3, 60) for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(limits.take('k', 3, 60), 20, delta=0.1)
+        with later(21):
+            self.assertEqual(limits.take('k', 3, 60), 0)
+            self.assertGreater(limits.take('k', 3, 60), 0)
+        self.assertEqual((limits.metrics['allowed'], limits.metrics['limited']), (4, 2))
+
+    def test_keys_are_limited_apart(self):
+        limits = RateLimits(max_keys=10, sync_interval=1)
+        limits.take('a', 1, 60)
+        self.assertGreater(limits.take('a', 1, 60), 0)
+        self.assertEqual(limits.take('b', 1, 60), 0)
+
+    def test_buckets_are_bounded(self):
+        limits = RateLimits(max_keys=2, sync_interval=1)
+        for key in ('a', 'b', 'c'):
+            limits.take(key, 1, 60)
+        self.assertEqual(list(limits.buckets), ['b', 'c'])
+
+
+class TestRateLimitSync(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        server = FakeServer()
+        # two workers sharing one Redis
+        self.first, self.second = RateLimits(10, 1), RateLimits(10, 1)
+        self.first.connect(FakeRedis(server=server))
+        self.second.connect(FakeRedis(server=server))
+
+    async def test_workers_drain_one_bucket(self):
+        for limits in (self.first, self.second):
+            limits.take('k', 10, 60)
+            await limits.sync()
+        for _ in range(6):
+            self.first.take('k', 10, 60)
+        await self.first.sync()
+        await self.second.sync()
+        # 10 - 1 taken by the second worker itself - 6 by the first one, give or take the refill
+        self.assertAlmostEqual(self.second.buckets['k'].tokens, 3, delta=0.1)
+        self.assertEqual(self.second.metrics['syncs'], 2)
+
+    async def test_idle_buckets_are_forgotten(self):
+        self.first.take('k', 10, 60)
+        await self.first.sync()
+        with later(61):
+            await self.first.sync()
+        self.assertEqual(len(self.first.buckets), 0)
+
+    async def test_redis_errors_degrade_to_local_limits(self):
+        self.first.take('k', 1, 60)
+        self.first.redis.pipeline = lambda *args, **kwargs: (_ for _ in ()).throw(ConnectionError())
+        await self.first.sync()
+        self.assertTrue(self.first.status()['degraded'])
+        self.assertEqual(self.first.buckets['k'].spent, 1)
+        self.assertGreater(self.first.take('k', 1, 60), 0)
+        self.assertEqual(self.first.take('other', 1, 60), 0)
+
+
+class TestRateLimiter(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        rate_limits.clear()
+
+    def tearDown(self):
+        rate_limits.clear()
+
+    @staticmethod
+    def request(path: str) -> Request:
+        route = APIRoute('/contacts/{contact_id}', endpoint=lambda contact_id: None)
+        return Request({'type': 'http', 'method': 'GET', 'path': path, 'headers': [], 'route': route})
+
+    async def test_limits_per_user_and_route(self):
+        limiter = RateLimiter(times=1, seconds=60)
+        await limiter(self.request('/contacts/1'), current_user=User(id=1))
+        with self.assertRaises(HTTPException) as raised:
+            # another contact is the same route
+            await limiter(self.request('/contacts/2'), current_user=User(id=1))
+        self.assertEqual(raised.exception.status_code, 429)
+        self.assertEqual(raised.exception.headers['Retry-After'], '60')
+        await limiter(self.request('/contacts/1'), current_user=User(id=2))
+
+
+if __name__ == '__main__':
+    unittest.main()
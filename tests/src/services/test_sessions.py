@@ -0,0 +1,86 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from fastapi import HTTPException
+from redis.exceptions import ConnectionError
+
+from src.services.sessions import MISSING, REUSED, ROTATED, LocalSessionStore, RefreshSessions, RedisSessionStore
+
+
+class SessionsTestCase(unittest.IsolatedAsyncioTestCase):
+
+    def make_store(self):
+        raise NotImplementedError
+
+    async def asyncSetUp(self):
+        self.sessions = RefreshSessions(ttl=60)
+        self.sessions.store = self.make_store()
+
+    async def test_rotation(self):
+        first = await self.sessions.start('john@example.com')
+        outcome, second = await self.sessions.rotate(first)
+        self.assertEqual(outcome, ROTATED)
+        self.assertEqual((second['sub'], second['sid']), (first['sub'], first['sid']))
+        self.assertNotEqual(second['jti'], first['jti'])
+        outcome, third = await self.sessions.rotate(second)
+        self.assertEqual(outcome, ROTATED)
+
+    async def test_reuse_ends_the_session(self):
+        first = await self.sessions.start('john@example.com')
+        _, second = await self.sessions.rotate(first)
+        self.assertEqual(await self.sessions.rotate(first), (REUSED, None))
+        # the thief and the owner are both logged out
+        self.assertEqual(await self.sessions.rotate(second), (MISSING, None))
+
+    async def test_sessions_are_per_device(self):
+        phone = await self.sessions.start('john@example.com')
+        laptop = await self.sessions.start('john@example.com')
+        await self.sessions.revoke(phone)
+        self.assertEqual(await self.sessions.rotate(phone), (MISSING, None))
+        self.assertEqual((await self.sessions.rotate(laptop))[0], ROTATED)
+
+    async def test_tokens_without_a_session_are_refused(self):
+        self.assertEqual(await self.sessions.rotate({'sub': 'john@example.com'}), (MISSING, None))
+
+
+class TestLocalSessions(SessionsTestCase):
+
+    def make_store(self):
+        return LocalSessionStore()
+
+    async def test_sessions_expire(self):
+        claims = await self.sessions.start('john@example.com')
+        with patch('src.services.sessions.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertEqual(await self.sessions.rotate(claims), (MISSING, None))
+
+
+class TestRedisSessions(SessionsTestCase):
+
+    def make_store(self):
+        return RedisSessionStore(FakeRedis(server=FakeServer()))
+
+    async def test_sessions_expire(self):
+        claims = await self.sessions.start('john@example.com')
+        ttl = await self.sessions.store.redis.ttl(f"sessions:john@example.com:{claims['sid']}")
+        self.assertTrue(0 < ttl <= 60)
+
+    async def test_concurrent_refreshes_rotate_once(self):
+        claims = await self.sessions.start('john@example.com')
+        outcomes = await asyncio.gather(*(self.sessions.rotate(claims) for _ in range(5)))
+        self.assertEqual([outcome for outcome, _ in outcomes].count(ROTATED), 1)
+
+    async def test_redis_errors_are_503(self):
+        self.sessions.store.redis.set = lambda *args, **kwargs: (_ for _ in ()).throw(ConnectionError())
+        with self.assertRaises(HTTPException) as raised:
+            await self.sessions.start('john@example.com')
+        self.assertEqual(raised.exception.status_code, 503)
+
+
+del SessionsTestCase
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from jose import jwt
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from src.database.events import mark_users_changed
+from src.services.auth import Auth
+from src.services.cache import ReadThroughCache
+from src.services.token_cache import VerifiedTokenCache
+
+
+class TestVerifiedTokenCache(unittest.TestCase):
+    def test_hit_after_put(self):
+        cache = VerifiedTokenCache(max_entries=10, ttl=60)
+        self.assertIsNone(cache.get('token'))
+        cache.put('token', {'sub': 'a@example.com'})
+        self.assertEqual(cache.get('token'), {'sub': 'a@example.com'})
+        self.assertEqual(cache.status()['hit_ratio'], 0.5)
+
+    def test_entries_end_at_the_expiry_of_the_token(self):
+        cache = VerifiedTokenCache(max_entries=10, ttl=60)
+        cache.put('token', {'sub': 'a@example.com', 'exp': time.time() + 5})
+        cache.put('expired', {'sub': 'a@example.com', 'exp': time.time() - 1})
+        self.assertEqual(len(cache), 1)
+        with patch('src.services.token_cache.time.monotonic', return_value=time.monotonic() + 6):
+            self.assertIsNone(cache.get('token'))
+
+    def test_lru(self):
+        cache = VerifiedTokenCache(max_entries=2, ttl=60)
+        for token in ('a', 'b', 'c'):
+            cache.put(token, {'sub': token})
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual((cache.get('b'), cache.get('c')), ({'sub': 'b'}, {'sub': 'c'}))
+
+    def test_revoke_drops_only_the_tokens_of_the_subjects(self):
+        cache = VerifiedTokenCache(max_entries=10, ttl=60)
+        cache.put('a1', {'sub': 'a@example.com'})
+        cache.put('a2', {'sub': 'a@example.com'})
+        cache.put('b1', {'sub': 'b@example.com'})
+        cache.revoke({'a@example.com'})
+        self.assertEqual((cache.get('a1'), cache.get('a2')), (None, None))
+        self.assertEqual(cache.get('b1'), {'sub': 'b@example.com'})
+
+
+class TestVerifiedTokenCacheListen(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        server = FakeServer()
+        # the identity cache of a worker that writes an account and the token cache of another worker
+        self.writer = ReadThroughCache('test', 100, 60, 600)
+        self.writer.connect(FakeRedis(server=server))
+        self.cache = VerifiedTokenCache(max_entries=10, ttl=60)
+        self.cache.connect(FakeRedis(server=server))
+        self.listener = asyncio.create_task(self.cache.listen(self.writer.channel, 'other'))
+        await asyncio.sleep(0.05)
+
+    async def asyncTearDown(self):
+        self.listener.cancel()
+        await asyncio.gather(self.listener, return_exceptions=True)
+
+    async def test_write_through_another_worker_revokes_the_tokens(self):
+        self.cache.put('a1', {'sub': 'a@example.com'})
+        self.cache.put('b1', {'sub': 'b@example.com'})
+        self.writer.invalidate({'a@example.com'})
+        await asyncio.gather(*self.writer._pending)
+        for _ in range(100):
+            if self.cache.metrics['remote_revocations']:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(self.cache.metrics['remote_revocations'], 1)
+        self.assertIsNone(self.cache.get('a1'))
+        self.assertEqual(self.cache.get('b1'), {'sub': 'b@example.com'})
+
+
+class TestAuthTokenCache(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.auth = Auth()
+        self.auth.token_cache.clear()
+        self.token = await self.auth.create_access_token(data={'sub': 'john@example.com'})
+
+    async def test_repeated_tokens_are_verified_once(self):
+        with patch('src.services.auth.jwt.decode', wraps=jwt.decode) as decode:
+            for _ in range(3):
+                self.assertEqual(self.auth.decode_token(self.token)['sub'], 'john@example.com')
+        self.assertEqual(decode.call_count, 1)
+
+    async def test_writes_to_the_account_revoke_its_tokens(self):
+        self.auth.decode_token(self.token)
+        engine = create_async_engine('sqlite+aiosqlite://')
+        async with async_sessionmaker(engine)() as session:
+            mark_users_changed(session, 'john@example.com')
+            await session.commit()
+        await engine.dispose()
+        self.assertIsNone(self.auth.token_cache.get(self.token))
+
+
+if __name__ == '__main__':
+    unittest.main()